@@ -0,0 +1,95 @@
+"""
+Album art download size and decode cost: old path vs. new path.
+
+Old: always take the largest Spotify variant (640px) and LANCZOS it to the
+art size from a full decode. New: take the smallest variant that covers the
+art size and decode it at reduced scale (JPEG draft mode) before resampling.
+
+Sample JPEGs are generated locally, so no network access is needed.
+
+Usage: python benchmarks/bench_album_art.py [--runs N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from PIL import Image, ImageDraw, ImageFilter
+
+import spotify_milkdrop_overlay as overlay
+
+
+def sample_jpeg(side, seed):
+    """A cover-like JPEG: gradient, shapes and noise, encoded like Spotify's CDN"""
+    image = Image.linear_gradient('L').resize((side, side)).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for i in range(12):
+        offset = (seed * 37 + i * 53) % side
+        draw.ellipse((offset // 2, offset // 3, offset, side - offset // 4),
+                     fill=((seed * 40 + i * 20) % 256, (i * 70) % 256, (seed * 90) % 256))
+    noise = Image.effect_noise((side, side), 40).convert('RGB')
+    image = Image.blend(image, noise, 0.2).filter(ImageFilter.SMOOTH)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def old_path(variants):
+    image = Image.open(BytesIO(variants[640]))
+    size = overlay.ALBUM_ART_SIZE
+    return image.resize((size, size), Image.Resampling.LANCZOS)
+
+
+def new_path(variants):
+    images = [{'url': side, 'width': side, 'height': side} for side in sorted(variants, reverse=True)]
+    side = overlay.select_album_art(images)
+    return overlay.decode_album_art(variants[side])
+
+
+def time_path(func, covers, runs):
+    timings = []
+    for _ in range(runs):
+        for variants in covers:
+            start = time.perf_counter()
+            func(variants)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--covers', type=int, default=10)
+    args = parser.parse_args()
+
+    covers = [{side: sample_jpeg(side, seed) for side in (640, 300, 64)}
+              for seed in range(args.covers)]
+
+    images = [{'url': side, 'width': side, 'height': side} for side in (640, 300, 64)]
+    chosen = overlay.select_album_art(images)
+    old_bytes = statistics.mean(len(c[640]) for c in covers)
+    new_bytes = statistics.mean(len(c[chosen]) for c in covers)
+
+    old = time_path(old_path, covers, args.runs)
+    new = time_path(new_path, covers, args.runs)
+
+    print(f"Art size {overlay.ALBUM_ART_SIZE}px, resample {overlay.ART_RESAMPLE}, "
+          f"new path picks the {chosen}px variant\n")
+    print(f"{'':<6}{'download':>12}{'mean decode':>16}{'median':>12}")
+    print(f"{'old':<6}{old_bytes / 1024:>9.1f} KB{statistics.mean(old):>13.3f} ms"
+          f"{statistics.median(old):>9.3f} ms")
+    print(f"{'new':<6}{new_bytes / 1024:>9.1f} KB{statistics.mean(new):>13.3f} ms"
+          f"{statistics.median(new):>9.3f} ms")
+    print(f"\n{old_bytes / new_bytes:.1f}x fewer bytes, "
+          f"{statistics.mean(old) / statistics.mean(new):.1f}x faster decode")
+
+
+if __name__ == '__main__':
+    main()
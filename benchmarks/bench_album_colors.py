@@ -0,0 +1,65 @@
+"""
+Album color extraction time per image, checked against a fixed budget.
+
+Each sample cover is decoded and resized the way the overlay does it, then
+extract_theme runs on the result --runs times. Reports the mean, median, 95th
+percentile and worst time per image, and exits with status 1 if the 95th
+percentile is over --budget milliseconds. The overlay extracts colors once per
+album on an album art worker, so this never costs frame time; the budget keeps
+it cheap on low-end machines too.
+
+Usage: python benchmarks/bench_album_colors.py [--runs N] [--budget MS] [--size PX]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import spotify_milkdrop_overlay as overlay
+from bench_album_art import sample_jpeg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--covers', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=2.0, help='milliseconds per image')
+    parser.add_argument('--size', type=int, default=overlay.ALBUM_ART_SIZE,
+                        help='art size in pixels')
+    args = parser.parse_args()
+
+    if overlay.np is None:
+        sys.exit("NumPy is not installed, so album colors are not extracted")
+
+    images = [overlay.decode_album_art(sample_jpeg(300, seed), size=args.size)
+              for seed in range(args.covers)]
+    themes = [overlay.extract_theme(image) for image in images]
+
+    timings = []
+    for _ in range(args.runs):
+        for image in images:
+            start = time.perf_counter()
+            overlay.extract_theme(image)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95)]
+
+    print(f"{len(images)} covers at {args.size}px, {len(timings)} extractions, "
+          f"{sum(theme is not None for theme in themes)} with album colors\n")
+    print(f"{'mean':>10}{'median':>10}{'p95':>10}{'max':>10}{'budget':>10}")
+    print(f"{statistics.mean(timings):>7.3f} ms{statistics.median(timings):>7.3f} ms"
+          f"{p95:>7.3f} ms{timings[-1]:>7.3f} ms{args.budget:>7.3f} ms")
+
+    if p95 > args.budget:
+        print(f"\nOver budget: 95th percentile {p95:.3f} ms > {args.budget:.3f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Per-poll latency of get_current_track with and without connection pooling.
+
+Runs against the local fake Spotify server, so it measures connection setup
+and request overhead only (plain HTTP: real polls also pay a TLS handshake on
+every unpooled request, so the gap in production is larger).
+
+Usage: python benchmarks/bench_http_pool.py [--polls N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import requests
+
+import spotify_milkdrop_overlay as overlay
+from fake_spotify_server import FakeSpotifyServer
+
+
+class UnpooledClient:
+    """The old behaviour: a bare requests.get/post per call"""
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', (overlay.CONNECT_TIMEOUT, overlay.READ_TIMEOUT))
+        return requests.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault('timeout', (overlay.CONNECT_TIMEOUT, overlay.READ_TIMEOUT))
+        return requests.post(url, **kwargs)
+
+
+def measure(client, polls):
+    overlay.http_client = client
+    latencies = []
+    for _ in range(polls):
+        start = time.perf_counter()
+        overlay.get_current_track()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name, latencies, connections):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<10} mean {statistics.mean(latencies):7.3f} ms   "
+          f"median {statistics.median(latencies):7.3f} ms   "
+          f"p95 {p95:7.3f} ms   connections {connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--polls', type=int, default=500)
+    args = parser.parse_args()
+
+    overlay.access_token = 'bench'
+    overlay.token_expires = time.time() + 3600
+
+    with FakeSpotifyServer() as server:
+        overlay.API_BASE_URL = server.url
+
+        measure(UnpooledClient(), 10)  # warm interpreter caches
+        server.connections = 0
+        unpooled = measure(UnpooledClient(), args.polls)
+        report('unpooled', unpooled, server.connections)
+
+        server.connections = 0
+        client = overlay.HTTPClient(hosts=[server.url])
+        pooled = measure(client, args.polls)
+        report('pooled', pooled, server.connections)
+        client.close()
+
+    speedup = statistics.mean(unpooled) / statistics.mean(pooled)
+    print(f"\nPooling is {speedup:.2f}x faster per poll")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Import time of spotify_milkdrop_overlay, measured with python -X importtime.
+
+Each run is a fresh interpreter, with the module's bytecode already compiled
+as after a normal first start. Reports the module's cumulative import time
+and the slowest imports it pulls in directly.
+
+Usage: python benchmarks/bench_import.py [--runs N] [--top N] [--dir DIR]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = 'spotify_milkdrop_overlay'
+
+
+def import_times(directory):
+    """{module: cumulative microseconds} for one fresh import of MODULE
+
+    Only MODULE itself and the modules it imports directly are kept; their
+    times already include everything they import in turn.
+    """
+    # Allow the .pyc to be written, so runs measure importing rather than compiling
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {MODULE}'],
+        cwd=directory, env=env, capture_output=True, text=True, check=True
+    )
+    times = {}
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            # Children are listed just before the module that imported them
+            if name.strip() == MODULE:
+                times = children
+                times[MODULE] = int(cumulative)
+            children = {}
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--dir', default=ROOT, help=f'directory containing {MODULE}.py')
+    args = parser.parse_args()
+
+    import_times(args.dir)  # compile and cache bytecode
+    runs = [import_times(args.dir) for _ in range(args.runs)]
+    total = statistics.median(run[MODULE] for run in runs)
+    print(f"{MODULE}: median {total / 1000:.1f} ms cumulative over {args.runs} runs\n")
+
+    names = {name for run in runs for name in run}
+    heaviest = sorted(((statistics.median(run.get(name, 0) for run in runs), name)
+                       for name in names if name != MODULE), reverse=True)
+    print(f"{'slowest imports':<30}{'median':>12}")
+    for micros, name in heaviest[:args.top]:
+        print(f"{name:<30}{micros / 1000:>9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
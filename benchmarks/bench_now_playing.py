@@ -0,0 +1,98 @@
+"""
+Reader throughput of the shared-memory now-playing segment.
+
+A writer process publishes states at a fixed rate (0 for none, or "max" for
+flat out) while this process reads them for --seconds. Every state is
+self-checking (track, artist and progress all carry the write number), so a
+torn read would be counted. Reports reads per second, time per read and
+seqlock retries per read.
+
+Usage: python benchmarks/bench_now_playing.py [--seconds S] [--rates 0,100,10000,max]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import spotify_milkdrop_overlay as overlay
+
+
+def state(n):
+    """The n-th published state"""
+    return overlay.PlaybackSnapshot(str(n), f'track {n}', f'artist {n}', 'album', '',
+                                    progress_ms=n, duration_ms=200000, is_playing=True)
+
+
+def writer(path, rate, ready, stop):
+    """Writer process: publish states at rate per second (0: none, None: flat out)"""
+    segment = overlay.NowPlayingSegment(path)
+    interval = 1 / rate if rate else 0
+    ready.set()
+    n = 0
+    while not stop.is_set():
+        if rate == 0:
+            stop.wait()
+            break
+        n += 1
+        segment.publish(state(n))
+        if interval:
+            time.sleep(interval)
+    segment.map.close()
+
+
+def measure(path, rate, seconds):
+    """Read for seconds while a writer runs at rate; returns (reads, elapsed, retries, torn)"""
+    ready, stop = multiprocessing.Event(), multiprocessing.Event()
+    process = multiprocessing.Process(target=writer, args=(path, rate, ready, stop))
+    process.start()
+    ready.wait()
+
+    reader = overlay.NowPlayingReader(path)
+    reads = torn = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            current = reader.read()
+            n = current['progress_ms']
+            if current['track'] != f'track {n}' or current['artist'] != f'artist {n}':
+                torn += 1
+        reads += 100
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    process.join()
+    retries = reader.retries
+    reader.close()
+    return reads, elapsed, retries, torn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2)
+    parser.add_argument('--rates', default='0,100,10000,max',
+                        help='writer rates per second, comma-separated ("max" for no pause)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'now_playing.bin')
+        segment = overlay.NowPlayingSegment(path)
+        segment.publish(state(0))
+        segment.map.close()
+
+        print(f"{'writes/s':>10}{'reads/s':>14}{'us/read':>10}{'retries/read':>14}{'torn':>6}")
+        for rate in args.rates.split(','):
+            reads, elapsed, retries, torn = measure(path, None if rate == 'max' else float(rate),
+                                                    args.seconds)
+            print(f"{rate:>10}{reads / elapsed:>14,.0f}{elapsed / reads * 1e6:>10.2f}"
+                  f"{retries / reads:>14.4f}{torn:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,429 @@
+"""
+Microbenchmarks for the overlay's hot paths, runnable headless.
+
+Tk is replaced with no-op widgets (as the tests do with mocks), so the numbers
+are the overlay's own Python cost per call. Cases:
+
+  parse_current_track     get_current_track on a realistic payload (no network)
+  decode_album_art        decode and resize a 300px JPEG
+  load_album_art          load_album_art on a cache miss (in-process download)
+  format_time             one MM:SS conversion
+  marquee_step            one frame of pixel scrolling for a long title
+  update_progress_bar     one progress bar redraw
+  composite_frame         one scrolling + progress frame with renderer = pillow,
+                          rendered offscreen (the Tk upload is not included)
+  poll_cycle_steady       poll the fake API server and dispatch to the UI
+  poll_cycle_track_change same, with the track changing on every poll
+
+Results are JSON (per-call times in microseconds). Save a baseline, then
+compare a later run (or a saved result file) against it:
+
+  python benchmarks/microbench.py --save-baseline
+  python benchmarks/microbench.py --compare
+  python benchmarks/microbench.py --output after.json
+  python benchmarks/microbench.py --compare before.json --results after.json
+
+--compare exits with status 1 if any case is slower than the baseline by more
+than --threshold percent.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import types
+from io import BytesIO
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+
+class NullWidget:
+    """Stand-in for every Tk widget: accepts any call and does nothing"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: 0
+
+
+class NullFont(NullWidget):
+    """Font with fixed-width metrics, so text width depends on length"""
+
+    def measure(self, text):
+        return len(text) * 8
+
+    def metrics(self, name):
+        return 16
+
+
+def stub_tk():
+    """Install headless tkinter / ImageTk modules before the overlay is imported"""
+    tk = types.ModuleType('tkinter')
+    tk.Tk = tk.Frame = tk.Label = tk.Canvas = NullWidget
+    tk.font = types.ModuleType('tkinter.font')
+    tk.font.Font = NullFont
+    tk.ttk = types.ModuleType('tkinter.ttk')
+    image_tk = types.ModuleType('PIL.ImageTk')
+    image_tk.PhotoImage = NullWidget
+    sys.modules.update({
+        'tkinter': tk, 'tkinter.font': tk.font, 'tkinter.ttk': tk.ttk,
+        'PIL.ImageTk': image_tk,
+    })
+
+
+stub_tk()
+
+from PIL import Image, ImageDraw
+
+import spotify_milkdrop_overlay as overlay
+from fake_spotify_server import FakeSpotifyServer, make_playing_payload
+
+MARKETS = ['AD', 'AE', 'AR', 'AT', 'AU', 'BE', 'BG', 'BO', 'BR', 'CA', 'CH', 'CL', 'CO',
+           'CR', 'CY', 'CZ', 'DE', 'DK', 'DO', 'EC', 'EE', 'ES', 'FI', 'FR', 'GB', 'GR',
+           'GT', 'HK', 'HN', 'HU', 'ID', 'IE', 'IL', 'IN', 'IS', 'IT', 'JP', 'LI', 'LT',
+           'LU', 'LV', 'MC', 'MT', 'MX', 'MY', 'NI', 'NL', 'NO', 'NZ', 'PA', 'PE', 'PH',
+           'PL', 'PT', 'PY', 'RO', 'SE', 'SG', 'SK', 'SV', 'TH', 'TR', 'TW', 'US', 'UY',
+           'VN', 'ZA']
+
+
+def realistic_payload(track_id='track1', name='Song Title', images=None):
+    """A currently-playing body padded out with the fields Spotify really sends"""
+    payload = make_playing_payload(track_id=track_id, name=name,
+                                   artists=('First Artist', 'Featured Artist'),
+                                   images=images)
+    payload['context'] = {'type': 'playlist', 'uri': 'spotify:playlist:abc',
+                          'href': 'https://api.spotify.com/v1/playlists/abc',
+                          'external_urls': {'spotify': 'https://open.spotify.com/playlist/abc'}}
+    payload['actions'] = {'disallows': {'resuming': True, 'skipping_prev': True}}
+    item = payload['item']
+    item.update({
+        'available_markets': MARKETS, 'disc_number': 1, 'track_number': 7,
+        'explicit': False, 'popularity': 63, 'is_local': False, 'type': 'track',
+        'uri': f'spotify:track:{track_id}', 'preview_url': None,
+        'external_ids': {'isrc': 'USABC1234567'},
+        'external_urls': {'spotify': f'https://open.spotify.com/track/{track_id}'},
+    })
+    item['album'].update({'available_markets': MARKETS, 'album_type': 'album',
+                          'release_date': '2021-03-05', 'total_tracks': 12})
+    for artist in item['artists']:
+        artist.update({'type': 'artist', 'uri': f"spotify:artist:{artist['id']}",
+                       'external_urls': {'spotify': 'https://open.spotify.com/artist/x'}})
+    return payload
+
+
+def sample_jpeg(side=300):
+    """A cover-like JPEG of the size the overlay downloads"""
+    image = Image.linear_gradient('L').resize((side, side)).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for i in range(8):
+        draw.ellipse((i * 10, i * 15, side - i * 5, side - i * 20),
+                     fill=((i * 40) % 256, (i * 70) % 256, 120))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class CannedResponse:
+    """Just enough of requests.Response for the overlay"""
+
+    def __init__(self, body, status_code=200):
+        self.content = body
+        self.status_code = status_code
+        self.headers = {}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        pass
+
+
+class CannedClient:
+    """HTTP client that answers every request with the same body"""
+
+    def __init__(self, body):
+        self.response = CannedResponse(body)
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+class NullCache:
+    """Album art cache that always misses"""
+
+    def get(self, url):
+        return None
+
+    def put(self, url, image):
+        pass
+
+    def theme(self, url, image=None):
+        # A miss extracts the colors (None without NumPy), like the real cache
+        return overlay.extract_theme(image) if image is not None else None
+
+
+def make_overlay():
+    """A SpotifyOverlay on the headless widgets, with no monitor thread"""
+    with patch.object(overlay, 'Thread'):
+        instance = overlay.SpotifyOverlay(network_engine='threads')
+    instance.frame_scheduler.stop()
+    return instance
+
+
+# Each case is a factory: it does its setup and returns (run, cleanup)
+CASES = {}
+
+
+def case(func):
+    CASES[func.__name__] = func
+    return func
+
+
+@case
+def parse_current_track():
+    body = json.dumps(realistic_payload()).encode()
+    overlay.http_client = CannedClient(body)
+    return overlay.get_current_track, None
+
+
+@case
+def decode_album_art():
+    data = sample_jpeg()
+    return lambda: overlay.decode_album_art(data), None
+
+
+@case
+def load_album_art():
+    overlay.http_client = CannedClient(sample_jpeg())
+    instance = make_overlay()
+    instance.art_cache = NullCache()
+    return lambda: instance.load_album_art('/image/300'), instance.close
+
+
+@case
+def format_time():
+    instance = make_overlay()
+    return lambda: instance.format_time(187654), instance.close
+
+
+@case
+def marquee_step():
+    instance = make_overlay()
+    marquee = instance.track_marquee
+    marquee.on_configure(types.SimpleNamespace(width=250))
+    marquee.set_text('♪ ' + 'A Very Long Track Title (Extended Remix) ' * 2)
+    clock = [marquee.started + marquee.pause]
+
+    def run():
+        clock[0] += 1 / 30
+        marquee.step(clock[0])
+    return run, instance.close
+
+
+@case
+def update_progress_bar():
+    instance = make_overlay()
+    instance.progress_width = 250
+    instance.playback = overlay.PlaybackSnapshot('track1', 'Song Title', 'Artist', progress_ms=0,
+                                                 duration_ms=200000, is_playing=True)
+    return instance.update_progress_bar, instance.close
+
+
+@case
+def composite_frame():
+    with patch.object(overlay, 'RENDERER', 'pillow'):
+        instance = make_overlay()
+    marquee = instance.track_marquee
+    marquee.set_text('♪ ' + 'A Very Long Track Title (Extended Remix) ' * 2)
+    clock = [marquee.started + marquee.pause]
+    instance.playback = overlay.PlaybackSnapshot('track1', 'Song Title', 'Artist', progress_ms=0,
+                                                 duration_ms=20000, is_playing=True,
+                                                 sampled_at=clock[0])
+    instance.progress.clock = lambda: clock[0]
+    instance.progress.reset(instance.playback)
+    instance.compositor.render()
+
+    def run():
+        clock[0] += 1 / 30
+        marquee.step(clock[0])
+        instance.update_progress()
+        instance.compositor.render()
+    return run, instance.close
+
+
+def poll_cycle(change_track):
+    server = FakeSpotifyServer().start()
+    payloads = [realistic_payload(track_id=f'track{i}', name=f'Song {i}', images=[])
+                for i in range(2)]
+    server.playing = payloads[0]
+    overlay.API_BASE_URL = server.url
+    overlay.http_client = overlay.HTTPClient(hosts=[server.url])
+    instance = make_overlay()
+    turn = [0]
+
+    def run():
+        if change_track:
+            turn[0] ^= 1
+            server.playing = payloads[turn[0]]
+        instance.poll_succeeded(overlay.get_current_track())
+        instance.frame_scheduler.run_updates()
+
+    def cleanup():
+        instance.close()
+        overlay.http_client.close()
+        server.stop()
+    return run, cleanup
+
+
+@case
+def poll_cycle_steady():
+    return poll_cycle(change_track=False)
+
+
+@case
+def poll_cycle_track_change():
+    return poll_cycle(change_track=True)
+
+
+def time_case(run, repeat, min_time):
+    """Per-call seconds for each of repeat rounds, each lasting at least min_time"""
+    run()  # warm up
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        rounds.append((time.perf_counter() - start) / number)
+    return number, rounds
+
+
+def run_cases(names, repeat, min_time):
+    overlay.access_token = 'bench'
+    overlay.token_expires = time.time() + 3600
+    saved = (overlay.http_client, overlay.API_BASE_URL)
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            patch.object(overlay, 'album_art_cache', overlay.AlbumArtCache(cache_dir=cache_dir)):
+        for name in names:
+            run, cleanup = CASES[name]()
+            try:
+                number, rounds = time_case(run, repeat, min_time)
+            finally:
+                if cleanup:
+                    cleanup()
+                overlay.http_client, overlay.API_BASE_URL = saved
+            rounds_us = [r * 1e6 for r in rounds]
+            results[name] = {
+                'median_us': round(statistics.median(rounds_us), 3),
+                'min_us': round(min(rounds_us), 3),
+                'stdev_us': round(statistics.stdev(rounds_us), 3) if len(rounds_us) > 1 else 0.0,
+                'loops': number,
+                'rounds': len(rounds_us),
+            }
+            print(f"{name:<26}{results[name]['median_us']:>12.2f} us", file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print a before/after table; returns the names that regressed"""
+    regressed = []
+    print(f"{'case':<26}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<26}{'-':>12}{result['median_us']:>9.2f} us{'new':>10}")
+            continue
+        change = (result['median_us'] / before['median_us'] - 1) * 100
+        flag = ''
+        if change > threshold:
+            flag = '  slower'
+            regressed.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{name:<26}{before['median_us']:>9.2f} us{result['median_us']:>9.2f} us"
+              f"{change:>+9.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='\n'.join(__doc__.strip().splitlines()[1:]))
+    parser.add_argument('cases', nargs='*', help='cases to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=7, help='timed rounds per case')
+    parser.add_argument('--min-time', type=float, default=0.1,
+                        help='minimum seconds per round')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help=f'write results to {os.path.relpath(BASELINE_FILE, ROOT)}')
+    parser.add_argument('--compare', nargs='?', const=BASELINE_FILE, metavar='BASELINE',
+                        help='compare against a baseline file (default: the saved baseline)')
+    parser.add_argument('--results', help='compare this result file instead of running')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='percent slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)} (choose from {', '.join(CASES)})")
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = run_cases(args.cases or list(CASES), max(1, args.repeat), args.min_time)
+
+    output = json.dumps(current, indent=2) + '\n'
+    for path in filter(None, [args.output, args.save_baseline and BASELINE_FILE]):
+        with open(path, 'w') as f:
+            f.write(output)
+    if not (args.output or args.save_baseline or args.compare):
+        print(output, end='')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('machine') != current.get('machine') or \
+                baseline.get('python') != current.get('python'):
+            print(f"note: baseline is from Python {baseline.get('python')} on "
+                  f"{baseline.get('machine')}, compare on the same machine", file=sys.stderr)
+        regressed = compare(baseline, current, args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} case(s) slower than the baseline by more than "
+                  f"{args.threshold:g}%: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
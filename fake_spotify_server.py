@@ -0,0 +1,152 @@
+"""
+Local stand-in for the Spotify Web API, used by the tests and benchmarks.
+
+Serves the currently-playing, token and album art endpoints over plain HTTP
+with keep-alive, so the overlay's network code can be exercised without
+touching the real service.
+"""
+
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+
+def make_playing_payload(track_id='track1', name='Song Title', artists=('Artist',),
+                         album='Album', progress_ms=30000, duration_ms=200000,
+                         is_playing=True, images=None, timestamp=0):
+    """Build a realistic currently-playing response body"""
+    if images is None:
+        images = [
+            {'url': '/image/640', 'width': 640, 'height': 640},
+            {'url': '/image/300', 'width': 300, 'height': 300},
+            {'url': '/image/64', 'width': 64, 'height': 64},
+        ]
+    return {
+        'timestamp': timestamp,
+        'progress_ms': progress_ms,
+        'is_playing': is_playing,
+        'currently_playing_type': 'track',
+        'item': {
+            'id': track_id,
+            'name': name,
+            'duration_ms': duration_ms,
+            'artists': [{'id': f'artist{i}', 'name': a} for i, a in enumerate(artists)],
+            'album': {'id': f'album-{album}', 'name': album, 'images': images},
+        },
+    }
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    """Request handler backed by the state stored on the server"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _scripted(self):
+        """Pop the next scripted response, if any"""
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path))
+            self.server.authorizations.append(self.headers.get('Authorization'))
+            if self.server.script:
+                return self.server.script.pop(0)
+        return None
+
+    def _handle(self):
+        # Always consume the body, so keep-alive connections stay in sync
+        length = int(self.headers.get('Content-Length', 0))
+        self.request_body = self.rfile.read(length) if length else b''
+        scripted = self._scripted()
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if scripted is not None:
+            status, headers, body = scripted
+            self._send(status, body, headers=headers)
+            return
+
+        path = urlparse(self.path).path
+        if path == '/v1/me/player/currently-playing':
+            payload = self.server.playing
+            if payload is None:
+                self._send(204)
+            else:
+                self._send(200, json.dumps(payload).encode())
+        elif path == '/api/token':
+            with self.server.lock:
+                self.server.token_requests += 1
+                token = f'token-{self.server.token_requests}'
+            body = {'access_token': token, 'token_type': 'Bearer', 'expires_in': 3600}
+            if self.server.issue_refresh_token:
+                body['refresh_token'] = 'refresh-token'
+            self._send(200, json.dumps(body).encode())
+        elif path.startswith('/image/'):
+            self._send(200, self.server.image_bytes, content_type='image/jpeg')
+        else:
+            self._send(404)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_HEAD(self):
+        self._handle()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    """Threaded fake Spotify server on 127.0.0.1 with scriptable responses"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0):
+        super().__init__(('127.0.0.1', port), FakeSpotifyHandler)
+        self.lock = threading.Lock()
+        self.playing = make_playing_payload()
+        self.image_bytes = b''
+        self.issue_refresh_token = True
+        self.script = []
+        self.requests = []
+        self.authorizations = []
+        self.connections = 0
+        self.token_requests = 0
+        self.delay = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,53 +1,347 @@
-import tkinter as tk
-from tkinter import ttk
 import time
-from threading import Thread
-from PIL import Image, ImageTk
-import requests
+from threading import Thread, Lock
+from collections import OrderedDict
+import functools
+import heapq
+import bisect
+import importlib.util
+import itertools
+import queue
+import threading
+import signal
+import struct
 from io import BytesIO
 import base64
-import webbrowser
+import json
 from urllib.parse import urlencode, urlparse, parse_qs
 import configparser
 import os
 import sys
-from http.server import HTTPServer, BaseHTTPRequestHandler
 
-# Load configuration
-config = configparser.ConfigParser()
+
+def lazy_import(name):
+    """Return a module that is only really imported on first attribute access
+    
+    Keeps importing this module fast: Tk, Pillow, requests and friends load
+    when the code that uses them first runs. Modules already imported (or
+    mocked into sys.modules) are returned as they are.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    # Bind it on its package the way import does, for code that reads
+    # e.g. concurrent.futures as an attribute (asyncio does)
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(importlib.import_module(parent), child, module)
+    return module
+
+
+tk = lazy_import('tkinter')
+Image = lazy_import('PIL.Image')
+ImageTk = lazy_import('PIL.ImageTk')
+ImageDraw = lazy_import('PIL.ImageDraw')
+ImageFont = lazy_import('PIL.ImageFont')
+requests = lazy_import('requests')
+webbrowser = lazy_import('webbrowser')
+asyncio = lazy_import('asyncio')
+futures = lazy_import('concurrent.futures')
+hashlib = lazy_import('hashlib')
+random = lazy_import('random')
+cProfile = lazy_import('cProfile')
+pstats = lazy_import('pstats')
+tracemalloc = lazy_import('tracemalloc')
+mmap = lazy_import('mmap')
+
+# Optional: album colors are only extracted when NumPy is installed
+np = lazy_import('numpy') if importlib.util.find_spec('numpy') else None
+
+# Configuration: apply_settings() publishes a Settings object as the
+# module-level constants below. Importing the module only installs the
+# built-in defaults; main() loads config.ini.
 config_file = 'config.ini'
 
-if not os.path.exists(config_file):
-    print(f"ERROR: {config_file} not found!")
-    print("Please create config.ini with your Spotify API credentials.")
-    sys.exit(1)
-
-config.read(config_file)
-
-# Spotify API Configuration from INI
-CLIENT_ID = config.get('spotify', 'client_id')
-CLIENT_SECRET = config.get('spotify', 'client_secret')
-REDIRECT_URI = config.get('spotify', 'redirect_uri')
-SCOPE = config.get('spotify', 'scope')
-
-# Overlay settings from INI
-OPACITY = config.getfloat('overlay', 'opacity', fallback=0.85)
-UPDATE_INTERVAL = config.getint('overlay', 'update_interval', fallback=2)
-WINDOW_WIDTH = config.getint('overlay', 'window_width', fallback=400)
-WINDOW_HEIGHT = config.getint('overlay', 'window_height', fallback=140)
-POSITION_X = config.getint('overlay', 'position_x', fallback=-1)
-POSITION_Y_FROM_BOTTOM = config.getint('overlay', 'position_y_from_bottom', fallback=200)
-MAX_TEXT_LENGTH = config.getint('overlay', 'max_text_length', fallback=35)
-
-# Appearance settings from INI
-PROGRESS_COLOR = config.get('appearance', 'progress_color', fallback='#1DB954')
-TRACK_COLOR = config.get('appearance', 'track_color', fallback='white')
-ARTIST_COLOR = config.get('appearance', 'artist_color', fallback='#b3b3b3')
-TRACK_FONT_SIZE = config.getint('appearance', 'track_font_size', fallback=14)
-ARTIST_FONT_SIZE = config.getint('appearance', 'artist_font_size', fallback=11)
-TIME_FONT_SIZE = config.getint('appearance', 'time_font_size', fallback=9)
-
-# Token storage
+
+class Settings:
+    """Every config.ini setting, with built-in defaults for anything missing
+    
+    Attribute names match the module constants they become.
+    """
+    
+    def __init__(self, config=None):
+        if config is None:
+            config = configparser.ConfigParser()
+        
+        # Spotify API Configuration from INI
+        self.CLIENT_ID = config.get('spotify', 'client_id', fallback='YOUR_CLIENT_ID_HERE')
+        self.CLIENT_SECRET = config.get('spotify', 'client_secret', fallback='YOUR_CLIENT_SECRET_HERE')
+        self.REDIRECT_URI = config.get('spotify', 'redirect_uri',
+                                       fallback='http://127.0.0.1:8888/callback')
+        self.SCOPE = config.get('spotify', 'scope',
+                                fallback='user-read-currently-playing user-read-playback-state')
+        self.TOKEN_FILE = os.path.expanduser(config.get(
+            'spotify', 'token_file',
+            fallback=os.path.join('~', '.spotify_milkdrop_overlay', 'tokens.json')
+        ))
+        
+        # Overlay settings from INI
+        self.OPACITY = config.getfloat('overlay', 'opacity', fallback=0.85)
+        self.UPDATE_INTERVAL = config.getint('overlay', 'update_interval', fallback=2)
+        self.WINDOW_WIDTH = config.getint('overlay', 'window_width', fallback=400)
+        self.WINDOW_HEIGHT = config.getint('overlay', 'window_height', fallback=140)
+        self.POSITION_X = config.getint('overlay', 'position_x', fallback=-1)
+        self.POSITION_Y_FROM_BOTTOM = config.getint('overlay', 'position_y_from_bottom', fallback=200)
+        self.MIN_POLL_INTERVAL = config.getfloat('overlay', 'min_poll_interval', fallback=0.5)
+        self.MAX_POLL_INTERVAL = config.getfloat('overlay', 'max_poll_interval', fallback=15)
+        self.TRACK_END_MARGIN = config.getfloat('overlay', 'track_end_margin', fallback=0.3)
+        self.PROGRESS_TOLERANCE_MS = config.getint('overlay', 'progress_tolerance_ms', fallback=1000)
+        self.PROGRESS_SMOOTHING = config.getfloat('overlay', 'progress_smoothing', fallback=1.0)
+        self.FRAME_RATE = config.getint('overlay', 'frame_rate', fallback=30)
+        self.FADE_DURATION = config.getfloat('overlay', 'fade_duration', fallback=0.4)
+        self.FADE_EASING = config.get('overlay', 'fade_easing', fallback='ease_in_out')
+        self.TRANSITION = config.get('overlay', 'transition', fallback='fade')
+        self.RENDERER = config.get('overlay', 'renderer', fallback='widgets')
+        self.SCROLL_SPEED = config.getfloat('overlay', 'scroll_speed', fallback=40)
+        self.SCROLL_PAUSE = config.getfloat('overlay', 'scroll_pause', fallback=1.5)
+        self.RELOAD_INTERVAL = config.getfloat('overlay', 'reload_interval', fallback=2)
+        
+        # Appearance settings from INI
+        self.PROGRESS_COLOR = config.get('appearance', 'progress_color', fallback='#1DB954')
+        self.TRACK_COLOR = config.get('appearance', 'track_color', fallback='white')
+        self.ARTIST_COLOR = config.get('appearance', 'artist_color', fallback='#b3b3b3')
+        self.TRACK_FONT_SIZE = config.getint('appearance', 'track_font_size', fallback=14)
+        self.ARTIST_FONT_SIZE = config.getint('appearance', 'artist_font_size', fallback=11)
+        self.TIME_FONT_SIZE = config.getint('appearance', 'time_font_size', fallback=9)
+        self.ALBUM_ART_SIZE = config.getint('appearance', 'album_art_size', fallback=100)
+        self.ART_RESAMPLE = config.get('appearance', 'art_resample', fallback='lanczos')
+        self.ALBUM_COLORS = config.getboolean('appearance', 'album_colors', fallback=True)
+        
+        # Network settings from INI
+        self.CONNECT_TIMEOUT = config.getfloat('network', 'connect_timeout', fallback=3.0)
+        self.READ_TIMEOUT = config.getfloat('network', 'read_timeout', fallback=5.0)
+        self.POOL_SIZE = config.getint('network', 'pool_size', fallback=4)
+        self.WARM_UP_CONNECTIONS = config.getboolean('network', 'warm_up_connections', fallback=True)
+        self.ART_WORKERS = config.getint('network', 'art_workers', fallback=2)
+        self.RETRY_MAX_DELAY = config.getfloat('network', 'retry_max_delay', fallback=60)
+        self.BREAKER_THRESHOLD = config.getint('network', 'breaker_threshold', fallback=5)
+        self.BREAKER_COOLDOWN = config.getfloat('network', 'breaker_cooldown', fallback=30)
+        self.NETWORK_ENGINE = config.get('network', 'engine', fallback='threads')
+        self.REQUEST_DEADLINE = config.getfloat('network', 'request_deadline', fallback=10)
+        self.TOKEN_REFRESH_AHEAD = config.getfloat('network', 'token_refresh_ahead', fallback=300)
+        
+        # Now-playing segment for other local programs (opt-in)
+        self.NOW_PLAYING_ENABLED = config.getboolean('now_playing', 'enabled', fallback=False)
+        self.NOW_PLAYING_FILE = os.path.expanduser(config.get(
+            'now_playing', 'path', fallback='~/.spotify_milkdrop_overlay/now_playing.bin'
+        ))
+        
+        # Metrics endpoint (opt-in)
+        self.METRICS_ENABLED = config.getboolean('metrics', 'enabled', fallback=False)
+        self.METRICS_HOST = config.get('metrics', 'host', fallback='127.0.0.1')
+        self.METRICS_PORT = config.getint('metrics', 'port', fallback=9464)
+        
+        # Profiling (opt-in; SPOTIFY_OVERLAY_PROFILE=1 also turns it on)
+        self.PROFILING_ENABLED = config.getboolean('profiling', 'enabled', fallback=False) or \
+            os.environ.get('SPOTIFY_OVERLAY_PROFILE', '') not in ('', '0')
+        self.PROFILE_DIR = os.path.expanduser(config.get(
+            'profiling', 'profile_dir', fallback='~/.spotify_milkdrop_overlay/profiles'
+        ))
+        self.PROFILE_WINDOW = config.getfloat('profiling', 'window', fallback=60)
+        self.PROFILE_TOP = config.getint('profiling', 'top', fallback=25)
+        
+        # Album art cache settings from INI
+        self.ART_CACHE_ENTRIES = config.getint('cache', 'memory_entries', fallback=64)
+        self.ART_CACHE_MEMORY_MB = config.getfloat('cache', 'memory_mb', fallback=8)
+        self.ART_CACHE_DISK_MB = config.getfloat('cache', 'disk_mb', fallback=50)
+        self.ART_CACHE_DIR = os.path.expanduser(config.get(
+            'cache', 'cache_dir',
+            fallback=os.path.join('~', '.spotify_milkdrop_overlay', 'album_art')
+        ))
+        
+        # Multi-account mode: one overlay per [account NAME] section, all in
+        # one process. Credentials default to the [spotify] ones
+        self.ACCOUNTS = []
+        for section in config.sections():
+            if not section.startswith('account '):
+                continue
+            name = section[len('account '):].strip()
+            self.ACCOUNTS.append({
+                'name': name,
+                'client_id': config.get(section, 'client_id', fallback=self.CLIENT_ID),
+                'client_secret': config.get(section, 'client_secret', fallback=self.CLIENT_SECRET),
+                'token_file': os.path.expanduser(config.get(
+                    section, 'token_file',
+                    fallback=os.path.join('~', '.spotify_milkdrop_overlay', f'tokens-{name}.json')
+                )),
+                'position_x': config.getint(section, 'position_x', fallback=None),
+                'position_y_from_bottom': config.getint(section, 'position_y_from_bottom',
+                                                        fallback=None),
+            })
+
+
+def load_settings(path=config_file):
+    """Read settings from an INI file; raises FileNotFoundError if it is missing"""
+    config = configparser.ConfigParser()
+    if not config.read(path):
+        raise FileNotFoundError(path)
+    return Settings(config)
+
+
+def apply_settings(settings, names=None):
+    """Make settings (or only the named ones) the configuration used by the whole module
+    
+    Objects created earlier keep the settings they were built with; the
+    overlay updates itself for the settings in LIVE_SETTINGS.
+    """
+    values = vars(settings)
+    if names is not None:
+        values = {name: values[name] for name in names}
+    globals().update(values)
+
+
+def changed_settings(settings):
+    """Names of the settings whose value differs from the ones in use"""
+    return {name for name, value in vars(settings).items() if globals().get(name) != value}
+
+
+def validate_settings(settings):
+    """Raise ValueError describing every value the overlay can't use"""
+    problems = []
+    if not 0 <= settings.OPACITY <= 1:
+        problems.append("opacity must be between 0 and 1")
+    for name in ('UPDATE_INTERVAL', 'MIN_POLL_INTERVAL', 'MAX_POLL_INTERVAL', 'FRAME_RATE',
+                 'SCROLL_SPEED', 'WINDOW_WIDTH', 'WINDOW_HEIGHT', 'TRACK_FONT_SIZE',
+                 'ARTIST_FONT_SIZE', 'TIME_FONT_SIZE', 'ALBUM_ART_SIZE'):
+        if getattr(settings, name) <= 0:
+            problems.append(f"{name.lower()} must be positive")
+    for name in ('TRACK_END_MARGIN', 'PROGRESS_TOLERANCE_MS', 'PROGRESS_SMOOTHING',
+                 'FADE_DURATION', 'SCROLL_PAUSE', 'RETRY_MAX_DELAY', 'BREAKER_COOLDOWN'):
+        if getattr(settings, name) < 0:
+            problems.append(f"{name.lower()} must not be negative")
+    if settings.FADE_EASING not in EASINGS:
+        problems.append(f"fade_easing must be one of {', '.join(EASINGS)}")
+    if settings.TRANSITION not in ('fade', 'crossfade'):
+        problems.append("transition must be fade or crossfade")
+    if settings.RENDERER not in ('widgets', 'pillow'):
+        problems.append("renderer must be widgets or pillow")
+    if settings.ART_RESAMPLE.lower() not in ('nearest', 'bilinear', 'bicubic', 'lanczos'):
+        problems.append("art_resample must be nearest, bilinear, bicubic or lanczos")
+    if problems:
+        raise ValueError('; '.join(problems))
+
+
+# Settings the running overlay picks up from an edited config.ini; anything
+# else (credentials, network, cache, ...) needs a restart
+LIVE_SETTINGS = frozenset({
+    'OPACITY', 'UPDATE_INTERVAL', 'MIN_POLL_INTERVAL', 'MAX_POLL_INTERVAL', 'TRACK_END_MARGIN',
+    'PROGRESS_TOLERANCE_MS', 'PROGRESS_SMOOTHING', 'FRAME_RATE', 'FADE_DURATION', 'FADE_EASING',
+    'TRANSITION', 'SCROLL_SPEED',
+    'SCROLL_PAUSE', 'WINDOW_WIDTH', 'WINDOW_HEIGHT', 'POSITION_X', 'POSITION_Y_FROM_BOTTOM',
+    'PROGRESS_COLOR', 'TRACK_COLOR', 'ARTIST_COLOR', 'TRACK_FONT_SIZE', 'ARTIST_FONT_SIZE',
+    'TIME_FONT_SIZE', 'ALBUM_ART_SIZE', 'ART_RESAMPLE', 'ALBUM_COLORS', 'RETRY_MAX_DELAY',
+    'BREAKER_THRESHOLD', 'BREAKER_COOLDOWN',
+})
+
+
+def apply_live_settings(settings, root):
+    """Apply the changed LIVE_SETTINGS of settings; returns their names
+    
+    Changes that need a restart are only reported. Colors are checked with
+    Tk (through root) first; if one is rejected nothing is applied.
+    """
+    changed = changed_settings(settings)
+    live = changed & LIVE_SETTINGS
+    restart = changed - LIVE_SETTINGS
+    if restart:
+        print(f"Restart to apply: {', '.join(sorted(name.lower() for name in restart))}")
+    if not live:
+        return set()
+    
+    try:
+        for name in live & {'PROGRESS_COLOR', 'TRACK_COLOR', 'ARTIST_COLOR'}:
+            root.winfo_rgb(getattr(settings, name))
+    except Exception as e:
+        print(f"Ignoring config change: {e}")
+        return set()
+    
+    apply_settings(settings, live)
+    print(f"Applied config changes: {', '.join(sorted(name.lower() for name in live))}")
+    return live
+
+
+class ConfigWatcher:
+    """Watch config.ini for edits by polling its modification time
+    
+    Runs on its own thread: each edit is parsed and validated there, and
+    only a valid result is passed to on_change. An invalid edit is reported
+    once and otherwise ignored.
+    """
+    
+    def __init__(self, path, on_change, interval=None):
+        self.path = path
+        self.on_change = on_change
+        self.interval = RELOAD_INTERVAL if interval is None else interval
+        self.running = False
+        self.signature = self.stat()
+        
+        # Counters
+        self.reloads = 0
+        self.rejected = 0
+    
+    def stat(self):
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return info.st_mtime_ns, info.st_size
+    
+    def check(self):
+        """Load the file if it changed; returns the new settings, or None"""
+        signature = self.stat()
+        if signature is None or signature == self.signature:
+            return None
+        self.signature = signature
+        
+        try:
+            settings = load_settings(self.path)
+            validate_settings(settings)
+        except (OSError, ValueError, configparser.Error) as e:
+            self.rejected += 1
+            print(f"Ignoring invalid {self.path}: {e}")
+            return None
+        
+        self.reloads += 1
+        self.on_change(settings)
+        return settings
+    
+    def run(self):
+        while self.running:
+            time.sleep(self.interval)
+            self.check()
+    
+    def start(self):
+        """Start watching in a background thread"""
+        self.running = True
+        Thread(target=self.run, daemon=True).start()
+        return self
+    
+    def stop(self):
+        self.running = False
+
+
+apply_settings(Settings())
+
+# Spotify endpoints (one connection pool is kept per host)
+ACCOUNTS_BASE_URL = "https://accounts.spotify.com"
+API_BASE_URL = "https://api.spotify.com"
+IMAGE_BASE_URL = "https://i.scdn.co"
+
+# Token storage (the single-overlay account; see DefaultAccount)
 access_token = None
 refresh_token = None
 token_expires = 0
@@ -55,9 +349,313 @@ token_expires = 0
 # Callback capture
 auth_code_received = None
 
+# Shared HTTP client and album art cache (created on first use)
+http_client = None
+album_art_cache = None
+
+
+class Metrics:
+    """Thread-safe counters and histograms, rendered in Prometheus text format
+    
+    Values that already live elsewhere (cache hits, frame counters, thread
+    count) are read at scrape time by collector functions rather than
+    being copied here.
+    """
+    
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    
+    HELP = {
+        'spotify_poll_duration_seconds': 'Time taken by one currently-playing poll',
+        'spotify_http_responses_total': 'HTTP responses from Spotify by host and status',
+        'spotify_token_refreshes_total': 'Access token refreshes by result',
+        'spotify_token_refresh_duration_seconds': 'Time taken by one token refresh',
+        'overlay_art_download_duration_seconds': 'Album art download time',
+        'overlay_art_decode_duration_seconds': 'Album art decode and resize time',
+        'overlay_track_change_paint_seconds': 'Time from seeing a new track to showing it',
+        'overlay_compose_duration_seconds': 'Time taken to composite one frame offscreen',
+        'overlay_threads': 'Threads running in the process',
+        'overlay_tk_callbacks_total': 'Tk callbacks run by the frame scheduler, by kind',
+        'overlay_art_cache_lookups_total': 'Album art cache lookups by result',
+        'overlay_art_cache_bytes': 'Album art held in the memory cache',
+        'spotify_poll_retries_total': 'Polls retried after an error',
+        'spotify_circuit_open': 'Whether the circuit breaker is stopping polls (1) or not (0)',
+    }
+    
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+    
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted(labels.items())) if labels else ()
+    
+    def inc(self, name, value=1, **labels):
+        """Add to a counter"""
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def observe(self, name, value, **labels):
+        """Record one sample in a histogram
+        
+        Only the sample's own bucket is counted here (polls call this every
+        time); render() adds them up into Prometheus' cumulative buckets.
+        """
+        key = self.key(name, labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+    
+    def add_collector(self, func):
+        """Register func() -> [(name, type, value, labels)] to be read on each scrape"""
+        self.collectors.append(func)
+    
+    def remove_collector(self, func):
+        if func in self.collectors:
+            self.collectors.remove(func)
+    
+    @staticmethod
+    def escape(value):
+        """A label value as the text format needs it (account names are user-supplied)"""
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    
+    @classmethod
+    def format_labels(cls, labels, **extra):
+        items = list(labels) + list(extra.items())
+        if not items:
+            return ''
+        return '{' + ','.join(f'{k}="{cls.escape(v)}"' for k, v in items) + '}'
+    
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        families = {}
+        with self.lock:
+            for (name, labels), value in self.counters.items():
+                families.setdefault((name, 'counter'), []).append(
+                    f'{name}{self.format_labels(labels)} {value}')
+            for (name, labels), (counts, total, count) in self.histograms.items():
+                lines = families.setdefault((name, 'histogram'), [])
+                for bound, bucket in zip(self.buckets, itertools.accumulate(counts)):
+                    lines.append(f'{name}_bucket{self.format_labels(labels, le=bound)} {bucket}')
+                lines.append(f'{name}_bucket{self.format_labels(labels, le="+Inf")} {count}')
+                lines.append(f'{name}_sum{self.format_labels(labels)} {total}')
+                lines.append(f'{name}_count{self.format_labels(labels)} {count}')
+        
+        for collector in list(self.collectors):
+            try:
+                samples = collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+                continue
+            for name, kind, value, labels in samples:
+                families.setdefault((name, kind), []).append(
+                    f'{name}{self.format_labels(sorted(labels.items()))} {value}')
+        
+        out = []
+        for (name, kind), lines in sorted(families.items()):
+            if name in self.HELP:
+                out.append(f'# HELP {name} {self.HELP[name]}')
+            out.append(f'# TYPE {name} {kind}')
+            out.extend(lines)
+        return '\n'.join(out) + '\n'
+
+
+metrics = Metrics()
+
+
+def collect_process_metrics():
+    """Collector: thread count"""
+    return [('overlay_threads', 'gauge', threading.active_count(), {})]
+
+
+metrics.add_collector(collect_process_metrics)
+
+
+class MetricsRoutes:
+    """Serve the metrics at /metrics (the body of MetricsHandler)"""
+    
+    def do_GET(self):
+        if urlparse(self.path).path != '/metrics':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host=None, port=None):
+    """Serve /metrics from a background thread; returns the server"""
+    address = (METRICS_HOST if host is None else host, METRICS_PORT if port is None else port)
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer(address, http_handler('MetricsHandler'))
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@functools.lru_cache(maxsize=64)
+def url_host(url):
+    """The host[:port] of url; polls ask for the same few URLs over and over"""
+    return urlparse(url).netloc
+
+
+class HTTPClient:
+    """Keep-alive HTTP client shared by every Spotify call"""
+    
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None, hosts=None):
+        pool_size = POOL_SIZE if pool_size is None else pool_size
+        self.timeout = (CONNECT_TIMEOUT if connect_timeout is None else connect_timeout,
+                        READ_TIMEOUT if read_timeout is None else read_timeout)
+        self.hosts = list(hosts or (API_BASE_URL, ACCOUNTS_BASE_URL, IMAGE_BASE_URL))
+        self.session = requests.Session()
+        self.local = threading.local()  # per-thread deadline (monotonic time)
+        
+        # Default pool for anything else (e.g. other image CDN hosts)
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=pool_size))
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=pool_size))
+        
+        # Dedicated pool per known host so they never evict each other
+        for host in self.hosts:
+            self.session.mount(host.rstrip('/') + '/', requests.adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=pool_size
+            ))
+    
+    def get(self, url, **kwargs):
+        """GET with the configured connect/read timeouts"""
+        kwargs.setdefault('timeout', self.request_timeout())
+        return self.count_response(url, self.session.get, url, **kwargs)
+    
+    def post(self, url, **kwargs):
+        """POST with the configured connect/read timeouts"""
+        kwargs.setdefault('timeout', self.request_timeout())
+        return self.count_response(url, self.session.post, url, **kwargs)
+    
+    def request_timeout(self):
+        """The connect/read timeouts, cut to what is left of this thread's deadline"""
+        deadline = getattr(self.local, 'deadline', None)
+        if deadline is None:
+            return self.timeout
+        left = max(0.01, deadline - time.monotonic())
+        return tuple(min(timeout, left) for timeout in self.timeout)
+    
+    def run_with_deadline(self, seconds, func, *args):
+        """Call func(*args) with every request in it capped to finish within seconds"""
+        self.local.deadline = time.monotonic() + seconds
+        try:
+            return func(*args)
+        finally:
+            self.local.deadline = None
+    
+    @staticmethod
+    def count_response(url, send, *args, **kwargs):
+        """Make a request, counting the response status per host"""
+        host = url_host(url)
+        try:
+            response = send(*args, **kwargs)
+        except requests.RequestException:
+            metrics.inc('spotify_http_responses_total', host=host, status='error')
+            raise
+        metrics.inc('spotify_http_responses_total', host=host, status=response.status_code)
+        return response
+    
+    def warm_up(self, hosts=None):
+        """Open a connection to each host so the first real request skips the handshake"""
+        warmed = 0
+        for host in hosts or self.hosts:
+            try:
+                self.session.head(host, timeout=self.timeout)
+                warmed += 1
+            except requests.RequestException:
+                pass
+        return warmed
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class SpotifyAccount:
+    """One Spotify login: app credentials, token file and current tokens
+    
+    Every auth and API function takes an optional account; without one they
+    use default_account, the account configured under [spotify].
+    """
+    
+    def __init__(self, name, client_id, client_secret, token_file=None):
+        self.name = name
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_file = token_file
+        self.access_token = None
+        self.refresh_token = None
+        self.token_expires = 0
+
+
+def module_global(name):
+    """Property reading and writing the module global name"""
+    return property(lambda self: globals()[name],
+                    lambda self, value: globals().__setitem__(name, value))
+
+
+class DefaultAccount(SpotifyAccount):
+    """The [spotify] account, kept in the module globals
+    
+    Settings applied later (apply_settings) and code that reads or patches
+    CLIENT_ID, TOKEN_FILE, access_token etc. directly see the same values.
+    """
+    
+    name = ''
+    client_id = module_global('CLIENT_ID')
+    client_secret = module_global('CLIENT_SECRET')
+    token_file = module_global('TOKEN_FILE')
+    access_token = module_global('access_token')
+    refresh_token = module_global('refresh_token')
+    token_expires = module_global('token_expires')
+    
+    def __init__(self):
+        pass
+
+
+default_account = DefaultAccount()
+
+
+class SpotifyAPIError(Exception):
+    """Spotify answered with a rate limit (429) or server error (5xx)"""
+    
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"Spotify API returned {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def get_http_client():
+    """Return the shared HTTP client, creating it on first use"""
+    global http_client
+    
+    if http_client is None:
+        http_client = HTTPClient()
+    return http_client
+
 
-class CallbackHandler(BaseHTTPRequestHandler):
-    """HTTP handler to capture OAuth callback"""
+class CallbackRoutes:
+    """HTTP handler to capture OAuth callback (the body of CallbackHandler)"""
     
     def do_GET(self):
         """Handle the OAuth callback"""
@@ -107,12 +705,36 @@ class CallbackHandler(BaseHTTPRequestHandler):
         pass
 
 
+# http.server is only imported once one of its handlers is needed
+HTTP_HANDLERS = {}
+HTTP_ROUTES = {'CallbackHandler': CallbackRoutes, 'MetricsHandler': MetricsRoutes}
+
+
+def http_handler(name):
+    """Request handler class combining HTTP_ROUTES[name] with BaseHTTPRequestHandler"""
+    handler = HTTP_HANDLERS.get(name)
+    if handler is None:
+        from http.server import BaseHTTPRequestHandler
+        routes = HTTP_ROUTES[name]
+        handler = HTTP_HANDLERS[name] = type(name, (routes, BaseHTTPRequestHandler),
+                                             {'__doc__': routes.__doc__})
+    return handler
+
+
+def __getattr__(name):
+    """Build CallbackHandler and MetricsHandler on first access"""
+    if name in HTTP_ROUTES:
+        return http_handler(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def wait_for_callback(port=8888, timeout=120):
     """Start a local server and wait for the OAuth callback"""
     global auth_code_received
     auth_code_received = None
     
-    server = HTTPServer(('127.0.0.1', port), CallbackHandler)
+    from http.server import HTTPServer
+    server = HTTPServer(('127.0.0.1', port), http_handler('CallbackHandler'))
     server.timeout = 1  # Check every second
     
     print(f"Waiting for authorization (timeout: {timeout} seconds)...")
@@ -122,132 +744,2167 @@ def wait_for_callback(port=8888, timeout=120):
     while auth_code_received is None and (time.time() - start_time) < timeout:
         server.handle_request()
     
-    if auth_code_received:
-        return auth_code_received
-    else:
-        print("Timeout waiting for authorization.")
-        return None
-
-
-def get_auth_url():
-    """Generate Spotify authorization URL"""
-    params = {
-        'client_id': CLIENT_ID,
-        'response_type': 'code',
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPE
-    }
-    return f"https://accounts.spotify.com/authorize?{urlencode(params)}"
+    if auth_code_received:
+        return auth_code_received
+    else:
+        print("Timeout waiting for authorization.")
+        return None
+
+
+def get_auth_url(account=None):
+    """Generate Spotify authorization URL"""
+    account = account or default_account
+    params = {
+        'client_id': account.client_id,
+        'response_type': 'code',
+        'redirect_uri': REDIRECT_URI,
+        'scope': SCOPE
+    }
+    return f"{ACCOUNTS_BASE_URL}/authorize?{urlencode(params)}"
+
+
+def get_token_from_code(auth_code, account=None):
+    """Exchange authorization code for access token"""
+    account = account or default_account
+    
+    auth_string = f"{account.client_id}:{account.client_secret}"
+    auth_bytes = auth_string.encode('utf-8')
+    auth_base64 = base64.b64encode(auth_bytes).decode('utf-8')
+    
+    url = f"{ACCOUNTS_BASE_URL}/api/token"
+    headers = {
+        'Authorization': f'Basic {auth_base64}',
+        'Content-Type': 'application/x-www-form-urlencoded'
+    }
+    data = {
+        'grant_type': 'authorization_code',
+        'code': auth_code,
+        'redirect_uri': REDIRECT_URI
+    }
+    
+    response = get_http_client().post(url, headers=headers, data=data)
+    if response.status_code == 200:
+        json_result = response.json()
+        account.access_token = json_result['access_token']
+        account.refresh_token = json_result.get('refresh_token')
+        account.token_expires = time.time() + json_result['expires_in']
+        save_tokens(account=account)
+        return True
+    return False
+
+
+def refresh_access_token(account=None):
+    """Refresh the access token using refresh token"""
+    account = account or default_account
+    
+    if not account.refresh_token:
+        return False
+    
+    auth_string = f"{account.client_id}:{account.client_secret}"
+    auth_bytes = auth_string.encode('utf-8')
+    auth_base64 = base64.b64encode(auth_bytes).decode('utf-8')
+    
+    url = f"{ACCOUNTS_BASE_URL}/api/token"
+    headers = {
+        'Authorization': f'Basic {auth_base64}',
+        'Content-Type': 'application/x-www-form-urlencoded'
+    }
+    data = {
+        'grant_type': 'refresh_token',
+        'refresh_token': account.refresh_token
+    }
+    
+    start = time.perf_counter()
+    try:
+        response = get_http_client().post(url, headers=headers, data=data)
+    except Exception:
+        metrics.inc('spotify_token_refreshes_total', result='error')
+        raise
+    metrics.observe('spotify_token_refresh_duration_seconds', time.perf_counter() - start)
+    if response.status_code == 200:
+        json_result = response.json()
+        account.access_token = json_result['access_token']
+        # Spotify may rotate the refresh token
+        account.refresh_token = json_result.get('refresh_token', account.refresh_token)
+        account.token_expires = time.time() + json_result['expires_in']
+        save_tokens(account=account)
+        metrics.inc('spotify_token_refreshes_total', result='ok')
+        return True
+    metrics.inc('spotify_token_refreshes_total', result='failed')
+    return False
+
+
+def save_tokens(path=None, account=None):
+    """Save the tokens so the next start can skip the browser (owner-only file)"""
+    account = account or default_account
+    path = path or account.token_file
+    if not path or not account.refresh_token:
+        return False
+    
+    data = {
+        'client_id': account.client_id,
+        'access_token': account.access_token,
+        'refresh_token': account.refresh_token,
+        'token_expires': account.token_expires
+    }
+    
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.chmod(temp_path, 0o600)
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        print(f"Error saving tokens: {e}")
+        return False
+
+
+def load_tokens(path=None, account=None):
+    """Load saved tokens for this client ID; returns True if a refresh token was found"""
+    account = account or default_account
+    path = path or account.token_file
+    if not path:
+        return False
+    
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return False
+    
+    if data.get('client_id') != account.client_id or not data.get('refresh_token'):
+        return False
+    
+    account.access_token = data.get('access_token')
+    account.refresh_token = data['refresh_token']
+    account.token_expires = data.get('token_expires', 0) if account.access_token else 0
+    return True
+
+
+def restore_saved_session(account=None):
+    """Authenticate from the token file without a browser; returns True on success"""
+    account = account or default_account
+    if not load_tokens(account=account):
+        return False
+    
+    if time.time() < account.token_expires - 60:
+        print("✓ Using saved access token\n")
+        return True
+    
+    print("Refreshing saved Spotify token...")
+    try:
+        if refresh_access_token(account):
+            print("✓ Authentication successful!\n")
+            return True
+    except requests.RequestException as e:
+        print(f"Error refreshing saved token: {e}")
+    
+    print("✗ Saved token is no longer valid.\n")
+    return False
+
+
+def get_auth_header(account=None):
+    """Get authorization header, refreshing token if needed"""
+    account = account or default_account
+    
+    # Check if token needs refresh
+    if time.time() >= account.token_expires - 60:  # Refresh 1 minute before expiry
+        if not refresh_access_token(account):
+            raise Exception("Failed to refresh token")
+    
+    return {'Authorization': f'Bearer {account.access_token}'}
+
+
+class PlaybackSnapshot:
+    """One poll's playback state, keyed by the Spotify track ID
+    
+    Immutable: every poll builds a new one, and the overlay publishes it by
+    assigning a single reference, so readers on any thread always see one
+    whole poll without locking. progress_ms is as of sampled_at on the
+    monotonic clock: the middle of a request that took rtt seconds.
+    timestamp is Spotify's (Unix ms of the last play/pause/seek/skip).
+    """
+    
+    __slots__ = ('track_id', 'track', 'artist', 'album', 'album_art_url', 'progress_ms',
+                 'duration_ms', 'is_playing', 'sampled_at', 'rtt', 'timestamp')
+    
+    def __init__(self, track_id, track, artist, album='', album_art_url=None, progress_ms=0,
+                 duration_ms=0, is_playing=False, sampled_at=None, rtt=0.0, timestamp=None):
+        # Spelled out rather than looped over __slots__: one is built per poll
+        set_field = object.__setattr__
+        set_field(self, 'track_id', track_id)
+        set_field(self, 'track', track)
+        set_field(self, 'artist', artist)
+        set_field(self, 'album', album)
+        set_field(self, 'album_art_url', album_art_url)
+        set_field(self, 'progress_ms', progress_ms)
+        set_field(self, 'duration_ms', duration_ms)
+        set_field(self, 'is_playing', is_playing)
+        set_field(self, 'sampled_at', time.monotonic() if sampled_at is None else sampled_at)
+        set_field(self, 'rtt', rtt)
+        set_field(self, 'timestamp', timestamp)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.track_id!r}, {self.track!r}, {self.artist!r})"
+    
+    def replace(self, **changes):
+        """A copy with some fields changed"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+    
+    def position_ms(self, now=None):
+        """Progress extrapolated to now (time.monotonic()), up to the track's end"""
+        if not self.is_playing:
+            return self.progress_ms
+        elapsed = ((time.monotonic() if now is None else now) - self.sampled_at) * 1000
+        return min(self.duration_ms, self.progress_ms + elapsed)
+
+
+def get_current_track(account=None):
+    """Get currently playing track with album art and progress (a PlaybackSnapshot or None)"""
+    start = time.perf_counter()
+    try:
+        return fetch_current_track(account)
+    finally:
+        metrics.observe('spotify_poll_duration_seconds', time.perf_counter() - start)
+
+
+def fetch_current_track(account=None):
+    """One currently-playing request, parsed"""
+    headers = get_auth_header(account)
+    url = f"{API_BASE_URL}/v1/me/player/currently-playing"
+    
+    # Spotify samples progress somewhere in the round trip; assume the middle
+    sent = time.monotonic()
+    response = get_http_client().get(url, headers=headers)
+    rtt = time.monotonic() - sent
+    
+    if response.status_code == 429 or response.status_code >= 500:
+        retry_after = response.headers.get('Retry-After')
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+        raise SpotifyAPIError(response.status_code, retry_after)
+    
+    # content, not text: no need to decode the body just to see it's empty
+    if response.status_code == 200 and response.content:
+        data = response.json()
+        
+        if data and data.get('item'):
+            track = data['item']
+            
+            # Get album art (smallest image that still covers the art size)
+            album_art_url = None
+            if track.get('album') and track['album'].get('images'):
+                album_art_url = select_album_art(track['album']['images'])
+            
+            artist = ', '.join([artist['name'] for artist in track['artists']])
+            return PlaybackSnapshot(
+                # Local files have no ID, only a URI
+                track_id=track.get('id') or track.get('uri') or f"{track['name']}|{artist}",
+                track=track['name'],
+                artist=artist,
+                album=track['album']['name'],
+                album_art_url=album_art_url,
+                progress_ms=data.get('progress_ms') or 0,
+                duration_ms=track.get('duration_ms', 0),
+                is_playing=data.get('is_playing', False),
+                sampled_at=sent + rtt / 2,
+                rtt=rtt,
+                timestamp=data.get('timestamp')
+            )
+    
+    return None
+
+
+def select_album_art(images, size=None):
+    """Pick the URL of the smallest image variant that still covers size x size"""
+    size = ALBUM_ART_SIZE if size is None else size
+    best = None
+    for image in images:
+        width = image.get('width') or 0
+        height = image.get('height') or 0
+        if not width or not height:
+            continue
+        side = min(width, height)
+        if side >= size and (best is None or side < best[0]):
+            best = (side, image['url'])
+    
+    if best:
+        return best[1]
+    
+    # Nothing big enough (or no sizes given): take the largest, listed first
+    return images[0]['url']
+
+
+def decode_album_art(data, size=None, resample=None):
+    """Decode downloaded album art and resize it to size x size"""
+    size = ALBUM_ART_SIZE if size is None else size
+    resample = resample or ART_RESAMPLE
+    image = Image.open(BytesIO(data))
+    
+    # JPEG only: let the decoder scale down by 1/2, 1/4 or 1/8 while decoding
+    image.draft('RGB', (size, size))
+    
+    resample_filter = getattr(Image.Resampling, resample.upper(), Image.Resampling.LANCZOS)
+    image = image.resize((size, size), resample_filter, reducing_gap=3.0)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    return image
+
+
+def extract_theme(image, sample=48):
+    """Progress bar and text colors for a piece of album art, or None
+    
+    Works on the already resized art, subsampled to at most sample x sample
+    pixels. Colors are quantized to 4 bits per channel and the bin with the
+    most colorful pixels becomes the accent; the text colors are the accent
+    blended into the default white and gray. Returns None for (nearly)
+    grayscale art, which keeps the configured colors, and without NumPy.
+    """
+    if np is None:
+        return None
+    pixels = np.asarray(image.convert('RGB'), dtype=np.uint8)
+    step = max(1, -(-max(pixels.shape[:2]) // sample))
+    pixels = pixels[::step, ::step].reshape(-1, 3).astype(np.int32)
+    
+    bins = (pixels[:, 0] >> 4) << 8 | (pixels[:, 1] >> 4) << 4 | pixels[:, 2] >> 4
+    counts = np.bincount(bins, minlength=4096)
+    used = np.flatnonzero(counts)
+    means = np.stack([np.bincount(bins, weights=pixels[:, channel], minlength=4096)[used]
+                      for channel in range(3)], axis=1) / counts[used, None]
+    
+    # Prefer common, saturated colors that aren't too dark to see on black
+    brightest = means.max(axis=1)
+    saturation = (brightest - means.min(axis=1)) / np.maximum(brightest, 1)
+    score = counts[used] * saturation * (brightest >= 40)
+    best = int(score.argmax())
+    if saturation[best] < 0.15 or score[best] == 0:
+        return None
+    
+    # Lift dark accents so the bar stands out against the black background
+    accent = means[best] * max(1.0, 200 / brightest[best])
+    accent = np.minimum(accent, 255)
+    
+    def hex_color(rgb):
+        return '#' + ''.join(f'{int(round(c)):02x}' for c in rgb)
+    
+    return {
+        'progress': hex_color(accent),
+        'track': hex_color(accent * 0.2 + 255 * 0.8),
+        'artist': hex_color(accent * 0.4 + 179 * 0.6),
+    }
+
+
+class AlbumArtCache:
+    """Two-tier cache of resized album art: an in-memory LRU backed by disk
+    
+    Both tiers hold the final, already-resized image keyed by album art URL.
+    The disk tier stores raw pixels, so a hit there costs a file read but no
+    download and no JPEG decode or resample.
+    """
+    
+    def __init__(self, cache_dir=None, max_entries=None, max_memory_bytes=None,
+                 max_disk_bytes=None, max_themes=1024):
+        self.cache_dir = ART_CACHE_DIR if cache_dir is None else cache_dir
+        self.max_entries = ART_CACHE_ENTRIES if max_entries is None else max_entries
+        self.max_memory_bytes = int(ART_CACHE_MEMORY_MB * 1024 * 1024) \
+            if max_memory_bytes is None else max_memory_bytes
+        self.max_disk_bytes = int(ART_CACHE_DISK_MB * 1024 * 1024) \
+            if max_disk_bytes is None else max_disk_bytes
+        self.lock = Lock()
+        
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        
+        # Album colors by art URL; tiny, so many more are kept than images
+        self.themes = OrderedDict()
+        self.max_themes = max_themes
+        
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(url):
+        """Content address for a URL"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def image_bytes(image):
+        """Approximate decoded size of an image"""
+        width, height = image.size
+        return width * height * len(image.mode)
+    
+    def path(self, url):
+        return os.path.join(self.cache_dir, self.key(url) + '.art')
+    
+    def get(self, url):
+        """Return the cached image for url, or None"""
+        with self.lock:
+            image = self.memory.get(url)
+            if image is not None:
+                self.memory.move_to_end(url)
+                self.memory_hits += 1
+                return image
+        
+        image = self.read_disk(url)
+        with self.lock:
+            if image is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.remember(url, image)
+        return image
+    
+    def put(self, url, image):
+        """Store a resized image in both tiers"""
+        with self.lock:
+            self.remember(url, image)
+        self.write_disk(url, image)
+    
+    def remember(self, url, image):
+        """Add to the memory LRU, evicting the oldest entries (lock held)"""
+        if url in self.memory:
+            self.memory_bytes -= self.image_bytes(self.memory.pop(url))
+        self.memory[url] = image
+        self.memory_bytes += self.image_bytes(image)
+        
+        while self.memory and (len(self.memory) > self.max_entries or
+                               self.memory_bytes > self.max_memory_bytes):
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= self.image_bytes(evicted)
+    
+    def theme(self, url, image=None):
+        """The album colors for url (see extract_theme), extracted from image once
+        
+        Without an image only already extracted colors are returned; None
+        means unknown or none.
+        """
+        with self.lock:
+            if url in self.themes:
+                self.themes.move_to_end(url)
+                return self.themes[url]
+        if image is None:
+            return None
+        
+        theme = extract_theme(image)
+        with self.lock:
+            self.themes[url] = theme
+            while len(self.themes) > self.max_themes:
+                self.themes.popitem(last=False)
+        return theme
+    
+    def read_disk(self, url):
+        """Load raw pixels from the disk tier"""
+        path = self.path(url)
+        try:
+            with open(path, 'rb') as f:
+                header = f.readline().decode('ascii').split()
+                pixels = f.read()
+            mode, width, height = header[0], int(header[1]), int(header[2])
+            image = Image.frombytes(mode, (width, height), pixels)
+            os.utime(path)  # Mark as recently used for eviction
+            return image
+        except (OSError, ValueError, IndexError):
+            return None
+    
+    def write_disk(self, url, image):
+        """Save raw pixels to the disk tier and evict the least recently used files"""
+        path = self.path(url)
+        header = f"{image.mode} {image.size[0]} {image.size[1]}\n".encode('ascii')
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(header)
+                f.write(image.tobytes())
+            os.replace(temp_path, path)
+            self.evict_disk()
+        except OSError as e:
+            print(f"Error writing album art cache: {e}")
+    
+    def evict_disk(self):
+        """Delete the least recently used files until under the size limit"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.art'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
+    
+    def stats(self):
+        """Hit/miss counters for both tiers"""
+        with self.lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self.memory),
+                'memory_bytes': self.memory_bytes,
+            }
+
+
+def get_album_art_cache():
+    """Return the shared album art cache, creating it on first use"""
+    global album_art_cache
+    
+    if album_art_cache is None:
+        album_art_cache = AlbumArtCache()
+    return album_art_cache
+
+
+class AlbumArtLoader:
+    """Run album art downloads and decodes on a worker pool
+    
+    Only the result of the most recent request is delivered; anything that
+    finishes after a newer request (or a cancel) is dropped as stale.
+    Loaders of several overlays can share one executor.
+    """
+    
+    def __init__(self, workers=None, executor=None):
+        self.owns_executor = executor is None
+        self.executor = executor or futures.ThreadPoolExecutor(
+            max_workers=workers or ART_WORKERS, thread_name_prefix='album-art'
+        )
+        self.lock = Lock()
+        self.generation = 0
+        
+        # Counters
+        self.delivered = 0
+        self.dropped = 0
+    
+    def submit(self, func, url, on_done):
+        """Run func(url) on a worker and pass the result to on_done(result, generation)"""
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+        
+        def done(future):
+            result = future.result()
+            if result is None or not self.is_current(generation):
+                with self.lock:
+                    self.dropped += 1
+                return
+            with self.lock:
+                self.delivered += 1
+            on_done(result, generation)
+        
+        self.executor.submit(func, url).add_done_callback(done)
+        return generation
+    
+    def is_current(self, generation):
+        """Whether a result still belongs to the latest request"""
+        with self.lock:
+            return generation == self.generation
+    
+    def cancel(self):
+        """Drop the result of any request still in flight"""
+        with self.lock:
+            self.generation += 1
+    
+    def shutdown(self):
+        """Stop the worker pool (unless shared) without waiting for downloads in flight"""
+        self.cancel()
+        if self.owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PollScheduler:
+    """Decide how long to wait before the next Spotify poll"""
+    
+    def __init__(self, interval=None, min_interval=None, max_interval=None, end_margin=None):
+        interval = UPDATE_INTERVAL if interval is None else interval
+        self.interval = interval
+        self.min_interval = min(MIN_POLL_INTERVAL if min_interval is None else min_interval,
+                                interval)
+        self.max_interval = max(MAX_POLL_INTERVAL if max_interval is None else max_interval,
+                                interval)
+        self.end_margin = TRACK_END_MARGIN if end_margin is None else end_margin
+        self.idle_interval = interval
+    
+    def reset(self):
+        """Return to the normal polling rate"""
+        self.idle_interval = self.interval
+    
+    def next_interval(self, track_info, changed=False):
+        """Seconds until the next poll, given the latest poll result"""
+        if changed:
+            self.reset()
+        
+        # Paused or nothing playing: back off step by step
+        if not track_info or not track_info.is_playing:
+            delay = self.idle_interval
+            self.idle_interval = min(self.max_interval, self.idle_interval * 2)
+            return delay
+        
+        self.reset()
+        
+        # Playing: poll just after the predicted end of the track, checking
+        # in at least every max_interval for seeks, skips and pauses
+        delay = self.interval
+        remaining_ms = track_info.duration_ms - track_info.progress_ms
+        if track_info.duration_ms > 0:
+            delay = min(self.max_interval, remaining_ms / 1000 + self.end_margin)
+        
+        return max(self.min_interval, delay)
+
+
+class RetryPolicy:
+    """Jittered exponential backoff between failed polls, honoring Retry-After"""
+    
+    def __init__(self, base_delay=None, max_delay=None):
+        self.base_delay = UPDATE_INTERVAL if base_delay is None else base_delay
+        self.max_delay = max(RETRY_MAX_DELAY if max_delay is None else max_delay, self.base_delay)
+        self.attempt = 0
+        
+        # Counters
+        self.retries = 0
+    
+    def next_delay(self, retry_after=None):
+        """Seconds to wait before retrying after a failure"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** self.attempt)
+        self.attempt += 1
+        self.retries += 1
+        
+        # Equal jitter: at least half the backoff, so retries never bunch up at 0
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+    
+    def reset(self):
+        """Back to the base delay after a successful call"""
+        self.attempt = 0
+
+
+class CircuitBreaker:
+    """Stop calling Spotify after repeated failures
+    
+    closed: calls go through. After `threshold` consecutive failures it
+    opens and blocks calls for `cooldown` seconds (or longer if Spotify sent
+    Retry-After). Then it is half-open: one trial call is let through, which
+    either closes it again or re-opens it.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, threshold=None, cooldown=None, clock=time.monotonic):
+        self.threshold = BREAKER_THRESHOLD if threshold is None else threshold
+        self.cooldown = BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.open_until = 0
+        
+        # Counters
+        self.times_opened = 0
+        self.blocked_calls = 0
+    
+    def time_until_retry(self):
+        """None if a call may go out now, else the seconds until it may"""
+        if self.state == self.OPEN:
+            remaining = self.open_until - self.clock()
+            if remaining > 0:
+                self.blocked_calls += 1
+                return remaining
+            self.state = self.HALF_OPEN
+        return None
+    
+    def record_success(self):
+        """A call succeeded: close the breaker"""
+        self.state = self.CLOSED
+        self.failures = 0
+    
+    def record_failure(self, retry_after=None):
+        """A call failed: open the breaker once the threshold is reached"""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            self.state = self.OPEN
+            self.open_until = self.clock() + max(self.cooldown, retry_after or 0)
+            self.times_opened += 1
+    
+    def stats(self):
+        """Breaker state and counters"""
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'times_opened': self.times_opened,
+            'blocked_calls': self.blocked_calls,
+        }
+
+
+class PlaybackDiff:
+    """Compare each poll result with the previous one, field by field"""
+    
+    FIELDS = ('track_id', 'track', 'artist', 'album', 'album_art_url', 'duration_ms', 'is_playing')
+    
+    def __init__(self, tolerance_ms=None):
+        self.tolerance_ms = PROGRESS_TOLERANCE_MS if tolerance_ms is None else tolerance_ms
+        self.last = None
+        
+        # Counters
+        self.polls = 0
+        self.short_circuited = 0
+    
+    def diff(self, track_info, expected_progress_ms=None):
+        """Return the set of fields that changed since the last poll
+        
+        progress_ms only counts as changed when it is further than the
+        tolerance from expected_progress_ms: the locally extrapolated value
+        at track_info.sampled_at, by default the last poll's. An empty set
+        means the poll needs no UI work at all.
+        """
+        last, self.last = self.last, track_info
+        self.polls += 1
+        
+        if last is None or track_info is None:
+            if last is track_info:
+                changed = set()
+            else:
+                changed = set(self.FIELDS) | {'progress_ms'}
+        else:
+            changed = {field for field in self.FIELDS
+                       if getattr(track_info, field) != getattr(last, field)}
+            
+            if expected_progress_ms is None:
+                expected_progress_ms = last.position_ms(track_info.sampled_at)
+            if abs(track_info.progress_ms - expected_progress_ms) > self.tolerance_ms:
+                changed.add('progress_ms')
+        
+        if not changed:
+            self.short_circuited += 1
+        return changed
+    
+    def reset(self):
+        """Forget the last snapshot so the next poll counts as a full change"""
+        self.last = None
+
+
+class ProgressEstimator:
+    """Playback position on the monotonic clock, corrected without jumps
+    
+    Every poll of the shown track is a measurement: progress_ms as of the
+    middle of its request, carried forward to now. Differences up to
+    snap_ms are slewed out over smoothing seconds (the display runs between
+    0.5x and 1.5x speed meanwhile, never backwards). Bigger differences,
+    play/pause and small ones that come with a new Spotify timestamp (a
+    seek) are applied at once.
+    
+    The state is one tuple, replaced as a whole, so the Tk thread can read
+    positions while the poll thread updates without a lock.
+    """
+    
+    def __init__(self, snap_ms=None, smoothing=None, clock=time.monotonic):
+        self.snap_ms = PROGRESS_TOLERANCE_MS if snap_ms is None else snap_ms
+        self.smoothing = PROGRESS_SMOOTHING if smoothing is None else smoothing
+        self.clock = clock
+        # (base_ms, base_time, is_playing, duration_ms, offset_ms, offset_time, slew, timestamp)
+        self.state = None
+        
+        # Counters
+        self.snaps = 0
+        self.slews = 0
+    
+    def position_ms(self, now=None):
+        """Estimated progress now (0 before the first measurement)"""
+        state = self.state
+        if state is None:
+            return 0
+        base_ms, base_time, is_playing, duration_ms, offset_ms, offset_time, slew, _ = state
+        if not is_playing:
+            return base_ms
+        
+        now = self.clock() if now is None else now
+        position = base_ms + (now - base_time) * 1000
+        if slew and now < offset_time + slew:
+            position += offset_ms * (1 - (now - offset_time) / slew)
+        if duration_ms > 0:
+            position = min(duration_ms, position)
+        return max(0, position)
+    
+    def update(self, snapshot, now=None, snap=False):
+        """Take in a poll of the shown track; snap=True applies it at once"""
+        now = self.clock() if now is None else now
+        measured = snapshot.position_ms(now)
+        state = self.state
+        
+        offset_ms = 0
+        if state is not None and not snap and snapshot.is_playing and state[2]:
+            error = measured - self.position_ms(now)
+            seeked = snapshot.timestamp != state[7] and abs(error) > self.snap_ms / 4
+            if abs(error) <= self.snap_ms and not seeked:
+                offset_ms = -error
+        
+        if offset_ms:
+            self.slews += 1
+        else:
+            self.snaps += 1
+        # Slow enough that the display never runs backwards or at over 1.5x
+        slew = max(self.smoothing, abs(offset_ms) / 500)
+        self.state = (measured, now, snapshot.is_playing, snapshot.duration_ms, offset_ms, now,
+                      slew, snapshot.timestamp)
+    
+    def reset(self, snapshot=None, now=None):
+        """Start over from a new track's poll (or nothing)"""
+        if snapshot is None:
+            self.state = None
+        else:
+            self.update(snapshot, now, snap=True)
+
+
+class NowPlayingSegment:
+    """Publish the playback state in a fixed-layout memory-mapped file
+    
+    Other local programs read it with NowPlayingReader instead of polling
+    Spotify themselves. Layout (little-endian):
+    
+      0   magic b'SPNP', layout version (uint32)
+      8   sequence (uint64), odd while a write is in progress
+      16  PAYLOAD: has_track, is_playing, progress_ms, duration_ms,
+          updated_at (Unix time progress_ms was sampled at), then the
+          STRINGS as NUL-padded UTF-8
+    
+    Seqlock: the writer makes the sequence odd, writes the payload and makes
+    it even again. Readers unpack the payload between two reads of the
+    sequence and retry if it changed, so they never lock or block the writer.
+    """
+    
+    MAGIC = b'SPNP'
+    VERSION = 1
+    HEADER = struct.Struct('<4sIQ')
+    SEQUENCE = struct.Struct('<Q')
+    SEQUENCE_OFFSET = 8
+    STRINGS = (('track_id', 64), ('track', 256), ('artist', 256), ('album', 256),
+               ('album_art_url', 512), ('art_path', 512))
+    PAYLOAD = struct.Struct('<??6xqqd' + ''.join(f'{size}s' for _, size in STRINGS))
+    SIZE = HEADER.size + PAYLOAD.size
+    
+    def __init__(self, path=None):
+        self.path = path or NOW_PLAYING_FILE
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, self.SIZE)
+            self.map = mmap.mmap(fd, self.SIZE)
+        finally:
+            os.close(fd)
+        self.lock = Lock()
+        self.art = (None, '')  # (album_art_url, PNG path) from write_art
+        self.published = None
+        
+        # Carry on from a previous run's sequence so open readers see a change
+        magic, version, sequence = self.HEADER.unpack_from(self.map)
+        self.sequence = 0
+        if (magic, version) == (self.MAGIC, self.VERSION):
+            self.sequence = sequence + (sequence & 1)
+        self.HEADER.pack_into(self.map, 0, self.MAGIC, self.VERSION, self.sequence)
+        
+        # Counters
+        self.writes = 0
+    
+    @staticmethod
+    def encode(text, size):
+        """UTF-8 bytes of text, cut to size without splitting a character"""
+        data = (text or '').encode('utf-8')
+        if len(data) > size:
+            data = data[:size].decode('utf-8', 'ignore').encode('utf-8')
+        return data
+    
+    def write_art(self, url, image):
+        """Save the album art for url as a PNG beside the segment
+        
+        The overlay's own art cache files are not a format image libraries
+        read. The PNG is replaced atomically, and if the published track has
+        this art it is published again with art_path pointing at the PNG.
+        Returns the path.
+        """
+        path = os.path.splitext(self.path)[0] + '.png'
+        temp = f"{path}.{os.getpid()}.tmp"
+        image.save(temp, 'PNG')
+        os.replace(temp, path)
+        with self.lock:
+            self.art = (url, path)
+            if self.published and self.published.album_art_url == url:
+                self.write(self.published)
+        return path
+    
+    def publish(self, track_info, art_path=None):
+        """Write a PlaybackSnapshot (None when nothing is playing); thread-safe
+        
+        art_path defaults to the write_art PNG if it holds this track's art,
+        else ''.
+        """
+        with self.lock:
+            self.published = track_info
+            self.write(track_info, art_path)
+    
+    def write(self, track_info, art_path=None):
+        """Write the payload under the seqlock (lock held)"""
+        if self.map.closed:
+            return
+        if track_info:
+            if art_path is None:
+                art_url, art_file = self.art
+                art_path = art_file if art_url and art_url == track_info.album_art_url else ''
+            # Readers in other processes get the sample time on the wall clock
+            updated_at = time.time() - (time.monotonic() - track_info.sampled_at)
+            values = [True, bool(track_info.is_playing), int(track_info.progress_ms),
+                      int(track_info.duration_ms), updated_at]
+            for name, size in self.STRINGS:
+                text = art_path if name == 'art_path' else getattr(track_info, name)
+                values.append(self.encode(text, size))
+        else:
+            values = [False, False, 0, 0, time.time()] + [b''] * len(self.STRINGS)
+        
+        self.sequence += 1
+        self.SEQUENCE.pack_into(self.map, self.SEQUENCE_OFFSET, self.sequence)
+        self.PAYLOAD.pack_into(self.map, self.HEADER.size, *values)
+        self.sequence += 1
+        self.SEQUENCE.pack_into(self.map, self.SEQUENCE_OFFSET, self.sequence)
+        self.writes += 1
+    
+    def close(self):
+        """Publish that nothing is playing and unmap the file"""
+        self.publish(None)
+        with self.lock:
+            self.map.close()
+
+
+class NowPlayingReader:
+    """Read a NowPlayingSegment, from any process, without locks
+    
+    Usage:
+    
+        reader = NowPlayingReader()
+        state = reader.read()  # None when nothing is playing
+    
+    sequence() is cheap: compare it with the last value to skip reads while
+    nothing changed.
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or NOW_PLAYING_FILE
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        segment = NowPlayingSegment
+        if len(self.map) < segment.SIZE or \
+                segment.HEADER.unpack_from(self.map)[:2] != (segment.MAGIC, segment.VERSION):
+            self.map.close()
+            raise ValueError(f"{self.path} is not a now-playing segment")
+        
+        # Counters
+        self.reads = 0
+        self.retries = 0
+    
+    def sequence(self):
+        """The segment's sequence number; it grows by 2 with every write"""
+        segment = NowPlayingSegment
+        return segment.SEQUENCE.unpack_from(self.map, segment.SEQUENCE_OFFSET)[0]
+    
+    def read(self, timeout=1.0):
+        """The latest complete state as a dict of PlaybackSnapshot's fields
+        
+        Plus art_path, and updated_at in place of sampled_at; add the time
+        since updated_at to progress_ms while is_playing for the position.
+        Raises TimeoutError if a write stays in progress for timeout seconds,
+        as when the overlay died mid-write.
+        """
+        segment = NowPlayingSegment
+        deadline = time.monotonic() + timeout
+        attempts = 0
+        while True:
+            before = self.sequence()
+            if not before & 1:
+                values = segment.PAYLOAD.unpack_from(self.map, segment.HEADER.size)
+                if self.sequence() == before:
+                    break
+            # A write is in progress (or finished mid-read): try again
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{self.path} has been mid-write for {timeout} s")
+            self.retries += 1
+            attempts += 1
+            # Writes take microseconds; back off if this one doesn't end
+            time.sleep(0 if attempts < 100 else 0.001)
+        self.reads += 1
+        
+        has_track, is_playing, progress_ms, duration_ms, updated_at, *strings = values
+        if not has_track:
+            return None
+        state = {name: value.rstrip(b'\0').decode('utf-8', 'replace')
+                 for (name, _), value in zip(segment.STRINGS, strings)}
+        state.update(progress_ms=progress_ms, duration_ms=duration_ms, is_playing=is_playing,
+                     updated_at=updated_at)
+        return state
+    
+    def close(self):
+        self.map.close()
+
+
+class RenderCache:
+    """Retained-mode front for widget updates
+    
+    Remembers the last value applied to each widget property and skips Tk
+    calls that would not change anything. Tk thread only.
+    """
+    
+    def __init__(self):
+        self.values = {}
+        
+        # Counters
+        self.applied = 0
+        self.skipped = 0
+    
+    def apply(self, key, value, func):
+        """Call func() unless key already holds value"""
+        if self.values.get(key, self) == value:
+            self.skipped += 1
+            return False
+        func()
+        self.values[key] = value
+        self.applied += 1
+        return True
+    
+    def config(self, widget, **options):
+        """widget.config(**options), skipped if every option already has that value"""
+        key = (id(widget), 'config', tuple(sorted(options)))
+        return self.apply(key, options, lambda: widget.config(**options))
+    
+    def coords(self, canvas, item, *coords):
+        """canvas.coords(item, *coords), skipped if the item is already there"""
+        key = (id(canvas), 'coords', item)
+        return self.apply(key, coords, lambda: canvas.coords(item, *coords))
+    
+    def itemconfig(self, canvas, item, **options):
+        """canvas.itemconfig(item, **options), skipped if nothing changes"""
+        key = (id(canvas), 'itemconfig', item, tuple(sorted(options)))
+        return self.apply(key, options, lambda: canvas.itemconfig(item, **options))
+    
+    def attribute(self, window, name, value):
+        """window.attributes(name, value), skipped if unchanged"""
+        key = (id(window), 'attributes', name)
+        return self.apply(key, value, lambda: window.attributes(name, value))
+    
+    def stats(self):
+        """Applied vs. skipped widget updates"""
+        return {'applied': self.applied, 'skipped': self.skipped}
+
+
+# Easing curves for fades: map 0..1 elapsed to 0..1 progress
+EASINGS = {
+    'linear': lambda t: t,
+    'ease_in': lambda t: t * t,
+    'ease_out': lambda t: 1 - (1 - t) * (1 - t),
+    'ease_in_out': lambda t: t * t * (3 - 2 * t),
+}
+
+
+class FadeEngine:
+    """Time-based window opacity animation
+    
+    Alpha is computed from the monotonic clock each frame, so a late frame
+    jumps ahead instead of stretching the fade. Starting a new fade retargets
+    the running one from wherever it currently is, and every callback passed
+    to fade_to runs exactly once: when its fade completes, or right away if a
+    newer fade replaces it.
+    """
+    
+    def __init__(self, apply_alpha, duration=None, easing=None, full_range=1.0,
+                 clock=time.monotonic):
+        self.apply_alpha = apply_alpha
+        self.duration = FADE_DURATION if duration is None else duration
+        self.easing = EASINGS.get(easing or FADE_EASING, EASINGS['ease_in_out'])
+        self.full_range = full_range or 1.0
+        self.clock = clock
+        
+        self.alpha = 0.0
+        self.start_alpha = 0.0
+        self.target = 0.0
+        self.start_time = 0
+        self.fade_duration = 0
+        self.callback = None
+        self.active = False
+    
+    def fade_to(self, target, callback=None):
+        """Fade to target alpha, then run callback"""
+        # A replaced fade still gets its callback, exactly once
+        self.finish_callback()
+        
+        self.start_alpha = self.alpha
+        self.target = target
+        self.callback = callback
+        self.start_time = self.clock()
+        # A partial fade takes proportionally less time
+        self.fade_duration = self.duration * abs(target - self.alpha) / self.full_range
+        self.active = True
+        
+        if self.fade_duration <= 0:
+            self.complete()
+    
+    def step(self, now=None):
+        """Frame task: set the alpha for the current time"""
+        if not self.active:
+            return
+        
+        elapsed = (self.clock() if now is None else now) - self.start_time
+        if elapsed >= self.fade_duration:
+            self.complete()
+            return
+        
+        progress = self.easing(elapsed / self.fade_duration)
+        self.alpha = self.start_alpha + (self.target - self.start_alpha) * progress
+        self.apply_alpha(self.alpha)
+    
+    def complete(self):
+        """Land exactly on the target and run the callback"""
+        self.alpha = self.target
+        self.active = False
+        self.apply_alpha(self.alpha)
+        self.finish_callback()
+    
+    def finish_callback(self):
+        """Run the pending callback, if any, once"""
+        callback, self.callback = self.callback, None
+        if callback:
+            callback()
+
+
+def blend_frames(old, new, count, easing=None):
+    """The count images of a crossfade from old to new, ending with new
+    
+    Runs on an album art worker, so all of a crossfade's image math happens
+    off the Tk thread. Both images must have the same size.
+    """
+    easing = EASINGS.get(easing or FADE_EASING, EASINGS['ease_in_out'])
+    if old.mode != new.mode:
+        old = old.convert(new.mode)
+    return [Image.blend(old, new, easing(i / count)) for i in range(1, count)] + [new]
+
+
+class ArtCrossfade:
+    """Time-based playback of precomputed album art crossfade frames
+    
+    Each frame is a (PIL image, PhotoImage) pair, blended on a worker and
+    converted on the Tk thread before the crossfade starts, so a frame only
+    picks which one to show. Like FadeEngine, the frame is chosen from the
+    monotonic clock, so late frames skip ahead. The frames are dropped as
+    soon as the last one is shown.
+    """
+    
+    def __init__(self, show, duration=None, clock=time.monotonic):
+        self.show = show
+        self.duration = FADE_DURATION if duration is None else duration
+        self.clock = clock
+        
+        self.frames = None
+        self.shown = -1
+        self.start_time = 0
+    
+    @property
+    def active(self):
+        return self.frames is not None
+    
+    def start(self, frames, now=None):
+        """Play frames over the fade duration, starting with the first right away"""
+        self.frames = frames
+        self.shown = -1
+        self.start_time = self.clock() if now is None else now
+        self.step(self.start_time)
+    
+    def step(self, now=None):
+        """Frame task: show the frame for the current time"""
+        if self.frames is None:
+            return
+        
+        elapsed = (self.clock() if now is None else now) - self.start_time
+        last = len(self.frames) - 1
+        index = last if self.duration <= 0 else min(last, int(elapsed / self.duration * last))
+        if index != self.shown:
+            self.shown = index
+            self.show(*self.frames[index])
+        if index == last:
+            self.cancel()
+    
+    def cancel(self):
+        """Stop where it is and free the frames"""
+        self.frames = None
+        self.shown = -1
+
+
+class FrameScheduler:
+    """Drive all periodic UI work from the Tk event loop
+    
+    Once per frame it first runs the UI updates other threads handed over
+    with post(), then every task that is due. A task whose function returns
+    False is removed.
+    """
+    
+    def __init__(self, root, frame_rate=None):
+        self.root = root
+        self.frame_interval = 1.0 / max(1, frame_rate or FRAME_RATE)
+        self.updates = queue.SimpleQueue()
+        self.tasks = []
+        self.running = False
+        self.next_frame = 0
+        
+        # Counters
+        self.frames = 0
+        self.updates_run = 0
+        self.tasks_run = 0
+    
+    def post(self, func):
+        """Queue func to run on the Tk thread at the next frame (thread-safe)"""
+        self.updates.put(func)
+    
+    def add_task(self, func, interval=0):
+        """Run func every interval seconds (every frame if 0) on the Tk thread"""
+        task = [func, interval, time.monotonic()]
+        self.tasks.append(task)
+        return task
+    
+    def remove_task(self, task):
+        """Stop running a task"""
+        if task in self.tasks:
+            self.tasks.remove(task)
+    
+    def start(self):
+        """Start ticking on the Tk event loop"""
+        self.running = True
+        self.next_frame = time.monotonic()
+        self.root.after(0, self.tick)
+    
+    def stop(self):
+        """Stop ticking after the current frame"""
+        self.running = False
+    
+    def tick(self):
+        """Run one frame and schedule the next"""
+        if not self.running:
+            return
+        
+        now = time.monotonic()
+        self.next_frame = max(self.next_frame + self.frame_interval, now)
+        self.root.after(max(1, int((self.next_frame - now) * 1000)), self.tick)
+        
+        self.frames += 1
+        self.run_updates()
+        self.run_tasks(now)
+    
+    def run_updates(self):
+        """Drain the cross-thread update queue"""
+        while True:
+            try:
+                func = self.updates.get_nowait()
+            except queue.Empty:
+                break
+            self.updates_run += 1
+            try:
+                func()
+            except Exception as e:
+                print(f"Error in UI update: {e}")
+    
+    def run_tasks(self, now):
+        """Run every task that is due"""
+        for task in list(self.tasks):
+            func, interval, due = task
+            if now < due:
+                continue
+            # Skip missed runs instead of bunching them up
+            task[2] = max(due + interval, now)
+            self.tasks_run += 1
+            try:
+                keep = func()
+            except Exception as e:
+                print(f"Error in frame task: {e}")
+                keep = True
+            if keep is False:
+                self.remove_task(task)
+
+
+class Marquee:
+    """One line of text on a Canvas that scrolls by pixels when it doesn't fit
+    
+    The text is measured once when it is set, using a Font object created
+    once per marquee. Scrolling only moves the existing canvas items; the
+    text itself is never re-sliced or re-laid out.
+    """
+    
+    GAP = 40  # Pixels between the end of the text and its repeat
+    
+    def __init__(self, parent, family, size, fg, weight='normal', text='',
+                 speed=None, pause=None):
+        from tkinter import font as tkfont
+        self.font = tkfont.Font(family=family, size=size, weight=weight)
+        self.fg = fg
+        self.speed = max(1, SCROLL_SPEED if speed is None else speed)
+        self.pause = SCROLL_PAUSE if pause is None else pause
+        self.canvas = tk.Canvas(
+            parent,
+            height=int(self.font.metrics('linespace')),
+            bg='black',
+            highlightthickness=0
+        )
+        
+        # Two copies of the text, so the loop wraps around seamlessly
+        self.items = [
+            self.canvas.create_text(0, 0, anchor='nw', font=self.font, fill=fg, tags='text'),
+            self.canvas.create_text(0, 0, anchor='nw', font=self.font, fill=fg, tags='text',
+                                    state='hidden')
+        ]
+        self.canvas.bind('<Configure>', self.on_configure)
+        
+        self.text = None
+        self.text_width = 0
+        self.width = 0
+        self.x = 0
+        self.started = time.monotonic()
+        self.scrolling = False
+        
+        # Counters
+        self.moves = 0
+        
+        self.set_text(text)
+    
+    def pack(self, **kwargs):
+        """Pack the canvas like a widget"""
+        self.canvas.pack(**kwargs)
+    
+    def bind(self, sequence, func):
+        """Bind an event on the canvas like a widget"""
+        self.canvas.bind(sequence, func)
+    
+    def on_configure(self, event):
+        """Cache the canvas width instead of querying it every frame"""
+        self.width = int(event.width)
+        self.update_scrolling()
+    
+    def set_text(self, text):
+        """Show new text from the start, measuring it once"""
+        if text == self.text:
+            return
+        self.text = text
+        self.text_width = int(self.font.measure(text))
+        for item in self.items:
+            self.canvas.itemconfig(item, text=text)
+        # Undo the scroll before placing the copies, or the repeat is off by it
+        self.canvas.move('text', -self.x, 0)
+        self.x = 0
+        self.canvas.coords(self.items[0], 0, 0)
+        self.canvas.coords(self.items[1], self.text_width + self.GAP, 0)
+        self.started = time.monotonic()
+        self.update_scrolling()
+    
+    def set_font_size(self, size):
+        """Change the font size, re-measuring the text"""
+        self.font.configure(size=size)
+        self.canvas.config(height=int(self.font.metrics('linespace')))
+        text, self.text = self.text, None
+        self.set_text(text)
+    
+    def set_color(self, fg):
+        """Change the text color"""
+        if fg == self.fg:
+            return
+        self.fg = fg
+        for item in self.items:
+            self.canvas.itemconfig(item, fill=fg)
+    
+    def update_scrolling(self):
+        """Scroll only when the rendered text is wider than the canvas"""
+        scrolling = self.width > 0 and self.text_width > self.width
+        if scrolling != self.scrolling:
+            self.scrolling = scrolling
+            self.canvas.itemconfig(self.items[1], state='normal' if scrolling else 'hidden')
+            if not scrolling:
+                self.canvas.move('text', -self.x, 0)
+                self.x = 0
+            self.started = time.monotonic()
+    
+    def offset_at(self, now):
+        """Scroll offset in pixels: pause at the start of each loop, then move at speed"""
+        loop_width = self.text_width + self.GAP
+        cycle = self.pause + loop_width / self.speed
+        elapsed = (now - self.started) % cycle
+        if elapsed < self.pause:
+            return 0
+        return int((elapsed - self.pause) * self.speed) % loop_width
+    
+    def step(self, now=None):
+        """Frame task: move the text to where it should be now"""
+        if not self.scrolling:
+            return
+        x = -self.offset_at(time.monotonic() if now is None else now)
+        if x != self.x:
+            self.canvas.move('text', x - self.x, 0)
+            self.x = x
+            self.moves += 1
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(family, size, weight='normal'):
+    """A Pillow font close to Tk's (family, size in points, weight)
+    
+    Tries the family's TrueType file (arial.ttf, arialbd.ttf), then DejaVu
+    Sans, then Pillow's built-in font.
+    """
+    pixels = max(1, round(size * 4 / 3))  # Points at 96 dpi
+    bold = weight == 'bold'
+    names = [f"{family.lower()}{'bd' if bold else ''}.ttf",
+             'DejaVuSans-Bold.ttf' if bold else 'DejaVuSans.ttf']
+    for name in names:
+        try:
+            return ImageFont.truetype(name, pixels)
+        except OSError:
+            continue
+    return ImageFont.load_default(pixels)
+
+
+def font_height(font):
+    """Line height of a Pillow font in pixels"""
+    ascent, descent = font.getmetrics()
+    return ascent + descent
+
+
+class Compositor:
+    """Offscreen renderer that draws the whole overlay into one RGBA image
+    
+    Layers say what is drawn where. Changing a layer marks the rectangle it
+    affects as dirty, from any thread; render() redraws only the dirty
+    rectangles, on whichever thread calls it, and returns them so only they
+    go to the screen. Needs no Tk, so the output can be checked headless.
+    """
+    
+    def __init__(self, width, height, background='black'):
+        self.background = background
+        self.lock = Lock()
+        self.layers = []
+        self.dirty = []
+        self.size = (width, height)
+        self.buffer = Image.new('RGBA', self.size, background)
+        
+        # Counters
+        self.renders = 0
+        self.pixels = 0
+    
+    def add(self, layer):
+        """Draw layer on top of the existing ones"""
+        with self.lock:
+            self.layers.append(layer)
+            self.dirty.append(layer.box)
+    
+    def resize(self, width, height):
+        """Change the image size; everything is redrawn"""
+        with self.lock:
+            self.size = (width, height)
+            self.dirty.append((0, 0, width, height))
+    
+    def update(self, layer, box=None, **state):
+        """Move layer to box and/or change its state, marking what changed dirty"""
+        with self.lock:
+            new_box = layer.box if box is None else tuple(box)
+            new_state = {**layer.state, **state}
+            if new_box != layer.box:
+                self.dirty += [layer.box, new_box]
+            elif new_state != layer.state:
+                x0, y0, x1, y1 = layer.damage(layer.state, new_state)
+                self.dirty.append((new_box[0] + x0, new_box[1] + y0,
+                                   new_box[0] + x1, new_box[1] + y1))
+            else:
+                return False
+            layer.box, layer.state = new_box, new_state
+            return True
+    
+    @staticmethod
+    def merge(boxes, size):
+        """Clip boxes to the image, dropping empty ones and ones inside another"""
+        clipped = set()
+        for x0, y0, x1, y1 in boxes:
+            box = (max(0, x0), max(0, y0), min(size[0], x1), min(size[1], y1))
+            if box[0] < box[2] and box[1] < box[3]:
+                clipped.add(box)
+        return [box for box in clipped
+                if not any(other != box and other[0] <= box[0] and other[1] <= box[1] and
+                           other[2] >= box[2] and other[3] >= box[3] for other in clipped)]
+    
+    def render(self):
+        """Redraw the dirty rectangles; returns [(box, RGBA image of that box)]"""
+        start = time.perf_counter()
+        with self.lock:
+            dirty, self.dirty = self.dirty, []
+            size = self.size
+            layers = [(layer, layer.box, layer.state) for layer in self.layers]
+        if self.buffer.size != size:
+            self.buffer = Image.new('RGBA', size, self.background)
+        
+        updates = []
+        for box in self.merge(dirty, size):
+            region = Image.new('RGBA', (box[2] - box[0], box[3] - box[1]), self.background)
+            for layer, (x0, y0, x1, y1), state in layers:
+                clip = (max(box[0], x0), max(box[1], y0), min(box[2], x1), min(box[3], y1))
+                if clip[0] >= clip[2] or clip[1] >= clip[3]:
+                    continue
+                # Each layer draws on its own tile, so it can't spill into its neighbours
+                tile = Image.new('RGBA', (x1 - x0, y1 - y0), (0, 0, 0, 0))
+                layer.draw(tile, state)
+                region.alpha_composite(tile, dest=(clip[0] - box[0], clip[1] - box[1]),
+                                       source=(clip[0] - x0, clip[1] - y0,
+                                               clip[2] - x0, clip[3] - y0))
+            self.buffer.paste(region, box[:2])
+            updates.append((box, region))
+            self.pixels += region.size[0] * region.size[1]
+        
+        self.renders += 1
+        metrics.observe('overlay_compose_duration_seconds', time.perf_counter() - start)
+        return updates
+    
+    def snapshot(self):
+        """A copy of the image as last rendered"""
+        return self.buffer.copy()
+
+
+class Layer:
+    """A rectangle of a Compositor and what is drawn in it
+    
+    Stands in for a Tk widget: config, pack and bind take the same calls, so
+    the overlay updates widgets and layers alike. Subclasses draw their
+    state onto a transparent tile the size of the layer.
+    """
+    
+    def __init__(self, compositor, box=(0, 0, 0, 0), **state):
+        self.compositor = compositor
+        self.box = tuple(box)
+        self.state = state
+        compositor.add(self)
+    
+    def config(self, **options):
+        """Change what is drawn, like widget.config()"""
+        self.compositor.update(self, **options)
+    
+    configure = config
+    
+    def place(self, x, y, width, height):
+        """Move and size the layer"""
+        self.compositor.update(self, box=(x, y, x + width, y + height))
+    
+    def contains(self, x, y):
+        """Whether a point (in window pixels) is on the layer"""
+        x0, y0, x1, y1 = self.box
+        return x0 <= x < x1 and y0 <= y < y1
+    
+    def pack(self, **kwargs):
+        """Layers are positioned with place()"""
+    
+    def bind(self, sequence, func):
+        """Events go to the compositor's canvas"""
+    
+    def damage(self, old, new):
+        """The part of the layer (in layer pixels) that changes from state old to new"""
+        return (0, 0, self.box[2] - self.box[0], self.box[3] - self.box[1])
+    
+    def draw(self, tile, state):
+        raise NotImplementedError
+
+
+class TextLayer(Layer):
+    """A line of text, like a Label; anchor 'w' aligns it left, 'e' right"""
+    
+    def __init__(self, compositor, text='', fg='white', font=('Arial', 9), anchor='w', **state):
+        super().__init__(compositor, text=text, fg=fg, font=font, anchor=anchor, **state)
+    
+    def draw(self, tile, state):
+        font = load_font(*state['font'])
+        x = 0
+        if state['anchor'] == 'e':
+            x = tile.size[0] - font.getlength(state['text'])
+        ImageDraw.Draw(tile).text((x, 0), state['text'], font=font, fill=state['fg'])
+
+
+class ArtLayer(Layer):
+    """Album art, like the art Label but given the PIL image"""
+    
+    def __init__(self, compositor, **state):
+        super().__init__(compositor, image='', **state)
+    
+    def draw(self, tile, state):
+        image = state['image']
+        if getattr(image, 'size', None):
+            tile.paste(image.convert('RGBA') if image.mode != 'RGBA' else image, (0, 0))
+
+
+class ProgressLayer(Layer):
+    """The progress bar, answering the progress Canvas's coords and itemconfig calls
+    
+    Moving the bar only dirties the columns between its old and new end.
+    """
+    
+    def __init__(self, compositor, fill=None, bg='#404040', **state):
+        super().__init__(compositor, bar=0, fill=fill or PROGRESS_COLOR, bg=bg, **state)
+    
+    def create_rectangle(self, *coords, fill='', **options):
+        self.config(fill=fill)
+        return 1
+    
+    def coords(self, item, x0, y0, x1, y1):
+        self.config(bar=int(x1))
+    
+    def itemconfig(self, item, **options):
+        self.config(**options)
+    
+    def damage(self, old, new):
+        width, height = self.box[2] - self.box[0], self.box[3] - self.box[1]
+        if {**old, 'bar': new['bar']} == new:
+            return (min(old['bar'], new['bar']), 0, max(old['bar'], new['bar']), height)
+        return (0, 0, width, height)
+    
+    def draw(self, tile, state):
+        draw = ImageDraw.Draw(tile)
+        draw.rectangle((0, 0) + tile.size, fill=state['bg'])
+        if state['bar'] > 0:
+            draw.rectangle((0, 0, state['bar'] - 1, tile.size[1]), fill=state['fill'])
+
+
+class MarqueeLayer(Layer, Marquee):
+    """Marquee drawn by a Compositor: the same scrolling, without a Canvas
+    
+    Scrolling only changes the text offset in the layer's state. The text is
+    rasterized once into a strip when it changes, and each frame just pastes
+    that strip at the new offset.
+    """
+    
+    def __init__(self, compositor, family, size, fg, weight='normal', text='',
+                 speed=None, pause=None):
+        Layer.__init__(self, compositor, text='', text_width=0, fg=fg,
+                       font=(family, size, weight), x=0, scrolling=False)
+        self.family = family
+        self.weight = weight
+        self.font = load_font(family, size, weight)
+        self.fg = fg
+        self.speed = max(1, SCROLL_SPEED if speed is None else speed)
+        self.pause = SCROLL_PAUSE if pause is None else pause
+        
+        self.text = None
+        self.text_width = 0
+        self.width = 0
+        self.x = 0
+        self.started = time.monotonic()
+        self.scrolling = False
+        
+        # Counters
+        self.moves = 0
+        
+        # (text, font, color, height) and its rendered strip; render thread only
+        self.strip = (None, None)
+        
+        self.set_text(text)
+    
+    def place(self, x, y, width, height):
+        Layer.place(self, x, y, width, height)
+        self.width = width
+        self.update_scrolling()
+    
+    def set_text(self, text):
+        if text == self.text:
+            return
+        self.text = text
+        self.text_width = int(self.font.getlength(text))
+        self.x = 0
+        self.started = time.monotonic()
+        self.config(text=text, text_width=self.text_width, x=0)
+        self.update_scrolling()
+    
+    def set_font_size(self, size):
+        self.font = load_font(self.family, size, self.weight)
+        self.config(font=(self.family, size, self.weight))
+        text, self.text = self.text, None
+        self.set_text(text)
+    
+    def set_color(self, fg):
+        if fg == self.fg:
+            return
+        self.fg = fg
+        self.config(fg=fg)
+    
+    def update_scrolling(self):
+        scrolling = self.width > 0 and self.text_width > self.width
+        if scrolling != self.scrolling:
+            self.scrolling = scrolling
+            if not scrolling:
+                self.x = 0
+            self.started = time.monotonic()
+            self.config(scrolling=scrolling, x=self.x)
+    
+    def step(self, now=None):
+        if not self.scrolling:
+            return
+        x = -self.offset_at(time.monotonic() if now is None else now)
+        if x != self.x:
+            self.x = x
+            self.moves += 1
+            self.config(x=x)
+    
+    def draw(self, tile, state):
+        key = (state['text'], state['font'], state['fg'], tile.size[1])
+        if self.strip[0] != key:
+            strip = Image.new('RGBA', (max(1, state['text_width'] + 1), tile.size[1]), (0, 0, 0, 0))
+            ImageDraw.Draw(strip).text((0, 0), state['text'], font=load_font(*state['font']),
+                                       fill=state['fg'])
+            self.strip = (key, strip)
+        strip = self.strip[1]
+        tile.paste(strip, (state['x'], 0))
+        if state['scrolling']:
+            tile.paste(strip, (state['x'] + state['text_width'] + self.GAP, 0))
+
+
+class CompositorView:
+    """Shows a Compositor through one PhotoImage on one Canvas
+    
+    Each frame with changes, the compositor renders on its own worker
+    thread; the dirty rectangles it returns are copied into the displayed
+    PhotoImage on the Tk thread (through a staging image), so Tk repaints
+    only those. At most one render is in flight; changes made meanwhile are
+    picked up by the next.
+    """
+    
+    def __init__(self, root, compositor, frame_scheduler):
+        self.compositor = compositor
+        self.frame_scheduler = frame_scheduler
+        width, height = compositor.size
+        self.canvas = tk.Canvas(root, width=width, height=height, bg='black',
+                                highlightthickness=0)
+        self.canvas.pack(fill='both', expand=True)
+        self.item = self.canvas.create_image(0, 0, anchor='nw')
+        self.executor = futures.ThreadPoolExecutor(max_workers=1,
+                                                   thread_name_prefix='compositor')
+        self.rendering = False
+        self.create_images()
+        
+        # Counters
+        self.presented = 0
+    
+    def create_images(self):
+        """(Re)create the displayed and staging images at the compositor's size"""
+        self.size = self.compositor.size
+        self.photo = ImageTk.PhotoImage('RGBA', self.size)
+        self.staging = ImageTk.PhotoImage('RGBA', self.size)
+        self.canvas.itemconfig(self.item, image=self.photo)
+        self.canvas.config(width=self.size[0], height=self.size[1])
+    
+    def step(self):
+        """Frame task: start a render if anything changed and none is running"""
+        if self.rendering or not self.compositor.dirty:
+            return
+        self.rendering = True
+        self.executor.submit(self.compositor.render).add_done_callback(self.rendered)
+    
+    def rendered(self, future):
+        """Hand a finished render to the Tk thread (render worker)"""
+        try:
+            updates = future.result()
+        except Exception as e:
+            print(f"Error rendering overlay: {e}")
+            updates = []
+        self.frame_scheduler.post(lambda: self.present(updates))
+    
+    def present(self, updates):
+        """Copy rendered rectangles into the displayed image (Tk thread)"""
+        self.rendering = False
+        if self.size != self.compositor.size:
+            self.create_images()
+        for (x0, y0, x1, y1), region in updates:
+            self.staging.paste(region)
+            self.canvas.tk.call(self.photo, 'copy', self.staging,
+                                '-from', 0, 0, x1 - x0, y1 - y0, '-to', x0, y0)
+        self.presented += len(updates)
+    
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncSpotifyEngine:
+    """Optional asyncio network engine running in one background event loop
+    
+    Polls, token refreshes and album art fetches run as separate tasks, so a
+    slow art download or refresh never holds up a poll. Each request has a
+    deadline, and starting a new art fetch cancels the previous one. The
+    HTTP calls themselves still go through the shared pooled client, on a
+    small executor owned by the engine: the event loop thread plus up to
+    ART_WORKERS + 2 workers, where the threaded engine uses a polling thread
+    plus ART_WORKERS art threads.
+    
+    requests is blocking, so cancelling a task or missing its deadline
+    stops the wait but not the request: it runs on in its worker until it
+    finishes or hits its HTTP timeout, which the deadline caps.
+    
+    Also stands in for AlbumArtLoader (submit/cancel/is_current/shutdown).
+    """
+    
+    def __init__(self, overlay, deadline=None, refresh_ahead=None, workers=None, account=None):
+        self.overlay = overlay
+        self.account = account or default_account
+        self.deadline = REQUEST_DEADLINE if deadline is None else deadline
+        self.refresh_ahead = TOKEN_REFRESH_AHEAD if refresh_ahead is None else refresh_ahead
+        self.executor = futures.ThreadPoolExecutor(max_workers=workers or ART_WORKERS + 2,
+                                                   thread_name_prefix='spotify-io')
+        self.loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self.run_loop, daemon=True)
+        self.lock = Lock()
+        self.generation = 0
+        self.art_task = None
+        self.refresh_task = None
+        
+        # Counters
+        self.polls = 0
+        self.refreshes = 0
+        self.timeouts = 0
+        self.delivered = 0
+        self.dropped = 0
+    
+    def run_loop(self):
+        """Event loop thread"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    def start(self):
+        """Start the event loop thread and the poll task"""
+        self.thread.start()
+        return asyncio.run_coroutine_threadsafe(self.poll_forever(), self.loop)
+    
+    def run(self, coro):
+        """Run a coroutine on the engine loop from another thread and wait for it"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+    
+    async def call(self, func, *args, deadline=None):
+        """Run a blocking request on the executor, failing after the deadline
+        
+        The deadline also caps the HTTP client's timeouts, so a request that
+        was given up on (or cancelled) frees its worker soon after.
+        """
+        deadline = deadline or self.deadline
+        future = self.loop.run_in_executor(self.executor, get_http_client().run_with_deadline,
+                                           deadline, func, *args)
+        try:
+            return await asyncio.wait_for(future, deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+    
+    async def refresh_token(self):
+        """Refresh the access token; returns True on success"""
+        try:
+            ok = await self.call(refresh_access_token, self.account)
+        except Exception as e:
+            print(f"Error refreshing token: {e}")
+            ok = False
+        if ok:
+            self.refreshes += 1
+        return ok
+    
+    async def ensure_token(self):
+        """Refresh the token in the background ahead of expiry
+        
+        Polls keep using the current token while the refresh runs; they only
+        wait for it once the token is about to expire.
+        """
+        account = self.account
+        if time.time() < account.token_expires - self.refresh_ahead:
+            return
+        
+        if self.refresh_task is None or self.refresh_task.done():
+            self.refresh_task = self.loop.create_task(self.refresh_token())
+        
+        if time.time() >= account.token_expires - 60:
+            if not await asyncio.shield(self.refresh_task):
+                raise Exception("Failed to refresh token")
+    
+    async def poll_once(self):
+        """Poll Spotify once; returns the track info (None if nothing is playing)"""
+        await self.ensure_token()
+        track_info = await self.call(get_current_track, self.account)
+        self.polls += 1
+        return track_info
+    
+    async def poll_forever(self):
+        """Poll task: poll, then sleep as long as the overlay says"""
+        while self.overlay.running:
+            delay = self.overlay.poll_blocked_for()
+            if delay is None:
+                try:
+                    delay = self.overlay.poll_succeeded(await self.poll_once())
+                except Exception as e:
+                    delay = self.overlay.poll_failed(e)
+            
+            await asyncio.sleep(delay)
+    
+    async def fetch_art(self, func, url, on_done, generation):
+        """Fetch art for the latest track, cancelling any fetch still running"""
+        if self.art_task is not None and not self.art_task.done():
+            self.art_task.cancel()
+        self.art_task = asyncio.current_task()
+        
+        try:
+            result = await self.call(func, url)
+        except asyncio.TimeoutError:
+            print(f"Error loading album art: timed out after {self.deadline}s")
+            result = None
+        
+        if result is None or not self.is_current(generation):
+            self.dropped += 1
+            return
+        self.delivered += 1
+        on_done(result, generation)
+    
+    def submit(self, func, url, on_done):
+        """Fetch art with func(url) and pass it to on_done(result, generation)"""
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+        asyncio.run_coroutine_threadsafe(self.fetch_art(func, url, on_done, generation), self.loop)
+        return generation
+    
+    def is_current(self, generation):
+        """Whether a result still belongs to the latest art request"""
+        with self.lock:
+            return generation == self.generation
+    
+    def cancel(self):
+        """Cancel the art fetch in flight"""
+        with self.lock:
+            self.generation += 1
+        
+        def cancel_task():
+            if self.art_task is not None:
+                self.art_task.cancel()
+        self.loop.call_soon_threadsafe(cancel_task)
+    
+    def shutdown(self):
+        """Stop the event loop and the executor"""
+        self.cancel()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 
-def get_token_from_code(auth_code):
-    """Exchange authorization code for access token"""
-    global access_token, refresh_token, token_expires
+class Profiler:
+    """Periodic cProfile and tracemalloc dumps from the Tk thread
     
-    auth_string = f"{CLIENT_ID}:{CLIENT_SECRET}"
-    auth_bytes = auth_string.encode('utf-8')
-    auth_base64 = base64.b64encode(auth_bytes).decode('utf-8')
+    While active, each sampling window's cProfile stats (a .prof file for
+    pstats or snakeviz) and the top allocation sites from tracemalloc, plus
+    their growth since the previous window, are written to the profile
+    directory. cProfile only sees the thread that enabled it, which is the
+    Tk thread where all drawing happens. When inactive it has no hooks
+    installed at all.
+    """
     
-    url = "https://accounts.spotify.com/api/token"
-    headers = {
-        'Authorization': f'Basic {auth_base64}',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'authorization_code',
-        'code': auth_code,
-        'redirect_uri': REDIRECT_URI
-    }
+    def __init__(self, directory=None, window=None, top=None, clock=time.monotonic):
+        self.directory = directory or PROFILE_DIR
+        self.window = max(1, PROFILE_WINDOW if window is None else window)
+        self.top = top or PROFILE_TOP
+        self.clock = clock
+        
+        self.active = False
+        self.profile = None
+        self.window_started = 0
+        self.started_tracemalloc = False
+        self.last_snapshot = None
+        
+        # Counters
+        self.windows = 0
     
-    response = requests.post(url, headers=headers, data=data)
-    if response.status_code == 200:
-        json_result = response.json()
-        access_token = json_result['access_token']
-        refresh_token = json_result.get('refresh_token')
-        token_expires = time.time() + json_result['expires_in']
-        return True
-    return False
-
-
-def refresh_access_token():
-    """Refresh the access token using refresh token"""
-    global access_token, token_expires
+    def start(self):
+        """Start profiling (Tk thread)"""
+        if self.active:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        self.active = True
+        self.begin_window()
+        print(f"Profiling to {self.directory} every {self.window:g}s")
     
-    if not refresh_token:
-        return False
+    def stop(self):
+        """Write the current window and remove all hooks (Tk thread)"""
+        if not self.active:
+            return
+        self.end_window()
+        self.active = False
+        self.last_snapshot = None
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+        print("Profiling stopped")
     
-    auth_string = f"{CLIENT_ID}:{CLIENT_SECRET}"
-    auth_bytes = auth_string.encode('utf-8')
-    auth_base64 = base64.b64encode(auth_bytes).decode('utf-8')
+    def toggle(self):
+        """Start or stop; returns whether profiling is now active"""
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+        return self.active
     
-    url = "https://accounts.spotify.com/api/token"
-    headers = {
-        'Authorization': f'Basic {auth_base64}',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token
-    }
+    def begin_window(self):
+        self.window_started = self.clock()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
     
-    response = requests.post(url, headers=headers, data=data)
-    if response.status_code == 200:
-        json_result = response.json()
-        access_token = json_result['access_token']
-        token_expires = time.time() + json_result['expires_in']
-        return True
-    return False
+    def end_window(self):
+        """Write this window's stats; returns the paths written"""
+        self.profile.disable()
+        self.windows += 1
+        stem = os.path.join(self.directory,
+                            f"{time.strftime('%Y%m%d-%H%M%S')}-{self.windows:04d}")
+        
+        self.profile.dump_stats(stem + '.prof')
+        with open(stem + '-cpu.txt', 'w') as f:
+            pstats.Stats(self.profile, stream=f).sort_stats('cumulative').print_stats(self.top)
+        
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        with open(stem + '-memory.txt', 'w') as f:
+            f.write(f"Top {self.top} allocation sites\n")
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                f.write(f"{stat}\n")
+            if self.last_snapshot is not None:
+                f.write(f"\nTop {self.top} changes since the previous window\n")
+                for stat in snapshot.compare_to(self.last_snapshot, 'lineno')[:self.top]:
+                    f.write(f"{stat}\n")
+        self.last_snapshot = snapshot
+        self.profile = None
+        return [stem + '.prof', stem + '-cpu.txt', stem + '-memory.txt']
+    
+    def tick(self, now=None):
+        """Frame task: roll over to a new window when this one is over"""
+        if not self.active:
+            return False
+        if (self.clock() if now is None else now) - self.window_started >= self.window:
+            self.end_window()
+            self.begin_window()
 
 
-def get_auth_header():
-    """Get authorization header, refreshing token if needed"""
-    global access_token, token_expires
-    
-    # Check if token needs refresh
-    if time.time() >= token_expires - 60:  # Refresh 1 minute before expiry
-        if not refresh_access_token():
-            raise Exception("Failed to refresh token")
-    
-    return {'Authorization': f'Bearer {access_token}'}
+def shared_metrics(scheduler, cache):
+    """Samples for a frame scheduler's Tk callbacks and the album art cache"""
+    samples = [
+        ('overlay_tk_callbacks_total', 'counter', scheduler.frames, {'kind': 'frame'}),
+        ('overlay_tk_callbacks_total', 'counter', scheduler.updates_run, {'kind': 'update'}),
+        ('overlay_tk_callbacks_total', 'counter', scheduler.tasks_run, {'kind': 'task'}),
+    ]
+    stats = cache.stats()
+    for tier in ('memory_hits', 'disk_hits', 'misses'):
+        samples.append(('overlay_art_cache_lookups_total', 'counter', stats[tier],
+                        {'result': tier}))
+    samples.append(('overlay_art_cache_bytes', 'gauge', stats['memory_bytes'], {}))
+    return samples
 
 
-def get_current_track():
-    """Get currently playing track with album art and progress"""
-    headers = get_auth_header()
-    url = "https://api.spotify.com/v1/me/player/currently-playing"
+class SharedPoller:
+    """One polling scheduler for every overlay in an OverlayGroup
     
-    response = requests.get(url, headers=headers)
+    Each overlay keeps its own poll timing, retries and circuit breaker; the
+    poller only keeps a queue of when each one is due. Due polls run on a
+    small fixed pool, so a slow account doesn't hold up the others and the
+    thread count doesn't grow with the number of accounts.
+    """
     
-    if response.status_code == 200 and response.text:
-        data = response.json()
+    def __init__(self, workers=2):
+        self.executor = futures.ThreadPoolExecutor(max_workers=workers,
+                                                   thread_name_prefix='spotify-poll')
+        self.condition = threading.Condition()
+        self.due = []  # heap of (time, sequence, overlay)
+        self.sequence = itertools.count()
+        self.running = False
+        self.thread = Thread(target=self.run, daemon=True)
         
-        if data and data.get('item'):
-            track = data['item']
-            
-            # Get album art (largest image)
-            album_art_url = None
-            if track.get('album') and track['album'].get('images'):
-                album_art_url = track['album']['images'][0]['url']
-            
-            return {
-                'track': track['name'],
-                'artist': ', '.join([artist['name'] for artist in track['artists']]),
-                'album': track['album']['name'],
-                'album_art_url': album_art_url,
-                'progress_ms': data.get('progress_ms', 0),
-                'duration_ms': track.get('duration_ms', 0),
-                'is_playing': data.get('is_playing', False)
-            }
+        # Counters
+        self.polls = 0
     
-    return None
+    def add(self, overlay, delay=0):
+        """Poll for overlay in delay seconds (thread-safe)"""
+        with self.condition:
+            heapq.heappush(self.due, (time.monotonic() + delay, next(self.sequence), overlay))
+            self.condition.notify()
+    
+    def run(self):
+        """Scheduler thread: hand each overlay's poll to the pool once it is due"""
+        while True:
+            with self.condition:
+                while self.running and (not self.due or self.due[0][0] > time.monotonic()):
+                    timeout = self.due[0][0] - time.monotonic() if self.due else None
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+                _, _, overlay = heapq.heappop(self.due)
+            # Closed overlays just drop out of the queue
+            if overlay.running:
+                self.executor.submit(self.poll, overlay)
+    
+    def poll(self, overlay):
+        """Worker: poll once for overlay and queue its next poll"""
+        delay = overlay.poll_once()
+        with self.condition:
+            self.polls += 1
+        if overlay.running:
+            self.add(overlay, delay)
+    
+    def start(self):
+        """Start the scheduler thread"""
+        self.running = True
+        self.thread.start()
+    
+    def stop(self):
+        """Stop polling without waiting for polls in flight"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 
 class SpotifyOverlay:
-    def __init__(self):
-        self.root = tk.Tk()
+    def __init__(self, network_engine=None, account=None, group=None, position=None, slot=0):
+        """An overlay for account (default_account if None)
+        
+        Standalone it owns its Tk root, frame scheduler and polling. As part
+        of an OverlayGroup it is a Toplevel of the group's root and uses the
+        group's frame scheduler, poller, art workers and profiler. position
+        is (x, y_from_bottom), either of which may be None to use the
+        config; overlays without a y are stacked upwards by slot.
+        """
+        network_engine = network_engine or NETWORK_ENGINE
+        self.account = account or default_account
+        self.group = group
+        self.position = position or (None, None)
+        self.slot = slot
+        self.root = tk.Tk() if group is None else tk.Toplevel(group.root)
         
         # Make window transparent and always on top
-        self.root.attributes('-alpha', 0.0)  # Start invisible for fade-in
+        self.render = RenderCache()
+        self.render.attribute(self.root, '-alpha', 0.0)  # Start invisible for fade-in
         self.root.attributes('-topmost', True)
         self.root.overrideredirect(True)
         
@@ -265,21 +2922,98 @@ class SpotifyOverlay:
             pass
         
         # Set window size and position from config
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
+        self.place_window()
+        self.root.configure(bg='black')
         
-        # Calculate position
-        if POSITION_X == -1:
-            # Auto-center horizontally
-            x = (screen_width - WINDOW_WIDTH) // 2
+        # Widgets, or layers that one offscreen compositor draws
+        self.compositor = None
+        if RENDERER == 'pillow':
+            self.create_layers()
         else:
-            x = POSITION_X
+            self.create_widgets()
+        
+        # Track current song and state: the art shown as a PhotoImage and as
+        # a PIL image (crossfades start from it)
+        self.current_image = None
+        self.current_art = None
+        self.theme = None
+        self.art_cache = get_album_art_cache()
+        self.target_alpha = OPACITY
         
-        y = screen_height - POSITION_Y_FROM_BOTTOM
+        # Text shown in the marquees
+        self.full_track_text = ""
+        self.full_artist_text = ""
         
-        self.root.geometry(f'{WINDOW_WIDTH}x{WINDOW_HEIGHT}+{x}+{y}')
-        self.root.configure(bg='black')
+        # When the poll that saw the current track change arrived
+        self.track_seen_at = None
+        
+        # The PlaybackSnapshot shown (None when nothing is); only ever
+        # replaced as a whole, so any thread can read it without a lock
+        self.playback = None
+        self.progress = ProgressEstimator()
+        
+        # Playback state for other local programs
+        self.now_playing = None
+        if NOW_PLAYING_ENABLED:
+            path = NOW_PLAYING_FILE
+            if self.account.name:
+                root, ext = os.path.splitext(path)
+                path = f"{root}-{self.account.name}{ext}"
+            self.now_playing = NowPlayingSegment(path)
+        
+        # Poll timing, error handling and change detection
+        self.poll_scheduler = PollScheduler()
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = CircuitBreaker()
+        self.playback_diff = PlaybackDiff()
         
+        # Progress, scrolling and fades all run on the Tk thread, once per frame
+        self.frame_scheduler = FrameScheduler(self.root) if group is None else group.frame_scheduler
+        self.fader = FadeEngine(
+            lambda alpha: self.render.attribute(self.root, '-alpha', alpha),
+            full_range=OPACITY
+        )
+        self.crossfade = ArtCrossfade(self.show_album_art)
+        tasks = [self.update_progress, self.track_marquee.step, self.artist_marquee.step,
+                 self.fader.step, self.crossfade.step]
+        
+        # The compositor renders last, once everything else has drawn this frame
+        self.view = None
+        if self.compositor is not None:
+            self.view = CompositorView(self.root, self.compositor, self.frame_scheduler)
+            self.view.canvas.bind('<Button-1>', self.on_view_click)
+            self.view.canvas.bind('<B1-Motion>', self.on_drag)
+            self.view.canvas.bind('<Motion>', self.on_view_motion)
+            tasks.append(self.view.step)
+        self.frame_tasks = [self.frame_scheduler.add_task(func) for func in tasks]
+        metrics.add_collector(self.collect_metrics)
+        
+        # Profiling, also toggled at runtime with Ctrl+Alt+P or SIGUSR1
+        self.profiler = Profiler() if group is None else group.profiler
+        self.profile_task = None
+        self.root.bind('<Control-Alt-p>', lambda e: self.toggle_profiling())
+        if PROFILING_ENABLED and group is None:
+            self.toggle_profiling()
+        
+        # Start monitoring (network only; UI updates go through the frame scheduler)
+        self.running = True
+        self.engine = None
+        if group is not None:
+            self.art_loader = AlbumArtLoader(executor=group.art_executor)
+            group.poller.add(self)
+        elif network_engine == 'asyncio':
+            self.engine = AsyncSpotifyEngine(self, account=self.account)
+            self.art_loader = self.engine
+            self.engine.start()
+        else:
+            self.art_loader = AlbumArtLoader()
+            self.monitor_thread = Thread(target=self.monitor_spotify, daemon=True)
+            self.monitor_thread.start()
+        if group is None:
+            self.frame_scheduler.start()
+        
+    def create_widgets(self):
+        """Build the overlay from Tk widgets"""
         # Create main frame
         self.main_frame = tk.Frame(self.root, bg='black')
         self.main_frame.pack(fill='both', expand=True, padx=10, pady=10)
@@ -288,8 +3022,8 @@ class SpotifyOverlay:
         self.album_art_label = tk.Label(
             self.main_frame,
             bg='black',
-            width=100,
-            height=100
+            width=ALBUM_ART_SIZE,
+            height=ALBUM_ART_SIZE
         )
         self.album_art_label.pack(side='left', padx=(0, 15))
         
@@ -297,27 +3031,22 @@ class SpotifyOverlay:
         self.info_frame = tk.Frame(self.main_frame, bg='black')
         self.info_frame.pack(side='left', fill='both', expand=True)
         
-        self.track_label = tk.Label(
+        # Track and artist scroll smoothly when they are wider than the window
+        self.track_marquee = Marquee(
             self.info_frame,
-            text="Waiting for Spotify...",
-            font=('Arial', TRACK_FONT_SIZE, 'bold'),
+            'Arial', TRACK_FONT_SIZE,
             fg=TRACK_COLOR,
-            bg='black',
-            justify='left',
-            anchor='w'
+            weight='bold',
+            text="Waiting for Spotify..."
         )
-        self.track_label.pack(anchor='w', pady=(5, 2), fill='x')
+        self.track_marquee.pack(anchor='w', pady=(5, 2), fill='x')
         
-        self.artist_label = tk.Label(
+        self.artist_marquee = Marquee(
             self.info_frame,
-            text="",
-            font=('Arial', ARTIST_FONT_SIZE),
-            fg=ARTIST_COLOR,
-            bg='black',
-            justify='left',
-            anchor='w'
+            'Arial', ARTIST_FONT_SIZE,
+            fg=ARTIST_COLOR
         )
-        self.artist_label.pack(anchor='w', pady=(0, 8), fill='x')
+        self.artist_marquee.pack(anchor='w', pady=(0, 8), fill='x')
         
         # Progress bar frame
         self.progress_frame = tk.Frame(self.info_frame, bg='black')
@@ -337,6 +3066,10 @@ class SpotifyOverlay:
             outline=''
         )
         
+        # Width is cached from <Configure> rather than queried every frame
+        self.progress_width = 0
+        self.progress_canvas.bind('<Configure>', self.on_progress_configure)
+        
         # Time labels
         self.time_frame = tk.Frame(self.info_frame, bg='black')
         self.time_frame.pack(fill='x')
@@ -374,47 +3107,164 @@ class SpotifyOverlay:
         self.close_button.bind('<Enter>', lambda e: self.close_button.config(fg='#ff0000'))
         self.close_button.bind('<Leave>', lambda e: self.close_button.config(fg='#666666'))
         
-        # Track current song and state
-        self.current_track = None
-        self.current_image = None
-        self.target_alpha = OPACITY
-        self.current_alpha = 0.0
-        self.is_fading = False
+        # Allow dragging the window
+        for widget in [self.main_frame, self.album_art_label, self.track_marquee,
+                       self.artist_marquee, self.info_frame]:
+            widget.bind('<Button-1>', self.start_drag)
+            widget.bind('<B1-Motion>', self.on_drag)
+    
+    def create_layers(self):
+        """Build the overlay as layers of one Compositor, standing in for the widgets
         
-        # Text scrolling state
-        self.full_track_text = ""
-        self.full_artist_text = ""
-        self.track_scroll_pos = 0
-        self.artist_scroll_pos = 0
-        self.max_text_length = MAX_TEXT_LENGTH  # Characters before scrolling kicks in
-        self.scroll_paused = False
-        self.scroll_pause_counter = 0
-        
-        # Progress tracking
-        self.progress_ms = 0
-        self.duration_ms = 0
-        self.last_update = time.time()
-        self.is_playing = False
-        
-        # Start monitoring thread
-        self.running = True
-        self.monitor_thread = Thread(target=self.monitor_spotify, daemon=True)
-        self.monitor_thread.start()
+        Everything is drawn offscreen into one image and shown through one
+        PhotoImage (see CompositorView), so text and progress updates cause
+        no Tk geometry or layout work.
+        """
+        self.compositor = Compositor(WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.album_art_label = ArtLayer(self.compositor)
+        self.track_marquee = MarqueeLayer(self.compositor, 'Arial', TRACK_FONT_SIZE,
+                                          fg=TRACK_COLOR, weight='bold',
+                                          text="Waiting for Spotify...")
+        self.artist_marquee = MarqueeLayer(self.compositor, 'Arial', ARTIST_FONT_SIZE,
+                                           fg=ARTIST_COLOR)
+        self.progress_canvas = ProgressLayer(self.compositor)
+        self.progress_bar = self.progress_canvas.create_rectangle(0, 0, 0, 4, fill=PROGRESS_COLOR)
+        self.progress_width = 0
+        self.current_time_label = TextLayer(self.compositor, text="0:00", fg=ARTIST_COLOR,
+                                            font=('Arial', TIME_FONT_SIZE))
+        self.total_time_label = TextLayer(self.compositor, text="0:00", fg=ARTIST_COLOR,
+                                          font=('Arial', TIME_FONT_SIZE), anchor='e')
+        self.close_button = TextLayer(self.compositor, text="✕", fg='#666666',
+                                      font=('Arial', 16, 'bold'), anchor='e')
+        self.layout_layers()
+    
+    def layout_layers(self):
+        """Place the layers like the widget layout, for the current sizes"""
+        padding = 10
+        self.compositor.resize(WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.album_art_label.place(padding, max(padding, (WINDOW_HEIGHT - ALBUM_ART_SIZE) // 2),
+                                   ALBUM_ART_SIZE, ALBUM_ART_SIZE)
+        close_width = 30
+        self.close_button.place(WINDOW_WIDTH - padding - close_width, padding, close_width,
+                                font_height(load_font('Arial', 16, 'bold')))
         
-        # Start progress update thread
-        self.progress_thread = Thread(target=self.update_progress_loop, daemon=True)
-        self.progress_thread.start()
+        left = padding + ALBUM_ART_SIZE + 15
+        width = max(0, WINDOW_WIDTH - padding - close_width - left)
+        y = padding + 5
+        for marquee, gap in ((self.track_marquee, 2), (self.artist_marquee, 8)):
+            height = font_height(marquee.font)
+            marquee.place(left, y, width, height)
+            y += height + gap
+        self.progress_canvas.place(left, y, width, 4)
+        y += 4 + 2
+        height = font_height(load_font('Arial', TIME_FONT_SIZE))
+        self.current_time_label.place(left, y, width // 2, height)
+        self.total_time_label.place(left + width // 2, y, width - width // 2, height)
         
-        # Start text scrolling thread
-        self.scroll_thread = Thread(target=self.scroll_text_loop, daemon=True)
-        self.scroll_thread.start()
+        self.progress_width = width
+    
+    def on_view_click(self, event):
+        """Close on the close button, otherwise start dragging (compositor mode)"""
+        if self.close_button.contains(event.x, event.y):
+            self.close()
+        else:
+            self.start_drag(event)
+    
+    def on_view_motion(self, event):
+        """Highlight the close button under the mouse (compositor mode)"""
+        hover = self.close_button.contains(event.x, event.y)
+        self.render.config(self.close_button, fg='#ff0000' if hover else '#666666')
+    
+    def place_window(self):
+        """Size and position the window from the settings"""
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
         
-        # Allow dragging the window
-        for widget in [self.main_frame, self.album_art_label, self.track_label, 
-                       self.artist_label, self.info_frame]:
-            widget.bind('<Button-1>', self.start_drag)
-            widget.bind('<B1-Motion>', self.on_drag)
+        # Calculate position
+        x, y_from_bottom = self.position
+        if x is None:
+            x = POSITION_X
+        if x == -1:
+            # Auto-center horizontally
+            x = (screen_width - WINDOW_WIDTH) // 2
+        
+        if y_from_bottom is None:
+            y_from_bottom = POSITION_Y_FROM_BOTTOM + self.slot * (WINDOW_HEIGHT + 10)
+        y = screen_height - y_from_bottom
+        
+        self.root.geometry(f'{WINDOW_WIDTH}x{WINDOW_HEIGHT}+{x}+{y}')
+    
+    def reload_settings(self, settings):
+        """Apply an edited config.ini to the running overlay (Tk thread)
+        
+        Only settings that changed are touched, and widgets are updated in
+        place. Settings outside LIVE_SETTINGS wait for a restart. If a color
+        is rejected by Tk, nothing at all is applied.
+        """
+        live = apply_live_settings(settings, self.root)
+        if live:
+            self.update_settings(live)
+        return live
+    
+    def update_settings(self, live):
+        """Update the widgets and poll timing for the named, already applied settings"""
+        if 'OPACITY' in live:
+            self.target_alpha = OPACITY
+            self.fader.full_range = OPACITY or 1.0
+            fading_out = self.fader.active and self.fader.target == 0
+            if self.playback is not None and not fading_out:
+                self.fade_in()
+        if live & {'FADE_DURATION', 'FADE_EASING'}:
+            self.fader.duration = FADE_DURATION
+            self.fader.easing = EASINGS[FADE_EASING]
+            self.crossfade.duration = FADE_DURATION
+        if 'FRAME_RATE' in live:
+            self.frame_scheduler.frame_interval = 1.0 / max(1, FRAME_RATE)
         
+        if live & {'WINDOW_WIDTH', 'WINDOW_HEIGHT', 'POSITION_X', 'POSITION_Y_FROM_BOTTOM'}:
+            self.place_window()
+        if 'ALBUM_ART_SIZE' in live and self.compositor is None:
+            self.render.config(self.album_art_label, width=ALBUM_ART_SIZE, height=ALBUM_ART_SIZE)
+        
+        colors = self.colors()
+        if live & {'PROGRESS_COLOR', 'ALBUM_COLORS'}:
+            self.render.itemconfig(self.progress_canvas, self.progress_bar, fill=colors['progress'])
+        if live & {'TRACK_COLOR', 'ALBUM_COLORS'}:
+            self.track_marquee.set_color(colors['track'])
+        if live & {'ARTIST_COLOR', 'ALBUM_COLORS'}:
+            self.artist_marquee.set_color(colors['artist'])
+        if 'TRACK_FONT_SIZE' in live:
+            self.track_marquee.set_font_size(TRACK_FONT_SIZE)
+        if 'ARTIST_FONT_SIZE' in live:
+            self.artist_marquee.set_font_size(ARTIST_FONT_SIZE)
+        if live & {'ARTIST_COLOR', 'ALBUM_COLORS', 'TIME_FONT_SIZE'}:
+            for label in (self.current_time_label, self.total_time_label):
+                self.render.config(label, fg=colors['artist'], font=('Arial', TIME_FONT_SIZE))
+        if live & {'SCROLL_SPEED', 'SCROLL_PAUSE'}:
+            for marquee in (self.track_marquee, self.artist_marquee):
+                marquee.speed = max(1, SCROLL_SPEED)
+                marquee.pause = SCROLL_PAUSE
+        if self.compositor is not None and live & {'WINDOW_WIDTH', 'WINDOW_HEIGHT', 'ALBUM_ART_SIZE',
+                                                   'TRACK_FONT_SIZE', 'ARTIST_FONT_SIZE',
+                                                   'TIME_FONT_SIZE'}:
+            self.layout_layers()
+            self.update_progress_bar()
+        
+        # The polling thread picks these up at its next poll
+        if live & {'UPDATE_INTERVAL', 'MIN_POLL_INTERVAL', 'MAX_POLL_INTERVAL', 'TRACK_END_MARGIN'}:
+            self.poll_scheduler = PollScheduler()
+        if live & {'UPDATE_INTERVAL', 'RETRY_MAX_DELAY'}:
+            self.retry_policy.base_delay = UPDATE_INTERVAL
+            self.retry_policy.max_delay = max(RETRY_MAX_DELAY, UPDATE_INTERVAL)
+        if live & {'BREAKER_THRESHOLD', 'BREAKER_COOLDOWN'}:
+            self.circuit_breaker.threshold = BREAKER_THRESHOLD
+            self.circuit_breaker.cooldown = BREAKER_COOLDOWN
+        if 'PROGRESS_TOLERANCE_MS' in live:
+            self.playback_diff.tolerance_ms = PROGRESS_TOLERANCE_MS
+            self.progress.snap_ms = PROGRESS_TOLERANCE_MS
+        if 'PROGRESS_SMOOTHING' in live:
+            self.progress.smoothing = PROGRESS_SMOOTHING
+    
     def start_drag(self, event):
         self.drag_x = event.x_root - self.root.winfo_x()
         self.drag_y = event.y_root - self.root.winfo_y()
@@ -424,46 +3274,81 @@ class SpotifyOverlay:
         y = event.y_root - self.drag_y
         self.root.geometry(f'+{x}+{y}')
     
+    def toggle_profiling(self):
+        """Start or stop the profiler (Tk thread)"""
+        if self.group is not None:
+            self.group.toggle_profiling()
+        elif self.profiler.toggle() and self.profile_task not in self.frame_scheduler.tasks:
+            self.profile_task = self.frame_scheduler.add_task(self.profiler.tick, interval=1)
+    
+    def colors(self):
+        """The progress bar, track and artist colors in use: the album's or the configured ones"""
+        if self.theme is not None and ALBUM_COLORS:
+            return self.theme
+        return {'progress': PROGRESS_COLOR, 'track': TRACK_COLOR, 'artist': ARTIST_COLOR}
+    
+    def apply_theme(self, theme):
+        """Recolor the progress bar and text for an album (None: configured colors)"""
+        self.theme = theme
+        colors = self.colors()
+        self.render.itemconfig(self.progress_canvas, self.progress_bar, fill=colors['progress'])
+        self.track_marquee.set_color(colors['track'])
+        self.artist_marquee.set_color(colors['artist'])
+        for label in (self.current_time_label, self.total_time_label):
+            self.render.config(label, fg=colors['artist'], font=('Arial', TIME_FONT_SIZE))
+    
     def fade_in(self):
         """Smooth fade in animation"""
-        if self.current_alpha < self.target_alpha and not self.is_fading:
-            self.is_fading = True
-            self.animate_fade(self.target_alpha, step=0.05)
+        self.fader.fade_to(self.target_alpha)
     
     def fade_out(self, callback=None):
-        """Smooth fade out animation"""
-        if self.current_alpha > 0 and not self.is_fading:
-            self.is_fading = True
-            self.animate_fade(0, step=-0.05, callback=callback)
-    
-    def animate_fade(self, target, step=0.05, callback=None):
-        """Animate opacity change"""
-        if (step > 0 and self.current_alpha < target) or \
-           (step < 0 and self.current_alpha > target):
-            self.current_alpha = max(0, min(1.0, self.current_alpha + step))
-            self.root.attributes('-alpha', self.current_alpha)
-            self.root.after(20, lambda: self.animate_fade(target, step, callback))
-        else:
-            self.current_alpha = target
-            self.root.attributes('-alpha', self.current_alpha)
-            self.is_fading = False
-            if callback:
-                callback()
+        """Smooth fade out animation; callback runs once the overlay is hidden"""
+        self.fader.fade_to(0, callback=callback)
     
     def load_album_art(self, url):
-        """Download and resize album art"""
+        """Download and resize album art (or fetch it from the cache)
+        
+        Runs on an album art worker thread and returns a PIL image; the
+        PhotoImage is created on the Tk thread in update_album_art. The
+        album's colors are extracted here too, once per album.
+        """
         try:
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            
-            image = Image.open(BytesIO(response.content))
-            image = image.resize((100, 100), Image.Resampling.LANCZOS)
+            image = self.art_cache.get(url)
+            if image is None or image.size != (ALBUM_ART_SIZE, ALBUM_ART_SIZE):
+                start = time.perf_counter()
+                response = get_http_client().get(url)
+                response.raise_for_status()
+                downloaded = time.perf_counter()
+                metrics.observe('overlay_art_download_duration_seconds', downloaded - start)
+                
+                image = decode_album_art(response.content)
+                metrics.observe('overlay_art_decode_duration_seconds',
+                                time.perf_counter() - downloaded)
+                self.art_cache.put(url, image)
             
-            return ImageTk.PhotoImage(image)
+            if ALBUM_COLORS:
+                try:
+                    self.art_cache.theme(url, image)
+                except Exception as e:
+                    print(f"Error extracting album colors: {e}")
+            return image
         except Exception as e:
             print(f"Error loading album art: {e}")
             return None
     
+    def load_crossfade(self, url, old):
+        """Load album art like load_album_art and blend the crossfade to it
+        
+        Runs on an album art worker and returns the list of frames from old
+        (black if None or a different size) to the new art.
+        """
+        image = self.load_album_art(url)
+        if image is None:
+            return None
+        if old is None or old.size != image.size:
+            old = Image.new(image.mode, image.size)
+        return blend_frames(old, image, max(1, round(FADE_DURATION * FRAME_RATE)))
+    
     def format_time(self, ms):
         """Convert milliseconds to MM:SS format"""
         seconds = int(ms / 1000)
@@ -471,197 +3356,261 @@ class SpotifyOverlay:
         seconds = seconds % 60
         return f"{minutes}:{seconds:02d}"
     
+    def estimate_progress(self, now=None):
+        """Extrapolate playback progress from the polls, to now (monotonic)"""
+        return self.progress.position_ms(now) if self.playback is not None else 0
+    
+    def on_progress_configure(self, event):
+        """Remember the progress canvas width and redraw at the new size"""
+        self.progress_width = event.width
+        self.update_progress_bar()
+    
     def update_progress_bar(self):
         """Update the progress bar visual"""
-        if self.duration_ms > 0:
+        playback = self.playback
+        if playback is not None and playback.duration_ms > 0:
             # Calculate progress with local time tracking for smoothness
-            current_progress = self.progress_ms
-            if self.is_playing:
-                elapsed = (time.time() - self.last_update) * 1000
-                current_progress = min(self.duration_ms, self.progress_ms + elapsed)
-            
-            progress_ratio = current_progress / self.duration_ms
-            canvas_width = self.progress_canvas.winfo_width()
-            bar_width = canvas_width * progress_ratio
-            
-            self.progress_canvas.coords(self.progress_bar, 0, 0, bar_width, 4)
-            self.current_time_label.config(text=self.format_time(current_progress))
-    
-    def update_progress_loop(self):
-        """Background thread for smooth progress updates"""
-        while self.running:
-            if self.is_playing and self.duration_ms > 0:
-                self.root.after(0, self.update_progress_bar)
-            time.sleep(0.1)  # Update 10 times per second for smoothness
-    
-    def scroll_text_loop(self):
-        """Background thread for scrolling long text"""
-        while self.running:
-            if not self.scroll_paused:
-                # Scroll track name if needed
-                if len(self.full_track_text) > self.max_text_length:
-                    self.track_scroll_pos = (self.track_scroll_pos + 1) % (len(self.full_track_text) + 5)
-                    self.update_scrolling_track()
-                
-                # Scroll artist name if needed
-                if len(self.full_artist_text) > self.max_text_length:
-                    self.artist_scroll_pos = (self.artist_scroll_pos + 1) % (len(self.full_artist_text) + 5)
-                    self.update_scrolling_artist()
-            
-            time.sleep(0.15)  # Scroll speed (lower = faster)
-    
-    def update_scrolling_track(self):
-        """Update scrolling track text display"""
-        if len(self.full_track_text) > self.max_text_length:
-            # Add padding for smooth loop
-            padded_text = self.full_track_text + "     "
+            current_progress = self.progress.position_ms()
             
-            # Get visible portion
-            visible = padded_text[self.track_scroll_pos:self.track_scroll_pos + self.max_text_length]
+            progress_ratio = current_progress / playback.duration_ms
+            bar_width = round(self.progress_width * progress_ratio)
             
-            # Wrap around if needed
-            if len(visible) < self.max_text_length:
-                visible += padded_text[:self.max_text_length - len(visible)]
-            
-            self.root.after(0, lambda: self.track_label.config(text=f"♪ {visible}"))
+            self.render.coords(self.progress_canvas, self.progress_bar, 0, 0, bar_width, 4)
+            self.render.config(self.current_time_label, text=self.format_time(current_progress))
     
-    def update_scrolling_artist(self):
-        """Update scrolling artist text display"""
-        if len(self.full_artist_text) > self.max_text_length:
-            # Add padding for smooth loop
-            padded_text = self.full_artist_text + "     "
-            
-            # Get visible portion
-            visible = padded_text[self.artist_scroll_pos:self.artist_scroll_pos + self.max_text_length]
-            
-            # Wrap around if needed
-            if len(visible) < self.max_text_length:
-                visible += padded_text[:self.max_text_length - len(visible)]
-            
-            self.root.after(0, lambda: self.artist_label.config(text=visible))
+    def update_progress(self):
+        """Frame task: redraw the progress bar while playing"""
+        playback = self.playback
+        if playback is not None and playback.is_playing and playback.duration_ms > 0:
+            self.update_progress_bar()
     
     def monitor_spotify(self):
         """Background thread to monitor Spotify"""
         while self.running:
+            time.sleep(self.poll_once())
+    
+    def poll_once(self):
+        """Poll once (unless the circuit breaker is open); returns seconds until the next poll"""
+        delay = self.poll_blocked_for()
+        if delay is None:
             try:
-                track_info = get_current_track()
-                
-                if track_info:
-                    track_id = f"{track_info['track']}|{track_info['artist']}"
-                    
-                    # Check if track changed
-                    if track_id != self.current_track:
-                        # Fade out before changing
-                        if self.current_track is not None:
-                            self.fade_out(callback=lambda: self.change_track(track_info))
-                        else:
-                            self.change_track(track_info)
-                    else:
-                        # Just update progress info
-                        self.progress_ms = track_info['progress_ms']
-                        self.duration_ms = track_info['duration_ms']
-                        self.is_playing = track_info['is_playing']
-                        self.last_update = time.time()
-                        
-                        # Update total time if needed
-                        self.root.after(0, lambda: self.total_time_label.config(
-                            text=self.format_time(self.duration_ms)
-                        ))
-                else:
-                    if self.current_track is not None:
-                        self.fade_out(callback=self.clear_track)
-                        
+                delay = self.poll_succeeded(get_current_track(self.account))
             except Exception as e:
-                print(f"Error: {e}")
+                delay = self.poll_failed(e)
+        return delay
+    
+    def poll_blocked_for(self):
+        """None if a poll may go out now, else seconds until the circuit breaker allows one
+        
+        While the breaker is open no calls are made; the progress bar keeps
+        extrapolating from the last good poll.
+        """
+        return self.circuit_breaker.time_until_retry()
+    
+    def poll_succeeded(self, track_info):
+        """Apply a poll result; returns seconds until the next poll"""
+        self.circuit_breaker.record_success()
+        self.retry_policy.reset()
+        changed = self.handle_poll(track_info)
+        return self.poll_scheduler.next_interval(track_info, changed)
+    
+    def poll_failed(self, error):
+        """Record a failed poll; returns seconds until the retry"""
+        prefix = f"[{self.account.name}] " if self.account.name else ""
+        print(f"{prefix}Error: {error or type(error).__name__}")
+        retry_after = getattr(error, 'retry_after', None)
+        self.circuit_breaker.record_failure(retry_after)
+        self.poll_scheduler.reset()
+        return self.retry_policy.next_delay(retry_after)
+    
+    def network_stats(self):
+        """Retry and circuit breaker metrics"""
+        stats = self.circuit_breaker.stats()
+        stats['retries'] = self.retry_policy.retries
+        return stats
+    
+    def collect_metrics(self):
+        """Metrics collector: Tk callbacks, album art cache and circuit breaker
+        
+        In a group the shared scheduler and cache are reported once by the
+        group, and the circuit breaker metrics get an account label.
+        """
+        samples = []
+        labels = {}
+        if self.group is None:
+            samples = shared_metrics(self.frame_scheduler, self.art_cache)
+        else:
+            labels = {'account': self.account.name}
+        
+        network = self.network_stats()
+        samples.append(('spotify_poll_retries_total', 'counter', network['retries'], labels))
+        samples.append(('spotify_circuit_open', 'gauge',
+                        int(network['state'] != 'closed'), labels))
+        return samples
+    
+    def handle_poll(self, track_info):
+        """Apply one poll result; returns True if playback changed
+        
+        Called from whichever thread polls Spotify. Widget updates are
+        posted to the frame scheduler.
+        """
+        changed = False
+        # The estimate as of when Spotify sampled progress_ms, not as of now:
+        # a slow round trip alone is no progress change
+        expected = self.estimate_progress(track_info.sampled_at) if track_info else None
+        changes = self.playback_diff.diff(track_info, expected)
+        shown = self.playback
+        
+        if track_info:
+            new_track = shown is None or track_info.track_id != shown.track_id
+            
+            # Check if track changed (or playback resumed)
+            changed = new_track or track_info.is_playing != shown.is_playing
             
-            time.sleep(UPDATE_INTERVAL)
+            if new_track:
+                self.track_seen_at = time.perf_counter()
+                # Fade out before changing, unless the art crossfades
+                if shown is not None and TRANSITION == 'fade':
+                    self.frame_scheduler.post(
+                        lambda: self.fade_out(callback=lambda: self.change_track(track_info))
+                    )
+                else:
+                    self.frame_scheduler.post(lambda: self.change_track(track_info))
+            else:
+                # Every poll refines the position estimate (no UI work needed)
+                self.progress.update(track_info)
+                self.playback = track_info
+                
+                # Update total time if needed
+                if 'duration_ms' in changes:
+                    self.frame_scheduler.post(lambda: self.render.config(
+                        self.total_time_label, text=self.format_time(track_info.duration_ms)
+                    ))
+        else:
+            if shown is not None:
+                changed = True
+                self.frame_scheduler.post(lambda: self.fade_out(callback=self.clear_track))
+        
+        if changes and self.now_playing is not None:
+            self.now_playing.publish(track_info)
+        
+        return changed
     
     def change_track(self, track_info):
-        """Change to a new track with fade-in"""
-        self.current_track = f"{track_info['track']}|{track_info['artist']}"
+        """Change to a new track with fade-in (Tk thread)"""
+        self.progress.reset(track_info)
+        self.playback = track_info
         
         # Store full text for scrolling
-        self.full_track_text = track_info['track']
-        self.full_artist_text = track_info['artist']
-        
-        # Reset scroll positions
-        self.track_scroll_pos = 0
-        self.artist_scroll_pos = 0
-        
-        # Load album art if available
-        if track_info.get('album_art_url'):
-            album_art = self.load_album_art(track_info['album_art_url'])
-            if album_art:
-                self.current_image = album_art
-                self.update_album_art(album_art)
+        self.full_track_text = track_info.track
+        self.full_artist_text = track_info.artist
         
-        # Update text (will be truncated or scrolled as needed)
-        self.update_display(track_info['track'], track_info['artist'])
+        # Load album art in the background; it swaps in (or crossfades in)
+        # once ready. Albums seen before are recolored now, together with
+        # the text
+        if track_info.album_art_url:
+            self.apply_theme(self.art_cache.theme(track_info.album_art_url))
+            if TRANSITION == 'crossfade':
+                old = self.current_art
+                load = lambda url: self.load_crossfade(url, old)
+            else:
+                load = self.load_album_art
+            self.art_loader.submit(load, track_info.album_art_url, self.update_album_art)
+        else:
+            self.apply_theme(None)
+            self.art_loader.cancel()
         
-        # Update progress info
-        self.progress_ms = track_info['progress_ms']
-        self.duration_ms = track_info['duration_ms']
-        self.is_playing = track_info['is_playing']
-        self.last_update = time.time()
+        # Update text (scrolls if wider than the window)
+        self.update_display(track_info.track, track_info.artist)
         
         # Update time labels
-        self.root.after(0, lambda: self.total_time_label.config(
-            text=self.format_time(self.duration_ms)
-        ))
+        self.render.config(self.total_time_label, text=self.format_time(track_info.duration_ms))
         
         # Fade in
         self.fade_in()
+        
+        if self.track_seen_at is not None:
+            metrics.observe('overlay_track_change_paint_seconds',
+                            time.perf_counter() - self.track_seen_at)
+            self.track_seen_at = None
     
     def clear_track(self):
-        """Clear track info"""
-        self.current_track = None
-        self.current_image = None
-        self.progress_ms = 0
-        self.duration_ms = 0
-        self.is_playing = False
+        """Clear track info (Tk thread)"""
+        self.playback = None
+        self.progress.reset()
         self.full_track_text = ""
         self.full_artist_text = ""
-        self.track_scroll_pos = 0
-        self.artist_scroll_pos = 0
         self.update_display("No track playing", "")
+        self.art_loader.cancel()
         self.clear_album_art()
-        self.root.after(0, lambda: self.progress_canvas.coords(self.progress_bar, 0, 0, 0, 4))
-        self.root.after(0, lambda: self.current_time_label.config(text="0:00"))
-        self.root.after(0, lambda: self.total_time_label.config(text="0:00"))
+        self.apply_theme(None)
+        self.render.coords(self.progress_canvas, self.progress_bar, 0, 0, 0, 4)
+        self.render.config(self.current_time_label, text="0:00")
+        self.render.config(self.total_time_label, text="0:00")
     
     def update_display(self, track, artist):
-        """Update the text labels"""
-        def update():
-            # Truncate or prepare for scrolling
-            if len(track) <= self.max_text_length:
-                self.track_label.config(text=f"♪ {track}")
-            else:
-                # Will be handled by scroll thread
-                self.track_label.config(text=f"♪ {track[:self.max_text_length]}...")
-            
-            if len(artist) <= self.max_text_length:
-                self.artist_label.config(text=artist)
-            else:
-                # Will be handled by scroll thread
-                self.artist_label.config(text=f"{artist[:self.max_text_length]}...")
-        
-        self.root.after(0, update)
+        """Update the track and artist text"""
+        self.track_marquee.set_text(f"♪ {track}")
+        self.artist_marquee.set_text(artist)
     
-    def update_album_art(self, photo):
-        """Update the album art image"""
+    def update_album_art(self, image, generation):
+        """Show loaded album art, or play its crossfade frames, unless the track has moved on"""
         def update():
-            self.album_art_label.config(image=photo)
-        self.root.after(0, update)
+            if not self.art_loader.is_current(generation):
+                return
+            frames = image if isinstance(image, list) else [image]
+            # The compositor draws the PIL images itself
+            self.crossfade.start([(frame, None if self.compositor else ImageTk.PhotoImage(frame))
+                                  for frame in frames])
+            playback = self.playback
+            if playback is not None and playback.album_art_url:
+                self.apply_theme(self.art_cache.theme(playback.album_art_url))
+        self.frame_scheduler.post(update)
+        # The last crossfade frame is the new art
+        playback = self.playback
+        if self.now_playing is not None and playback is not None and playback.album_art_url \
+                and self.art_loader.is_current(generation):
+            self.share_album_art(playback.album_art_url,
+                                 image[-1] if isinstance(image, list) else image)
+    
+    def share_album_art(self, url, image):
+        """Save the art as a PNG for now-playing readers (art worker thread)"""
+        try:
+            self.now_playing.write_art(url, image)
+        except OSError as e:
+            print(f"Error sharing album art: {e}")
+    
+    def show_album_art(self, image, photo):
+        """Show one album art image (or crossfade frame)"""
+        self.current_art = image
+        self.current_image = photo
+        self.render.config(self.album_art_label, image=image if self.compositor else photo)
     
     def clear_album_art(self):
         """Clear the album art"""
-        def update():
-            self.album_art_label.config(image='')
-        self.root.after(0, update)
+        self.crossfade.cancel()
+        self.current_art = None
+        self.current_image = None
+        self.render.config(self.album_art_label, image='')
     
     def close(self):
         """Clean shutdown"""
         self.running = False
+        metrics.remove_collector(self.collect_metrics)
+        self.art_loader.shutdown()
+        if self.view is not None:
+            self.view.close()
+        if self.now_playing is not None:
+            self.now_playing.close()
+        if self.group is not None:
+            # Only this window goes; the group quits after the last one
+            for task in self.frame_tasks:
+                self.frame_scheduler.remove_task(task)
+            self.root.destroy()
+            self.group.remove(self)
+            return
+        self.profiler.stop()
+        self.frame_scheduler.stop()
         self.root.quit()
     
     def run(self):
@@ -674,30 +3623,88 @@ class SpotifyOverlay:
         self.root.mainloop()
 
 
-def main():
-    """Main entry point with authentication"""
-    global access_token, refresh_token
+class OverlayGroup:
+    """Overlays for several accounts in one process
     
-    print("=== Spotify Milkdrop Overlay ===\n")
+    One hidden Tk root with a Toplevel per account, sharing one frame
+    scheduler, one poller, one album art worker pool and profiler, plus the
+    module-wide HTTP client and album art cache. Each overlay polls with its
+    own SpotifyAccount tokens. The asyncio network engine is not used here.
+    """
     
-    # Check if credentials are configured
-    if CLIENT_ID == "YOUR_CLIENT_ID_HERE" or CLIENT_SECRET == "YOUR_CLIENT_SECRET_HERE":
-        print("ERROR: Please configure your Spotify API credentials in config.ini!")
-        print("\nSteps:")
-        print("1. Open config.ini in a text editor")
-        print("2. Replace YOUR_CLIENT_ID_HERE with your actual Client ID")
-        print("3. Replace YOUR_CLIENT_SECRET_HERE with your actual Client Secret")
-        print("\nGet credentials at: https://developer.spotify.com/dashboard")
-        return
+    def __init__(self, accounts, positions=None):
+        if NETWORK_ENGINE == 'asyncio':
+            print("Ignoring engine = asyncio: several accounts always poll through the "
+                  "shared poller")
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.frame_scheduler = FrameScheduler(self.root)
+        self.poller = SharedPoller()
+        self.art_executor = futures.ThreadPoolExecutor(max_workers=ART_WORKERS,
+                                                       thread_name_prefix='album-art')
+        self.profiler = Profiler()
+        self.profile_task = None
+        metrics.add_collector(self.collect_metrics)
+        
+        positions = positions or [None] * len(accounts)
+        self.overlays = [
+            SpotifyOverlay(account=account, group=self, position=position, slot=slot)
+            for slot, (account, position) in enumerate(zip(accounts, positions))
+        ]
+        if PROFILING_ENABLED:
+            self.toggle_profiling()
+        self.poller.start()
+        self.frame_scheduler.start()
     
-    print(f"Configuration loaded from {config_file}")
-    print(f"- Update interval: {UPDATE_INTERVAL} seconds")
-    print(f"- Opacity: {OPACITY}")
-    print(f"- Window size: {WINDOW_WIDTH}x{WINDOW_HEIGHT}\n")
+    def collect_metrics(self):
+        """Metrics collector: the shared Tk callbacks and album art cache"""
+        return shared_metrics(self.frame_scheduler, get_album_art_cache())
+    
+    def toggle_profiling(self):
+        """Start or stop the shared profiler (Tk thread)"""
+        if self.profiler.toggle() and self.profile_task not in self.frame_scheduler.tasks:
+            self.profile_task = self.frame_scheduler.add_task(self.profiler.tick, interval=1)
+    
+    def reload_settings(self, settings):
+        """Apply an edited config.ini to every overlay (Tk thread)"""
+        live = apply_live_settings(settings, self.root)
+        if live:
+            for overlay in self.overlays:
+                overlay.update_settings(live)
+        return live
+    
+    def remove(self, overlay):
+        """Forget a closed overlay; closing the last one shuts the group down"""
+        if overlay in self.overlays:
+            self.overlays.remove(overlay)
+            if not self.overlays:
+                self.close()
+    
+    def close(self):
+        """Close every overlay and stop the shared workers"""
+        overlays, self.overlays = self.overlays, []
+        for overlay in overlays:
+            overlay.close()
+        metrics.remove_collector(self.collect_metrics)
+        self.profiler.stop()
+        self.poller.stop()
+        self.frame_scheduler.stop()
+        self.art_executor.shutdown(wait=False, cancel_futures=True)
+        self.root.quit()
     
+    def run(self):
+        """Start the overlays"""
+        print(f"Spotify Overlay started for {len(self.overlays)} accounts!")
+        print("- Left-click and drag to move")
+        print("- Click the X button to close an overlay")
+        self.root.mainloop()
+
+
+def authenticate_with_browser(account=None):
+    """Run the browser OAuth flow; returns True on success"""
     # Get authorization
     print("Opening browser for Spotify authentication...")
-    auth_url = get_auth_url()
+    auth_url = get_auth_url(account)
     webbrowser.open(auth_url)
     
     # Wait for callback automatically
@@ -707,17 +3714,84 @@ def main():
         print("\n✓ Authorization code received!")
         print("Authenticating...")
         
-        if get_token_from_code(auth_code):
+        if get_token_from_code(auth_code, account):
             print("✓ Authentication successful!\n")
-            
-            # Start the overlay
-            overlay = SpotifyOverlay()
-            overlay.run()
+            return True
         else:
             print("✗ Authentication failed!")
     else:
         print("\n✗ No authorization code received.")
         print("Please try again and complete the authorization in your browser.")
+    return False
+
+
+def main(settings=None):
+    """Main entry point with authentication"""
+    print("=== Spotify Milkdrop Overlay ===\n")
+    
+    if settings is None:
+        try:
+            settings = load_settings(config_file)
+        except FileNotFoundError:
+            print(f"ERROR: {config_file} not found!")
+            print("Please create config.ini with your Spotify API credentials.")
+            sys.exit(1)
+    apply_settings(settings)
+    
+    # One overlay per [account NAME] section, or just the [spotify] account
+    accounts = [
+        SpotifyAccount(account['name'], account['client_id'], account['client_secret'],
+                       account['token_file'])
+        for account in ACCOUNTS
+    ] or [default_account]
+    
+    # Check if credentials are configured
+    if any(account.client_id == "YOUR_CLIENT_ID_HERE" or
+           account.client_secret == "YOUR_CLIENT_SECRET_HERE" for account in accounts):
+        print("ERROR: Please configure your Spotify API credentials in config.ini!")
+        print("\nSteps:")
+        print("1. Open config.ini in a text editor")
+        print("2. Replace YOUR_CLIENT_ID_HERE with your actual Client ID")
+        print("3. Replace YOUR_CLIENT_SECRET_HERE with your actual Client Secret")
+        print("\nGet credentials at: https://developer.spotify.com/dashboard")
+        return
+    
+    print(f"Configuration loaded from {config_file}")
+    print(f"- Update interval: {UPDATE_INTERVAL} seconds "
+          f"(adaptive {MIN_POLL_INTERVAL}-{MAX_POLL_INTERVAL}s)")
+    print(f"- Opacity: {OPACITY}")
+    print(f"- Window size: {WINDOW_WIDTH}x{WINDOW_HEIGHT}\n")
+    
+    # Reuse the saved token if there is one, otherwise go through the browser
+    for account in accounts:
+        if account.name:
+            print(f"Account {account.name}:")
+        if not restore_saved_session(account) and not authenticate_with_browser(account):
+            return
+    
+    # Pre-open connections to the API and image hosts in the background
+    if WARM_UP_CONNECTIONS:
+        Thread(target=get_http_client().warm_up, daemon=True).start()
+    
+    if METRICS_ENABLED:
+        server = start_metrics_server()
+        print(f"Metrics at http://{METRICS_HOST}:{server.server_address[1]}/metrics\n")
+    
+    # Start the overlay
+    if ACCOUNTS:
+        overlay = OverlayGroup(accounts, [(account['position_x'], account['position_y_from_bottom'])
+                                          for account in ACCOUNTS])
+    else:
+        overlay = SpotifyOverlay()
+    if RELOAD_INTERVAL > 0:
+        # Parsed off the Tk thread; applied on the next frame
+        ConfigWatcher(config_file, lambda new: overlay.frame_scheduler.post(
+            lambda: overlay.reload_settings(new))).start()
+    if hasattr(signal, 'SIGUSR1'):
+        # The handler only queues the toggle; it runs on the next frame
+        signal.signal(signal.SIGUSR1,
+                      lambda signum, frame: overlay.frame_scheduler.post(overlay.toggle_profiling))
+    overlay.run()
 
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ This test suite covers utility functions and components from the Spotify overlay
 
 import pytest
 import time
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import ANY, Mock, patch, MagicMock
 from urllib.parse import parse_qs, urlparse
 import sys
 import os
@@ -17,33 +17,8 @@ sys.modules['tkinter.ttk'] = MagicMock()
 sys.modules['PIL'] = MagicMock()
 sys.modules['PIL.Image'] = MagicMock()
 sys.modules['PIL.ImageTk'] = MagicMock()
-
-# Create a mock config.ini file if it doesn't exist
-if not os.path.exists('config.ini'):
-    with open('config.ini', 'w') as f:
-        f.write("""[spotify]
-client_id = TEST_CLIENT_ID
-client_secret = TEST_CLIENT_SECRET
-redirect_uri = http://127.0.0.1:8888/callback
-scope = user-read-currently-playing user-read-playback-state
-
-[overlay]
-opacity = 0.85
-update_interval = 2
-window_width = 400
-window_height = 140
-position_x = -1
-position_y_from_bottom = 200
-max_text_length = 35
-
-[appearance]
-progress_color = #1DB954
-track_color = white
-artist_color = #b3b3b3
-track_font_size = 14
-artist_font_size = 11
-time_font_size = 9
-""")
+sys.modules['PIL.ImageDraw'] = MagicMock()
+sys.modules['PIL.ImageFont'] = MagicMock()
 
 # Now import the module we're testing
 from spotify_milkdrop_overlay import (
@@ -56,6 +31,26 @@ from spotify_milkdrop_overlay import (
 )
 
 
+@pytest.fixture
+def fake_spotify(monkeypatch, tmp_path):
+    """Point the overlay's network calls at a local fake Spotify server"""
+    import spotify_milkdrop_overlay
+    from fake_spotify_server import FakeSpotifyServer
+
+    monkeypatch.setattr(spotify_milkdrop_overlay, 'TOKEN_FILE', str(tmp_path / 'tokens.json'))
+    monkeypatch.setattr(spotify_milkdrop_overlay, 'refresh_token', None)
+
+    with FakeSpotifyServer() as server:
+        client = spotify_milkdrop_overlay.HTTPClient(hosts=[server.url])
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'http_client', client)
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'API_BASE_URL', server.url)
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'ACCOUNTS_BASE_URL', server.url)
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'access_token', 'token')
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'token_expires', time.time() + 3600)
+        yield server
+        client.close()
+
+
 class TestFormatTime:
     """Comprehensive tests for the format_time function"""
 
@@ -280,52 +275,1951 @@ class TestSpotifyOverlayUtilities:
         overlay = SpotifyOverlay()
 
         # Verify initial state
-        assert overlay.current_track is None
+        assert overlay.playback is None
         assert overlay.current_image is None
         assert overlay.running is True
-        assert overlay.progress_ms == 0
-        assert overlay.duration_ms == 0
-        assert overlay.is_playing is False
+        assert overlay.estimate_progress() == 0
+
+    def _measure_like_fixed_width(self, overlay, width=300):
+        """Give the mocked marquees an 8px-per-character font and a known width"""
+        for marquee in (overlay.track_marquee, overlay.artist_marquee):
+            marquee.font.measure = lambda text: 8 * len(text)
+            marquee.on_configure(Mock(width=width))
 
     def test_overlay_text_truncation_short_text(self):
-        """Test that short text is not truncated"""
+        """Test that text narrower than the window does not scroll"""
         from spotify_milkdrop_overlay import SpotifyOverlay
         overlay = SpotifyOverlay()
+        self._measure_like_fixed_width(overlay)
 
-        # Short track name should not be scrolled
-        overlay.full_track_text = "Short Song"
-        overlay.full_artist_text = "Artist"
+        overlay.update_display("Short Song", "Artist")
 
-        assert len(overlay.full_track_text) <= overlay.max_text_length
-        assert len(overlay.full_artist_text) <= overlay.max_text_length
+        assert not overlay.track_marquee.scrolling
+        assert not overlay.artist_marquee.scrolling
 
     def test_overlay_handles_long_text(self):
-        """Test that long text triggers scrolling behavior"""
+        """Test that text wider than the window triggers scrolling behavior"""
         from spotify_milkdrop_overlay import SpotifyOverlay
         overlay = SpotifyOverlay()
+        self._measure_like_fixed_width(overlay)
 
         # Very long track name
         long_text = "This is an extremely long song title that should definitely trigger scrolling"
-        overlay.full_track_text = long_text
+        overlay.update_display(long_text, "Artist")
 
-        assert len(overlay.full_track_text) > overlay.max_text_length
+        assert overlay.track_marquee.scrolling
+        assert overlay.track_marquee.text_width == 8 * len(f"♪ {long_text}")
+        assert not overlay.artist_marquee.scrolling
 
 
 class TestConfigurationLoading:
     """Tests for configuration file loading"""
 
-    def test_config_values_loaded(self):
+    def test_config_values_loaded(self, tmp_path):
         """Test that configuration values are loaded correctly"""
-        # The config.ini in the repo may have different values
-        # Just test that they were loaded (not default placeholder values or empty)
-        assert CLIENT_ID is not None
-        assert len(CLIENT_ID) > 0
-        assert CLIENT_SECRET is not None
-        assert len(CLIENT_SECRET) > 0
-        assert REDIRECT_URI is not None
-        assert 'http' in REDIRECT_URI
-        assert SCOPE is not None
-        assert 'user-read' in SCOPE
+        from spotify_milkdrop_overlay import load_settings
+        path = tmp_path / 'config.ini'
+        path.write_text("[spotify]\nclient_id = abc\n\n[overlay]\nopacity = 0.5\n")
+
+        settings = load_settings(str(path))
+        assert settings.CLIENT_ID == 'abc'
+        assert settings.OPACITY == 0.5
+        # Anything missing falls back to the defaults
+        assert 'user-read' in settings.SCOPE
+        assert settings.UPDATE_INTERVAL == 2
+
+    def test_missing_config_file(self, tmp_path):
+        """Test that a missing file is reported instead of silently using defaults"""
+        from spotify_milkdrop_overlay import load_settings
+        with pytest.raises(FileNotFoundError):
+            load_settings(str(tmp_path / 'missing.ini'))
+
+    def test_apply_settings(self, monkeypatch):
+        """Test that applied settings are used by objects created afterwards"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import Settings, apply_settings, PollScheduler
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'UPDATE_INTERVAL',
+                            spotify_milkdrop_overlay.UPDATE_INTERVAL)
+        settings = Settings()
+        settings.UPDATE_INTERVAL = 7
+        apply_settings(settings)
+        assert PollScheduler().interval == 7
+
+    def test_import_is_fast_and_side_effect_free(self, tmp_path):
+        """Test importing without config.ini, and that heavy modules stay unloaded"""
+        import subprocess
+        root = os.path.dirname(os.path.abspath(__file__))
+        code = (
+            "import sys; sys.path.insert(0, %r)\n"
+            "import spotify_milkdrop_overlay as overlay\n"
+            "heavy = ['tkinter', 'PIL.Image', 'requests', 'http.server', 'asyncio', 'webbrowser']\n"
+            "loaded = [name for name in heavy if name in sys.modules and "
+            "not type(sys.modules[name]).__name__.startswith('_Lazy')]\n"
+            "print(loaded, overlay.CLIENT_ID)\n"
+        ) % root
+        result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path,
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == ['[]', 'YOUR_CLIENT_ID_HERE']
+
+    def test_lazy_submodules_are_bound_on_their_package(self, tmp_path):
+        """Test that asyncio (which reads concurrent.futures) works after a bare import"""
+        import subprocess
+        root = os.path.dirname(os.path.abspath(__file__))
+        code = (
+            "import sys; sys.path.insert(0, %r)\n"
+            "import spotify_milkdrop_overlay as overlay\n"
+            "import concurrent\n"
+            "assert concurrent.futures is overlay.futures\n"
+            "overlay.AsyncSpotifyEngine(None).loop.close()\n"
+        ) % root
+        result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path,
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+
+
+class TestConfigReload:
+    """Tests for applying config.ini edits to a running overlay"""
+
+    @staticmethod
+    def _write(path, overlay_section, stamp):
+        path.write_text("[spotify]\nclient_id = TEST_CLIENT_ID\n\n[overlay]\n" + overlay_section)
+        os.utime(path, ns=(stamp, stamp))
+
+    def test_watcher_reports_only_valid_edits(self, tmp_path):
+        """Test mtime polling and rejection of invalid edits"""
+        from spotify_milkdrop_overlay import ConfigWatcher
+        path = tmp_path / 'config.ini'
+        self._write(path, "opacity = 0.85\n", 1_000_000_000)
+        changes = []
+        watcher = ConfigWatcher(str(path), changes.append, interval=1)
+
+        assert watcher.check() is None
+
+        self._write(path, "opacity = 0.5\n", 2_000_000_000)
+        assert watcher.check().OPACITY == 0.5
+        assert watcher.check() is None
+
+        for stamp, section in enumerate(["opacity = high\n", "opacity = 3\n",
+                                         "fade_easing = bounce\n", "opacity 0.4\n"], 3):
+            self._write(path, section, stamp * 1_000_000_000)
+            assert watcher.check() is None
+        assert watcher.rejected == 4
+        assert len(changes) == 1
+
+    def test_overlay_applies_only_changed_live_settings(self, monkeypatch):
+        """Test that a reload updates the live widgets in place"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, Settings, LIVE_SETTINGS
+
+        for name in LIVE_SETTINGS | {'CLIENT_ID'}:
+            monkeypatch.setattr(spotify_milkdrop_overlay, name, getattr(spotify_milkdrop_overlay, name))
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            overlay = SpotifyOverlay()
+        overlay.track_marquee = Mock()
+        overlay.progress_canvas = Mock()
+        original_scheduler = overlay.poll_scheduler
+
+        settings = Settings()
+        for name in vars(settings):
+            setattr(settings, name, getattr(spotify_milkdrop_overlay, name))
+        settings.OPACITY = 0.5
+        settings.TRACK_FONT_SIZE = 20
+        settings.PROGRESS_COLOR = '#ff0000'
+        settings.CLIENT_ID = 'someone-else'
+
+        applied = overlay.reload_settings(settings)
+
+        assert applied == {'OPACITY', 'TRACK_FONT_SIZE', 'PROGRESS_COLOR'}
+        assert overlay.target_alpha == 0.5
+        overlay.track_marquee.set_font_size.assert_called_once_with(20)
+        overlay.track_marquee.set_color.assert_not_called()
+        overlay.progress_canvas.itemconfig.assert_called_once_with(overlay.progress_bar,
+                                                                   fill='#ff0000')
+        assert overlay.poll_scheduler is original_scheduler
+        # Credentials only change on a restart
+        assert spotify_milkdrop_overlay.CLIENT_ID != 'someone-else'
+
+    def test_rejected_color_leaves_everything_untouched(self, monkeypatch):
+        """Test that an edit Tk refuses is not partly applied"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, Settings, LIVE_SETTINGS
+
+        for name in LIVE_SETTINGS:
+            monkeypatch.setattr(spotify_milkdrop_overlay, name, getattr(spotify_milkdrop_overlay, name))
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            overlay = SpotifyOverlay()
+        overlay.root = Mock()
+        overlay.root.winfo_rgb.side_effect = Exception('unknown color name "notacolor"')
+        before = overlay.target_alpha
+
+        settings = Settings()
+        for name in vars(settings):
+            setattr(settings, name, getattr(spotify_milkdrop_overlay, name))
+        settings.OPACITY = 0.3
+        settings.TRACK_COLOR = 'notacolor'
+
+        assert overlay.reload_settings(settings) == set()
+        assert overlay.target_alpha == before
+        assert spotify_milkdrop_overlay.OPACITY != 0.3
+
+
+class TestHTTPClient:
+    """Tests for the shared keep-alive HTTP client"""
+
+    def test_client_applies_configured_timeouts(self):
+        """Test that requests get explicit connect/read timeouts by default"""
+        from spotify_milkdrop_overlay import HTTPClient
+        client = HTTPClient(connect_timeout=1.5, read_timeout=4)
+        client.session.get = Mock()
+
+        client.get('https://api.spotify.com/v1/me')
+        assert client.session.get.call_args[1]['timeout'] == (1.5, 4)
+
+        client.get('https://api.spotify.com/v1/me', timeout=9)
+        assert client.session.get.call_args[1]['timeout'] == 9
+
+    def test_deadline_caps_timeouts(self):
+        """Test that requests made under a deadline time out within it"""
+        from spotify_milkdrop_overlay import HTTPClient
+        client = HTTPClient(connect_timeout=1.5, read_timeout=4)
+        client.session.get = Mock()
+
+        client.run_with_deadline(2, client.get, 'https://api.spotify.com/v1/me')
+        connect, read = client.session.get.call_args[1]['timeout']
+        assert connect == 1.5
+        assert 1.9 < read <= 2
+
+        client.get('https://api.spotify.com/v1/me')
+        assert client.session.get.call_args[1]['timeout'] == (1.5, 4)
+
+    def test_each_known_host_has_its_own_pool(self):
+        """Test that the Spotify hosts do not share a connection pool"""
+        from spotify_milkdrop_overlay import HTTPClient
+        client = HTTPClient()
+        adapters = {
+            id(client.session.get_adapter(url))
+            for url in ('https://api.spotify.com/v1/me',
+                        'https://accounts.spotify.com/api/token',
+                        'https://i.scdn.co/image/abc',
+                        'https://mosaic.scdn.co/640/abc')
+        }
+        assert len(adapters) == 4
+
+    def test_polls_reuse_one_connection(self, fake_spotify):
+        """Test that consecutive polls share a single keep-alive connection"""
+        from spotify_milkdrop_overlay import get_current_track
+
+        for _ in range(5):
+            info = get_current_track()
+            assert info.track == 'Song Title'
+
+        assert fake_spotify.connections == 1
+
+    def test_warm_up_skips_unreachable_hosts(self):
+        """Test that warm-up opens reachable hosts and ignores failures"""
+        from spotify_milkdrop_overlay import HTTPClient
+        from fake_spotify_server import FakeSpotifyServer
+
+        with FakeSpotifyServer() as server:
+            client = HTTPClient(connect_timeout=0.5, read_timeout=0.5)
+            warmed = client.warm_up([server.url, 'http://127.0.0.1:1'])
+            client.close()
+
+        assert warmed == 1
+        assert server.connections == 1
+
+
+class TestPollScheduler:
+    """Tests for the adaptive polling scheduler"""
+
+    def _playing(self, progress_ms, duration_ms=200000, is_playing=True):
+        from spotify_milkdrop_overlay import PlaybackSnapshot
+        return PlaybackSnapshot('id1', 'Song', 'Artist', progress_ms=progress_ms,
+                                duration_ms=duration_ms, is_playing=is_playing)
+
+    def test_playing_mid_track_waits_up_to_max_interval(self):
+        """Test that a track far from its end is polled at max_interval, not update_interval"""
+        from spotify_milkdrop_overlay import PollScheduler
+        scheduler = PollScheduler(interval=2, min_interval=0.5, max_interval=15, end_margin=0.3)
+        assert scheduler.next_interval(self._playing(30000)) == 15
+        # Closer than max_interval to the end: poll just after it
+        assert scheduler.next_interval(self._playing(190000)) == pytest.approx(10.3)
+        # Unknown duration: the normal rate
+        assert scheduler.next_interval(self._playing(30000, duration_ms=0)) == 2
+
+    def test_poll_scheduled_just_after_track_end(self):
+        """Test that the next poll lands just after the predicted track end"""
+        from spotify_milkdrop_overlay import PollScheduler
+        scheduler = PollScheduler(interval=2, min_interval=0.5, max_interval=15, end_margin=0.3)
+        assert scheduler.next_interval(self._playing(199000)) == pytest.approx(1.3)
+        # Never faster than the configured minimum
+        assert scheduler.next_interval(self._playing(200000)) == 0.5
+
+    def test_backs_off_while_paused_up_to_max(self):
+        """Test that paused/idle polling backs off step by step"""
+        from spotify_milkdrop_overlay import PollScheduler
+        scheduler = PollScheduler(interval=2, min_interval=0.5, max_interval=15, end_margin=0.3)
+        paused = self._playing(30000, is_playing=False)
+        delays = [scheduler.next_interval(paused) for _ in range(5)]
+        assert delays == [2, 4, 8, 15, 15]
+        assert [scheduler.next_interval(None) for _ in range(2)] == [15, 15]
+
+    def test_change_returns_to_fast_polling(self):
+        """Test that a detected change resets the backoff"""
+        from spotify_milkdrop_overlay import PollScheduler
+        scheduler = PollScheduler(interval=2, min_interval=0.5, max_interval=15, end_margin=0.3)
+        for _ in range(4):
+            scheduler.next_interval(None)
+        assert scheduler.next_interval(None, changed=True) == 2
+        assert scheduler.next_interval(self._playing(30000, is_playing=False), changed=True) == 2
+
+
+class TestPlaybackDiff:
+    """Tests for the poll change-detection stage"""
+
+    def _info(self, **overrides):
+        from spotify_milkdrop_overlay import PlaybackSnapshot
+        info = PlaybackSnapshot('id1', 'Song', 'Artist', 'Album', 'https://i.scdn.co/image/a',
+                                progress_ms=10000, duration_ms=200000, is_playing=True)
+        return info.replace(**overrides)
+
+    def test_first_poll_reports_every_field(self):
+        """Test that the first snapshot is a full change"""
+        from spotify_milkdrop_overlay import PlaybackDiff
+        diff = PlaybackDiff(tolerance_ms=500)
+        changes = diff.diff(self._info())
+        assert {'track', 'artist', 'progress_ms', 'duration_ms'} <= changes
+        assert diff.short_circuited == 0
+
+    def test_progress_within_extrapolation_is_short_circuited(self):
+        """Test that an expected progress advance triggers no changes"""
+        from spotify_milkdrop_overlay import PlaybackDiff
+        diff = PlaybackDiff(tolerance_ms=500)
+        diff.diff(self._info(progress_ms=10000))
+
+        assert diff.diff(self._info(progress_ms=12100), expected_progress_ms=12000) == set()
+        assert diff.polls == 2
+        assert diff.short_circuited == 1
+
+    def test_seek_beyond_tolerance_reports_progress(self):
+        """Test that a seek is reported as a progress change only"""
+        from spotify_milkdrop_overlay import PlaybackDiff
+        diff = PlaybackDiff(tolerance_ms=500)
+        diff.diff(self._info(progress_ms=10000))
+        assert diff.diff(self._info(progress_ms=90000), expected_progress_ms=12000) == {'progress_ms'}
+
+    def test_default_expectation_is_last_poll_at_the_new_sample_time(self):
+        """Test that progress is compared with the last poll carried to the new sample"""
+        from spotify_milkdrop_overlay import PlaybackDiff
+        diff = PlaybackDiff(tolerance_ms=500)
+        diff.diff(self._info(progress_ms=10000, sampled_at=100.0))
+        assert diff.diff(self._info(progress_ms=13000, sampled_at=103.0)) == set()
+        assert diff.diff(self._info(progress_ms=13000, sampled_at=106.0)) == {'progress_ms'}
+
+    def test_slow_round_trip_is_not_a_progress_change(self):
+        """Test that the overlay compares its estimate at the poll's sample time, not now"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            overlay = SpotifyOverlay(network_engine='threads')
+        now = time.monotonic()
+        shown = self._info(progress_ms=10000, sampled_at=now - 5)
+        overlay.playback = shown
+        overlay.progress.reset(shown)
+        overlay.playback_diff.diff(shown)
+
+        # Sampled 2 s ago by a slow request: 3 s after the shown poll, as expected
+        late = self._info(progress_ms=13000, sampled_at=now - 2)
+        assert overlay.playback_diff.tolerance_ms < 2000
+        overlay.handle_poll(late)
+        assert overlay.playback_diff.short_circuited == 1
+
+    def test_only_changed_fields_are_reported(self):
+        """Test field-by-field comparison"""
+        from spotify_milkdrop_overlay import PlaybackDiff
+        diff = PlaybackDiff(tolerance_ms=500)
+        diff.diff(self._info())
+        assert diff.diff(self._info(is_playing=False), expected_progress_ms=10000) == {'is_playing'}
+
+    def test_idle_polls_are_short_circuited(self):
+        """Test that repeated empty polls need no UI work"""
+        from spotify_milkdrop_overlay import PlaybackDiff
+        diff = PlaybackDiff()
+        diff.diff(None)
+        diff.diff(None)
+        assert diff.short_circuited == 2
+
+
+class TestPlaybackSnapshot:
+    """Tests for the immutable per-poll playback snapshot"""
+
+    def test_snapshot_is_immutable_and_slotted(self):
+        """Test that a published snapshot can't be changed in place"""
+        from spotify_milkdrop_overlay import PlaybackSnapshot
+        snapshot = PlaybackSnapshot('id1', 'Song', 'Artist', progress_ms=1000)
+        with pytest.raises(AttributeError):
+            snapshot.progress_ms = 2000
+        with pytest.raises(AttributeError):
+            snapshot.extra = True
+        assert not hasattr(snapshot, '__dict__')
+
+        moved = snapshot.replace(progress_ms=2000)
+        assert (snapshot.progress_ms, moved.progress_ms, moved.track) == (1000, 2000, 'Song')
+
+    def test_position_is_extrapolated_while_playing(self):
+        """Test progress extrapolation from the sample time"""
+        from spotify_milkdrop_overlay import PlaybackSnapshot
+        playing = PlaybackSnapshot('id1', 'Song', 'Artist', progress_ms=1000, duration_ms=5000,
+                                   is_playing=True, sampled_at=100.0)
+        assert playing.position_ms(now=101.5) == 2500
+        assert playing.position_ms(now=200) == 5000
+        assert playing.replace(is_playing=False).position_ms(now=101.5) == 1000
+
+    def test_same_title_with_another_id_is_a_new_track(self):
+        """Test that track identity comes from the Spotify track ID"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, PlaybackSnapshot
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            overlay = SpotifyOverlay()
+        studio = PlaybackSnapshot('studio', 'Song', 'Artist', progress_ms=0, duration_ms=1000,
+                                  is_playing=True)
+        overlay.playback = studio
+
+        assert not overlay.handle_poll(studio.replace(progress_ms=100))
+        assert overlay.handle_poll(studio.replace(track_id='live'))
+
+    def test_resync_swaps_the_whole_snapshot(self):
+        """Test that a drifted poll replaces the shown snapshot in one assignment"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, PlaybackSnapshot
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            overlay = SpotifyOverlay()
+        shown = PlaybackSnapshot('id1', 'Song', 'Artist', progress_ms=0, duration_ms=200000,
+                                 is_playing=True)
+        overlay.playback = shown
+        overlay.playback_diff.diff(shown)
+
+        seeked = shown.replace(progress_ms=90000)
+        overlay.handle_poll(seeked)
+        assert overlay.playback is seeked
+
+
+class TestProgressEstimator:
+    """Tests for the RTT-corrected, smoothed progress estimate"""
+
+    def _poll(self, true_ms, send, rtt, server_share, **fields):
+        """A snapshot as a poll sent at send with this rtt would return it"""
+        from spotify_milkdrop_overlay import PlaybackSnapshot
+        sample = send + rtt * server_share
+        return PlaybackSnapshot('id1', 'Song', 'Artist', progress_ms=int(true_ms(sample)),
+                                duration_ms=600000, is_playing=True, sampled_at=send + rtt / 2,
+                                rtt=rtt, **fields)
+
+    def test_jittered_polls_stay_within_tens_of_ms(self):
+        """Test accuracy and smoothness against synthetic jittered responses"""
+        import random
+        from spotify_milkdrop_overlay import ProgressEstimator
+        rng = random.Random(7)
+        true_ms = lambda t: 30000 + t * 1000
+        estimator = ProgressEstimator(snap_ms=1000, smoothing=1.0)
+
+        errors, steps, now = [], [], 0.0
+        for poll in range(20):
+            rtt = rng.uniform(0.02, 0.25)
+            snapshot = self._poll(true_ms, now, rtt, rng.uniform(0.35, 0.65), timestamp=1)
+            now += rtt
+            if poll == 0:
+                estimator.reset(snapshot, now)
+            else:
+                estimator.update(snapshot, now)
+            # Poll only every 10 s; draw at 30 fps in between
+            last = estimator.position_ms(now)
+            for _ in range(300):
+                now += 1 / 30
+                position = estimator.position_ms(now)
+                errors.append(abs(position - true_ms(now)))
+                steps.append(position - last)
+                last = position
+
+        assert max(errors) < 50
+        # Corrections never make the bar jump or run backwards
+        assert 1000 / 30 * 0.5 - 1 <= min(steps) and max(steps) <= 1000 / 30 * 1.5 + 1
+        assert estimator.snaps == 1
+
+    def test_seeks_and_pauses_apply_at_once(self):
+        """Test that real position changes are not smoothed"""
+        from spotify_milkdrop_overlay import ProgressEstimator, PlaybackSnapshot
+        estimator = ProgressEstimator(snap_ms=1000, smoothing=1.0)
+        playing = PlaybackSnapshot('id1', 'Song', 'Artist', progress_ms=10000, duration_ms=600000,
+                                   is_playing=True, sampled_at=0.0, timestamp=1)
+        estimator.reset(playing, now=0.0)
+
+        # Small drift is slewed: no jump now, gone after the smoothing time
+        estimator.update(playing.replace(progress_ms=10300, sampled_at=1.0), now=1.0)
+        assert estimator.position_ms(1.0) == 11000
+        assert estimator.position_ms(3.0) == 12300
+
+        # A small seek (new Spotify timestamp) and a big one both snap
+        estimator.update(playing.replace(progress_ms=12000, sampled_at=4.0, timestamp=2), now=4.0)
+        assert estimator.position_ms(4.0) == 12000
+        estimator.update(playing.replace(progress_ms=90000, sampled_at=5.0, timestamp=2), now=5.0)
+        assert estimator.position_ms(5.0) == 90000
+
+        estimator.update(playing.replace(progress_ms=91000, is_playing=False, sampled_at=6.0),
+                         now=6.0)
+        assert estimator.position_ms(60.0) == 91000
+
+
+class TestAlbumArtVariantSelection:
+    """Tests for picking the album art image variant"""
+
+    IMAGES = [
+        {'url': 'large', 'width': 640, 'height': 640},
+        {'url': 'medium', 'width': 300, 'height': 300},
+        {'url': 'small', 'width': 64, 'height': 64},
+    ]
+
+    def test_picks_smallest_variant_covering_size(self):
+        """Test that the smallest image at least as big as the art is used"""
+        from spotify_milkdrop_overlay import select_album_art
+        assert select_album_art(self.IMAGES, size=100) == 'medium'
+        assert select_album_art(self.IMAGES, size=64) == 'small'
+        assert select_album_art(self.IMAGES, size=301) == 'large'
+
+    def test_falls_back_to_largest_when_none_cover(self):
+        """Test that the first (largest) image is used if none is big enough"""
+        from spotify_milkdrop_overlay import select_album_art
+        assert select_album_art(self.IMAGES, size=1000) == 'large'
+
+    def test_missing_dimensions_fall_back_to_first(self):
+        """Test images without width/height"""
+        from spotify_milkdrop_overlay import select_album_art
+        images = [{'url': 'a', 'width': None, 'height': None}, {'url': 'b'}]
+        assert select_album_art(images, size=100) == 'a'
+
+    def test_current_track_uses_selected_variant(self, fake_spotify):
+        """Test that get_current_track reports the right-sized variant"""
+        from spotify_milkdrop_overlay import get_current_track
+        assert get_current_track().album_art_url == '/image/300'
+
+
+class FakeArtImage:
+    """Stand-in for a resized PIL image"""
+
+    def __init__(self, fill=b'\x00', size=(100, 100), mode='RGB'):
+        self.size = size
+        self.mode = mode
+        self.fill = fill
+
+    def tobytes(self):
+        return self.fill * (self.size[0] * self.size[1] * len(self.mode))
+
+
+class TestAlbumArtCache:
+    """Tests for the two-tier album art cache"""
+
+    def test_memory_hit_after_put(self, tmp_path):
+        """Test that a stored image comes back from memory"""
+        from spotify_milkdrop_overlay import AlbumArtCache
+        cache = AlbumArtCache(cache_dir=str(tmp_path))
+        image = FakeArtImage()
+        cache.put('https://i.scdn.co/image/a', image)
+
+        assert cache.get('https://i.scdn.co/image/a') is image
+        assert cache.stats()['memory_hits'] == 1
+        assert cache.stats()['misses'] == 0
+
+    def test_memory_lru_respects_entry_limit(self, tmp_path):
+        """Test that the least recently used entry is evicted first"""
+        from spotify_milkdrop_overlay import AlbumArtCache
+        cache = AlbumArtCache(cache_dir=str(tmp_path), max_entries=2)
+        cache.put('a', FakeArtImage())
+        cache.put('b', FakeArtImage())
+        cache.get('a')
+        cache.put('c', FakeArtImage())
+
+        assert list(cache.memory) == ['a', 'c']
+
+    def test_memory_lru_respects_size_limit(self, tmp_path):
+        """Test that the memory tier stays under its byte limit"""
+        from spotify_milkdrop_overlay import AlbumArtCache
+        cache = AlbumArtCache(cache_dir=str(tmp_path), max_memory_bytes=70000)
+        for url in ('a', 'b', 'c'):
+            cache.put(url, FakeArtImage())
+
+        assert len(cache.memory) == 2
+        assert cache.memory_bytes == 60000
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test that a new cache instance finds art on disk without a download"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import AlbumArtCache
+        AlbumArtCache(cache_dir=str(tmp_path)).put('https://i.scdn.co/image/a', FakeArtImage(b'\x07'))
+
+        restarted = AlbumArtCache(cache_dir=str(tmp_path))
+        with patch.object(spotify_milkdrop_overlay.Image, 'frombytes',
+                          return_value=FakeArtImage()) as frombytes:
+            image = restarted.get('https://i.scdn.co/image/a')
+
+        assert image is frombytes.return_value
+        mode, size, pixels = frombytes.call_args[0]
+        assert (mode, size) == ('RGB', (100, 100))
+        assert pixels == b'\x07' * 30000
+        assert restarted.stats()['disk_hits'] == 1
+
+    def test_miss_is_counted(self, tmp_path):
+        """Test that unknown URLs count as misses"""
+        from spotify_milkdrop_overlay import AlbumArtCache
+        cache = AlbumArtCache(cache_dir=str(tmp_path))
+        assert cache.get('https://i.scdn.co/image/unknown') is None
+        assert cache.stats()['misses'] == 1
+
+    def test_disk_tier_evicts_oldest_files(self, tmp_path):
+        """Test size-based eviction of the disk tier"""
+        from spotify_milkdrop_overlay import AlbumArtCache
+        cache = AlbumArtCache(cache_dir=str(tmp_path), max_disk_bytes=70000)
+        cache.put('a', FakeArtImage())
+        os.utime(cache.path('a'), (1, 1))
+        cache.put('b', FakeArtImage())
+        cache.put('c', FakeArtImage())
+
+        assert not os.path.exists(cache.path('a'))
+        assert os.path.exists(cache.path('b'))
+        assert os.path.exists(cache.path('c'))
+
+
+class TestAlbumColors:
+    """Tests for the per-album progress bar and text colors"""
+
+    def art(self, *bands):
+        """Fake art made of horizontal (rows, (r, g, b)) bands"""
+        np = pytest.importorskip('numpy')
+        pixels = np.concatenate([np.full((rows, 100, 3), color, dtype=np.uint8)
+                                 for rows, color in bands])
+        return Mock(convert=Mock(return_value=pixels), size=(100, 100))
+
+    def test_most_common_colorful_bin_becomes_the_accent(self):
+        """Test that gray and black areas don't win over a colorful one"""
+        from spotify_milkdrop_overlay import extract_theme
+        theme = extract_theme(self.art((50, (128, 128, 128)), (30, (0, 0, 0)),
+                                       (15, (200, 30, 40)), (5, (20, 200, 20))))
+
+        assert theme == {'progress': '#c81e28', 'track': '#f4d2d4', 'artist': '#bb777b'}
+
+    def test_dark_accent_is_lifted_and_gray_art_keeps_config(self):
+        """Test legibility on the black background"""
+        from spotify_milkdrop_overlay import extract_theme
+        assert extract_theme(self.art((100, (0, 0, 90))))['progress'] == '#0000c8'
+        assert extract_theme(self.art((60, (30, 30, 30)), (40, (220, 220, 220)))) is None
+
+    def test_colors_are_extracted_once_per_album(self, tmp_path):
+        """Test that the cache extracts each album's colors only once"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import AlbumArtCache
+        cache = AlbumArtCache(cache_dir=str(tmp_path))
+        theme = {'progress': '#c81e28', 'track': '#f4d2d4', 'artist': '#bb777b'}
+
+        with patch.object(spotify_milkdrop_overlay, 'extract_theme',
+                          return_value=theme) as extract:
+            assert cache.theme('https://i.scdn.co/image/a') is None
+            assert cache.theme('https://i.scdn.co/image/a', FakeArtImage()) is theme
+            assert cache.theme('https://i.scdn.co/image/a', FakeArtImage()) is theme
+            assert cache.theme('https://i.scdn.co/image/a') is theme
+
+        extract.assert_called_once()
+
+    def test_known_album_is_recolored_during_the_fade(self, tmp_path):
+        """Test that change_track applies cached colors and clear_track restores config"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, AlbumArtCache, PlaybackSnapshot
+        overlay = SpotifyOverlay()
+        overlay.art_loader = Mock()
+        overlay.progress_canvas = Mock()
+        overlay.art_cache = AlbumArtCache(cache_dir=str(tmp_path))
+        theme = {'progress': '#c81e28', 'track': '#f4d2d4', 'artist': '#bb777b'}
+        overlay.art_cache.themes['https://i.scdn.co/image/a'] = theme
+
+        overlay.change_track(PlaybackSnapshot(
+            'id1', 'Song', 'Artist', 'Album', 'https://i.scdn.co/image/a',
+            progress_ms=0, duration_ms=1000, is_playing=True
+        ))
+        overlay.progress_canvas.itemconfig.assert_called_with(overlay.progress_bar,
+                                                              fill='#c81e28')
+        assert overlay.track_marquee.fg == '#f4d2d4'
+
+        overlay.clear_track()
+        overlay.progress_canvas.itemconfig.assert_called_with(
+            overlay.progress_bar, fill=spotify_milkdrop_overlay.PROGRESS_COLOR)
+        assert overlay.artist_marquee.fg == spotify_milkdrop_overlay.ARTIST_COLOR
+
+
+class TestAlbumArtLoader:
+    """Tests for the background album art pipeline"""
+
+    def test_result_is_delivered_off_the_calling_thread(self):
+        """Test that the work runs on a worker and the result is delivered"""
+        import threading
+        from spotify_milkdrop_overlay import AlbumArtLoader
+        loader = AlbumArtLoader(workers=1)
+        delivered = threading.Event()
+        results = []
+
+        def on_done(result, generation):
+            results.append((result, generation))
+            delivered.set()
+
+        generation = loader.submit(lambda url: (url, threading.current_thread().name),
+                                   'art-url', on_done)
+        assert delivered.wait(2)
+        (url, thread_name), delivered_generation = results[0]
+        assert url == 'art-url'
+        assert thread_name.startswith('album-art')
+        assert delivered_generation == generation
+        loader.shutdown()
+
+    def test_stale_results_are_dropped(self):
+        """Test that art for a skipped track never reaches the UI"""
+        import threading
+        from spotify_milkdrop_overlay import AlbumArtLoader
+        loader = AlbumArtLoader(workers=2)
+        release_first = threading.Event()
+        second_done = threading.Event()
+        results = []
+
+        def slow(url):
+            release_first.wait(2)
+            return url
+
+        def on_done(result, generation):
+            results.append(result)
+            if result == 'second':
+                second_done.set()
+
+        loader.submit(slow, 'first', on_done)
+        loader.submit(lambda url: url, 'second', on_done)
+        assert second_done.wait(2)
+        release_first.set()
+        loader.shutdown()
+        loader.executor.shutdown(wait=True)
+
+        assert results == ['second']
+        assert loader.dropped == 1
+
+    def test_cancel_drops_in_flight_result(self):
+        """Test that clearing the track drops pending art"""
+        import threading
+        from spotify_milkdrop_overlay import AlbumArtLoader
+        loader = AlbumArtLoader(workers=1)
+        release = threading.Event()
+        results = []
+
+        loader.submit(lambda url: release.wait(2) and url, 'art', lambda r, g: results.append(r))
+        loader.cancel()
+        release.set()
+        loader.executor.shutdown(wait=True)
+
+        assert results == []
+        assert loader.dropped == 1
+
+    def test_change_track_does_not_load_art_inline(self):
+        """Test that change_track hands art off to the worker pool"""
+        from spotify_milkdrop_overlay import SpotifyOverlay, PlaybackSnapshot
+        overlay = SpotifyOverlay()
+        overlay.load_album_art = Mock()
+        overlay.art_loader = Mock()
+
+        overlay.change_track(PlaybackSnapshot(
+            'id1', 'Song', 'Artist', 'Album', 'https://i.scdn.co/image/a',
+            progress_ms=0, duration_ms=1000, is_playing=True
+        ))
+
+        overlay.load_album_art.assert_not_called()
+        overlay.art_loader.submit.assert_called_once_with(
+            overlay.load_album_art, 'https://i.scdn.co/image/a', overlay.update_album_art
+        )
+        assert overlay.full_track_text == 'Song'
+
+
+class FakeRoot:
+    """Records Tk after() calls instead of running an event loop"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, func):
+        self.scheduled.append((delay, func))
+
+
+class TestMarquee:
+    """Tests for the pixel-scrolling marquee"""
+
+    def _marquee(self, text, width=100):
+        from spotify_milkdrop_overlay import Marquee
+        marquee = Marquee(MagicMock(), 'Arial', 12, fg='white', speed=50, pause=1)
+        marquee.font.measure = Mock(side_effect=lambda t: 10 * len(t))
+        marquee.canvas = Mock()
+        marquee.on_configure(Mock(width=width))
+        marquee.set_text(text)
+        return marquee
+
+    def test_text_is_measured_once_per_text(self):
+        """Test that repeated set_text calls don't re-measure"""
+        marquee = self._marquee('A long title here')
+        for _ in range(3):
+            marquee.set_text('A long title here')
+        assert marquee.font.measure.call_count == 1
+
+    def test_offset_pauses_then_moves_by_pixels(self):
+        """Test the time-based scroll offset"""
+        marquee = self._marquee('A long title here')  # 170px wide
+        start = marquee.started
+        assert marquee.offset_at(start + 0.5) == 0
+        assert marquee.offset_at(start + 1.5) == 25
+        # Loop: 1s pause + (170 + 40) / 50 s of movement
+        assert marquee.offset_at(start + 1 + 210 / 50 + 0.5) == 0
+
+    def test_step_moves_canvas_items_only_when_pixel_changes(self):
+        """Test that scrolling moves the items instead of changing text"""
+        marquee = self._marquee('A long title here')
+        marquee.canvas.reset_mock()
+        start = marquee.started
+
+        marquee.step(start + 1.5)
+        marquee.step(start + 1.5)
+        marquee.canvas.move.assert_called_once_with('text', -25, 0)
+        marquee.canvas.itemconfig.assert_not_called()
+        assert marquee.moves == 1
+
+    def test_new_text_mid_scroll_keeps_the_gap(self):
+        """Test that both copies are placed from the start after a scroll"""
+        class StubCanvas:
+            def __init__(self):
+                self.positions = {}
+
+            def coords(self, item, x, y):
+                self.positions[item] = x
+
+            def move(self, tag, dx, dy):
+                for item in self.positions:
+                    self.positions[item] += dx
+
+            def itemconfig(self, item, **options):
+                pass
+
+        marquee = self._marquee('A long title here')
+        marquee.canvas = StubCanvas()
+        marquee.items = [1, 2]
+        marquee.set_text('Another long title')  # 180px wide
+        marquee.step(marquee.started + 1.8)
+        assert marquee.x == -40
+
+        marquee.set_text('Third long title!!')
+        positions = marquee.canvas.positions
+        assert (positions[1], positions[2]) == (0, 180 + marquee.GAP)
+        marquee.step(marquee.started + 1.8)
+        assert positions[2] - positions[1] == 180 + marquee.GAP
+
+    def test_short_text_never_moves(self):
+        """Test that fitting text stays put"""
+        marquee = self._marquee('Short', width=300)
+        marquee.canvas.reset_mock()
+        marquee.step(marquee.started + 5)
+        marquee.canvas.move.assert_not_called()
+
+
+class TestRenderCache:
+    """Tests for the dirty-tracking widget update layer"""
+
+    def test_unchanged_config_is_skipped(self):
+        """Test that re-applying the same value makes no Tk call"""
+        from spotify_milkdrop_overlay import RenderCache
+        render = RenderCache()
+        label = Mock()
+
+        assert render.config(label, text='1:00')
+        assert not render.config(label, text='1:00')
+        assert render.config(label, text='1:01')
+
+        assert label.config.call_count == 2
+        assert render.stats() == {'applied': 2, 'skipped': 1}
+
+    def test_properties_are_tracked_per_widget(self):
+        """Test that identical values on different widgets are both applied"""
+        from spotify_milkdrop_overlay import RenderCache
+        render = RenderCache()
+        first, second = Mock(), Mock()
+        render.config(first, text='0:00')
+        render.config(second, text='0:00')
+        render.config(first, fg='white')
+        assert render.stats()['skipped'] == 0
+
+    def test_coords_and_attributes(self):
+        """Test canvas coords and window attributes"""
+        from spotify_milkdrop_overlay import RenderCache
+        render = RenderCache()
+        canvas, window = Mock(), Mock()
+        render.coords(canvas, 1, 0, 0, 10, 4)
+        render.coords(canvas, 1, 0, 0, 10, 4)
+        render.attribute(window, '-alpha', 0.5)
+        render.attribute(window, '-alpha', 0.5)
+        canvas.coords.assert_called_once_with(1, 0, 0, 10, 4)
+        window.attributes.assert_called_once_with('-alpha', 0.5)
+
+    def test_progress_bar_skips_unchanged_frames(self):
+        """Test that a frame with the same pixel width and M:SS text is free"""
+        from spotify_milkdrop_overlay import SpotifyOverlay, PlaybackSnapshot
+        overlay = SpotifyOverlay()
+        overlay.on_progress_configure(Mock(width=300))
+        overlay.playback = PlaybackSnapshot('id1', 'Song', 'Artist', progress_ms=60000,
+                                            duration_ms=200000, is_playing=False)
+        overlay.progress.reset(overlay.playback)
+        overlay.progress_canvas.reset_mock()
+        overlay.current_time_label.reset_mock()
+
+        for _ in range(5):
+            overlay.update_progress_bar()
+
+        overlay.progress_canvas.coords.assert_called_once_with(overlay.progress_bar, 0, 0, 90, 4)
+        overlay.current_time_label.config.assert_called_once_with(text='1:00')
+        overlay.progress_canvas.winfo_width.assert_not_called()
+
+
+class TestFadeEngine:
+    """Tests for the time-based, cancellable fade engine"""
+
+    def _fader(self, easing='linear', duration=1.0):
+        from spotify_milkdrop_overlay import FadeEngine
+        now = [0.0]
+        applied = []
+        fader = FadeEngine(applied.append, duration=duration, easing=easing,
+                           full_range=1.0, clock=lambda: now[0])
+        return fader, now, applied
+
+    def test_alpha_follows_the_clock(self):
+        """Test that alpha depends on elapsed time, not on frame count"""
+        fader, now, applied = self._fader()
+        fader.fade_to(1.0)
+        now[0] = 0.25
+        fader.step()
+        assert fader.alpha == pytest.approx(0.25)
+
+        # A late frame jumps ahead instead of stretching the fade
+        now[0] = 0.9
+        fader.step()
+        assert fader.alpha == pytest.approx(0.9)
+
+    def test_fade_lands_on_target_and_calls_back_once(self):
+        """Test completion"""
+        fader, now, applied = self._fader()
+        fader.alpha = 1.0
+        callback = Mock()
+        fader.fade_to(0, callback=callback)
+        now[0] = 1.5
+        fader.step()
+        fader.step()
+        assert applied[-1] == 0
+        assert not fader.active
+        callback.assert_called_once()
+
+    def test_easing_curve(self):
+        """Test that the configured easing shapes the fade"""
+        fader, now, applied = self._fader(easing='ease_in')
+        fader.fade_to(1.0)
+        now[0] = 0.5
+        fader.step()
+        assert fader.alpha == pytest.approx(0.25)
+
+    def test_new_fade_retargets_running_one(self):
+        """Test that a fade request during a fade is not dropped"""
+        fader, now, applied = self._fader()
+        fader.fade_to(1.0)
+        now[0] = 0.5
+        fader.step()
+
+        first_callback, second_callback = Mock(), Mock()
+        fader.fade_to(0, callback=first_callback)
+        # Reversing from 0.5 takes half the full duration
+        now[0] = 0.75
+        fader.step()
+        assert fader.alpha == pytest.approx(0.25)
+
+        fader.fade_to(0, callback=second_callback)
+        first_callback.assert_called_once()
+        now[0] = 2
+        fader.step()
+        second_callback.assert_called_once()
+        first_callback.assert_called_once()
+
+    def test_fade_out_when_already_hidden_still_calls_back(self):
+        """Test that a fade to the current alpha completes immediately"""
+        fader, now, applied = self._fader()
+        callback = Mock()
+        fader.fade_to(0, callback=callback)
+        callback.assert_called_once()
+        assert not fader.active
+
+    def test_quick_skips_never_lose_the_track_change(self):
+        """Test fast skips through the overlay's fade_out path"""
+        from spotify_milkdrop_overlay import SpotifyOverlay
+        overlay = SpotifyOverlay()
+        overlay.fader.alpha = overlay.target_alpha
+        overlay.change_track = Mock()
+
+        overlay.fade_out(callback=lambda: overlay.change_track('first'))
+        overlay.fade_out(callback=lambda: overlay.change_track('second'))
+        overlay.fader.step(time.monotonic() + 10)
+
+        assert [c[0][0] for c in overlay.change_track.call_args_list] == ['first', 'second']
+
+
+class TestArtCrossfade:
+    """Tests for the precomputed album art crossfade"""
+
+    def test_blend_frames_follow_the_easing_and_end_on_the_new_art(self):
+        """Test the blend weights computed on the worker"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import blend_frames
+        old, new = FakeArtImage(), FakeArtImage()
+        with patch.object(spotify_milkdrop_overlay.Image, 'blend',
+                          side_effect=lambda a, b, alpha: alpha):
+            frames = blend_frames(old, new, 4, easing='linear')
+
+        assert frames == [0.25, 0.5, 0.75, new]
+
+    def test_playback_follows_the_clock_and_frees_the_frames(self):
+        """Test that late frames skip ahead and the buffers go once it ends"""
+        from spotify_milkdrop_overlay import ArtCrossfade
+        now = [0.0]
+        shown = []
+        crossfade = ArtCrossfade(lambda image, photo: shown.append(photo), duration=0.4,
+                                 clock=lambda: now[0])
+
+        crossfade.start([(i, f'photo{i}') for i in range(5)])
+        assert shown == ['photo0']
+        now[0] = 0.1
+        crossfade.step()
+        now[0] = 0.35
+        crossfade.step()
+        crossfade.step()
+        assert shown == ['photo0', 'photo1', 'photo3']
+        assert crossfade.active
+
+        now[0] = 0.5
+        crossfade.step()
+        assert shown[-1] == 'photo4'
+        assert crossfade.frames is None and not crossfade.active
+
+    def test_track_change_crossfades_without_hiding_the_window(self, monkeypatch):
+        """Test the overlay's crossfade path from poll to shown frames"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, PlaybackSnapshot
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'TRANSITION', 'crossfade')
+        overlay = SpotifyOverlay()
+        overlay.art_loader = Mock()
+        overlay.fade_out = Mock()
+        overlay.current_art = FakeArtImage()
+        overlay.playback = PlaybackSnapshot('id1', 'Old', 'Artist', progress_ms=0,
+                                            duration_ms=1000, is_playing=True)
+        track = PlaybackSnapshot('id2', 'Song', 'Artist', 'Album', 'https://i.scdn.co/image/a',
+                                 progress_ms=0, duration_ms=1000, is_playing=True)
+
+        overlay.handle_poll(track)
+        overlay.frame_scheduler.run_updates()
+        overlay.fade_out.assert_not_called()
+        assert overlay.full_track_text == 'Song'
+
+        load, url, on_done = overlay.art_loader.submit.call_args[0]
+        new = FakeArtImage()
+        with patch.object(overlay, 'load_album_art', return_value=new), \
+                patch.object(spotify_milkdrop_overlay.Image, 'blend',
+                             side_effect=lambda a, b, alpha: alpha):
+            frames = load(url)
+        assert len(frames) == round(spotify_milkdrop_overlay.FADE_DURATION *
+                                    spotify_milkdrop_overlay.FRAME_RATE)
+        assert frames[-1] is new
+
+        on_done(frames, 1)
+        overlay.frame_scheduler.run_updates()
+        assert overlay.current_art == frames[0]
+        overlay.crossfade.step(time.monotonic() + 10)
+        assert overlay.current_art is new
+        assert not overlay.crossfade.active
+
+
+class TestCompositor:
+    """Tests for the offscreen Pillow renderer"""
+
+    def test_snapshot_and_dirty_rectangles(self, tmp_path):
+        """Test rendered pixels headless (real Pillow, no Tk) and what gets redrawn"""
+        import subprocess
+        pytest.importorskip('PIL.ImageDraw')
+        root = os.path.dirname(os.path.abspath(__file__))
+        code = (
+            "import sys, json; sys.path.insert(0, %r)\n"
+            "import spotify_milkdrop_overlay as overlay\n"
+            "from PIL import Image\n"
+            "c = overlay.Compositor(200, 60)\n"
+            "art = overlay.ArtLayer(c); art.place(0, 0, 40, 40)\n"
+            "bar = overlay.ProgressLayer(c, fill='#ff0000'); bar.place(50, 50, 100, 4)\n"
+            "text = overlay.MarqueeLayer(c, 'Arial', 10, '#ffffff', text='x' * 80)\n"
+            "text.place(50, 0, 100, 20)\n"
+            "art.config(image=Image.new('RGB', (40, 40), (0, 0, 255)))\n"
+            "bar.coords(1, 0, 0, 30, 4)\n"
+            "first = [box for box, _ in c.render()]\n"
+            "im = c.snapshot()\n"
+            "pixels = [im.getpixel(p)[:3] for p in ((5, 5), (60, 51), (90, 51), (190, 55))]\n"
+            "ink = sum(im.getpixel((x, y))[0] > 128 for x in range(200) for y in range(20))\n"
+            "spill = sum(im.getpixel((x, y))[0] > 128 for x in range(150, 200) for y in range(20))\n"
+            "bar.coords(1, 0, 0, 45, 4)\n"
+            "text.step(text.started + text.pause + 1)\n"
+            "second = [box for box, _ in c.render()]\n"
+            "print(json.dumps([first, pixels, ink > 0, spill, sorted(second), c.render()]))\n"
+        ) % root
+        result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path,
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+        import json
+        first, pixels, inked, spill, second, third = json.loads(result.stdout)
+
+        assert sorted(map(tuple, first)) == [(0, 0, 40, 40), (50, 0, 150, 20), (50, 50, 150, 54)]
+        # Art, bar, trough and untouched background
+        assert pixels == [[0, 0, 255], [255, 0, 0], [64, 64, 64], [0, 0, 0]]
+        # Scrolling text is clipped to its layer
+        assert inked and spill == 0
+        # Only the bar's new columns and the marquee are redrawn; nothing when idle
+        assert second == [[50, 0, 150, 20], [80, 50, 95, 54]]
+        assert third == []
+
+    def test_pillow_renderer_replaces_the_widgets(self, monkeypatch):
+        """Test the overlay wiring: layers instead of widgets, one canvas, rendered off the Tk thread"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, MarqueeLayer
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'RENDERER', 'pillow')
+        font = sys.modules['PIL.ImageFont'].truetype.return_value
+        monkeypatch.setattr(font, 'getmetrics', Mock(return_value=(15, 4)))
+        monkeypatch.setattr(font, 'getlength', Mock(return_value=100))
+        overlay = SpotifyOverlay()
+
+        assert isinstance(overlay.track_marquee, MarqueeLayer)
+        assert overlay.album_art_label.box == (10, 20, 110, 120)
+        assert overlay.track_marquee.box == (125, 15, 360, 34)
+        assert overlay.progress_canvas.box == (125, 63, 360, 67)
+        assert overlay.view.step in [task[0] for task in overlay.frame_scheduler.tasks]
+
+        overlay.update_display('Song', 'Artist')
+        overlay.view.step()
+        overlay.view.executor.shutdown(wait=True)
+        overlay.frame_scheduler.run_updates()
+        assert overlay.compositor.renders == 1 and not overlay.compositor.dirty
+        copies = [c for c in overlay.view.canvas.tk.call.call_args_list if c[0][1] == 'copy']
+        assert len(copies) == overlay.view.presented > 0
+
+        overlay.close = Mock()
+        overlay.on_view_click(Mock(x=20, y=50, x_root=0, y_root=0))
+        overlay.close.assert_not_called()
+        overlay.on_view_click(Mock(x=375, y=15))
+        overlay.close.assert_called_once()
+
+
+class TestFrameScheduler:
+    """Tests for the Tk-thread frame scheduler"""
+
+    def test_posted_updates_run_on_next_frame(self):
+        """Test that updates posted from another thread run inside tick"""
+        import threading
+        from spotify_milkdrop_overlay import FrameScheduler
+        scheduler = FrameScheduler(FakeRoot(), frame_rate=30)
+        ran = []
+
+        poster = threading.Thread(target=lambda: scheduler.post(lambda: ran.append(1)))
+        poster.start()
+        poster.join()
+        assert ran == []
+
+        scheduler.start()
+        scheduler.tick()
+        assert ran == [1]
+        assert scheduler.updates_run == 1
+
+    def test_tick_reschedules_at_frame_rate(self):
+        """Test that each frame schedules the next one on the Tk loop"""
+        from spotify_milkdrop_overlay import FrameScheduler
+        root = FakeRoot()
+        scheduler = FrameScheduler(root, frame_rate=20)
+        scheduler.start()
+        scheduler.tick()
+
+        delay, func = root.scheduled[-1]
+        assert func == scheduler.tick
+        assert 1 <= delay <= 50
+
+        scheduler.stop()
+        scheduler.tick()
+        assert len(root.scheduled) == 2
+
+    def test_interval_tasks_only_run_when_due(self):
+        """Test per-task intervals"""
+        from spotify_milkdrop_overlay import FrameScheduler
+        scheduler = FrameScheduler(FakeRoot())
+        every_frame, slow = [], []
+        scheduler.add_task(lambda: every_frame.append(1))
+        scheduler.add_task(lambda: slow.append(1), interval=10)
+
+        now = time.monotonic()
+        for offset in (0, 0.1, 0.2):
+            scheduler.run_tasks(now + offset)
+
+        assert len(every_frame) == 3
+        assert len(slow) == 1
+
+    def test_task_returning_false_is_removed(self):
+        """Test that finished animations unregister themselves"""
+        from spotify_milkdrop_overlay import FrameScheduler
+        scheduler = FrameScheduler(FakeRoot())
+        steps = iter([True, True, False])
+        scheduler.add_task(lambda: next(steps))
+
+        for _ in range(5):
+            scheduler.run_tasks(time.monotonic())
+        assert scheduler.tasks == []
+
+    def test_failing_update_does_not_stop_the_frame(self):
+        """Test that one broken update doesn't block the rest"""
+        from spotify_milkdrop_overlay import FrameScheduler
+        scheduler = FrameScheduler(FakeRoot())
+        ran = []
+        scheduler.post(lambda: 1 / 0)
+        scheduler.post(lambda: ran.append(1))
+        scheduler.run_updates()
+        assert ran == [1]
+
+    def test_overlay_starts_only_the_monitor_thread(self):
+        """Test that progress and scrolling are frame tasks, not threads"""
+        from spotify_milkdrop_overlay import SpotifyOverlay
+        overlay = SpotifyOverlay()
+        funcs = [task[0] for task in overlay.frame_scheduler.tasks]
+        assert overlay.update_progress in funcs
+        assert overlay.track_marquee.step in funcs
+        assert not hasattr(overlay, 'progress_thread')
+        assert not hasattr(overlay, 'scroll_thread')
+
+
+class StubPollTarget:
+    """Minimal overlay for driving the network engine; stops after one poll"""
+
+    def __init__(self):
+        self.running = True
+        self.polls = []
+        self.errors = []
+
+    def poll_blocked_for(self):
+        return None
+
+    def poll_succeeded(self, track_info):
+        self.polls.append(track_info)
+        self.running = False
+        return 0
+
+    def poll_failed(self, error):
+        self.errors.append(error)
+        self.running = False
+        return 0
+
+
+class TestAsyncSpotifyEngine:
+    """Tests for the asyncio network engine against a local fake server"""
+
+    @pytest.fixture
+    def engine(self):
+        from spotify_milkdrop_overlay import AsyncSpotifyEngine
+        engine = AsyncSpotifyEngine(StubPollTarget(), deadline=2)
+        engine.thread.start()
+        yield engine
+        engine.shutdown()
+
+    def test_poll_result_reaches_overlay(self, fake_spotify, engine):
+        """Test that a poll flows into the overlay's update method"""
+        engine.run(engine.poll_forever())
+        assert engine.overlay.polls[0].track == 'Song Title'
+        assert engine.polls == 1
+
+    def test_art_fetch_overlaps_poll(self, fake_spotify, engine):
+        """Test that a slow art download doesn't hold up a poll"""
+        import threading
+        import spotify_milkdrop_overlay
+        fake_spotify.delay = 0.3
+        art_done = threading.Event()
+
+        def fetch(url):
+            return spotify_milkdrop_overlay.get_http_client().get(fake_spotify.url + url).status_code
+
+        start = time.monotonic()
+        engine.submit(fetch, '/image/300', lambda result, generation: art_done.set())
+        engine.run(engine.poll_once())
+        assert art_done.wait(2)
+        assert time.monotonic() - start < 0.55
+
+    def test_new_art_request_cancels_previous(self, fake_spotify, engine):
+        """Test that only the latest track's art is delivered"""
+        import threading
+        release = threading.Event()
+        second_done = threading.Event()
+        results = []
+
+        def on_done(result, generation):
+            results.append(result)
+            second_done.set()
+
+        engine.submit(lambda url: release.wait(2) and url, 'first', on_done)
+        engine.submit(lambda url: url, 'second', on_done)
+        assert second_done.wait(2)
+        release.set()
+        time.sleep(0.05)
+        assert results == ['second']
+
+    def test_poll_in_fresh_interpreter(self, tmp_path):
+        """Test one real poll with nothing else imported first (no unittest.mock)"""
+        import subprocess
+        root = os.path.dirname(os.path.abspath(__file__))
+        code = (
+            "import sys, time; sys.path.insert(0, %r)\n"
+            "import spotify_milkdrop_overlay as overlay\n"
+            "assert type(sys.modules['asyncio']).__name__.startswith('_Lazy')\n"
+            "class Target:\n"
+            "    running = True\n"
+            "    polls = []\n"
+            "    def poll_blocked_for(self): return None\n"
+            "    def poll_succeeded(self, track_info):\n"
+            "        self.polls.append(track_info); self.running = False; return 0\n"
+            "    def poll_failed(self, error):\n"
+            "        self.running = False; raise error\n"
+            "engine = overlay.AsyncSpotifyEngine(Target(), deadline=5)\n"
+            "from fake_spotify_server import FakeSpotifyServer\n"
+            "with FakeSpotifyServer() as server:\n"
+            "    overlay.API_BASE_URL = server.url\n"
+            "    overlay.http_client = overlay.HTTPClient(hosts=[server.url])\n"
+            "    overlay.access_token = 'token'\n"
+            "    overlay.token_expires = time.time() + 3600\n"
+            "    engine.start().result(10)\n"
+            "    engine.shutdown()\n"
+            "print(engine.polls, engine.overlay.polls[0].track)\n"
+        ) % root
+        result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path,
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split(maxsplit=1) == ['1', 'Song Title\n']
+
+    def test_request_deadline(self, fake_spotify):
+        """Test that a stalled request fails at its deadline"""
+        import asyncio
+        from spotify_milkdrop_overlay import AsyncSpotifyEngine
+        engine = AsyncSpotifyEngine(StubPollTarget(), deadline=0.1)
+        engine.thread.start()
+        fake_spotify.delay = 0.5
+
+        start = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            engine.run(engine.poll_once())
+        assert time.monotonic() - start < 0.4
+        assert engine.timeouts == 1
+
+        # The request itself times out soon after, freeing its worker
+        engine.executor.shutdown(wait=True)
+        assert time.monotonic() - start < 0.4
+        engine.shutdown()
+
+    def test_token_refresh_runs_in_background(self, fake_spotify, engine, monkeypatch):
+        """Test that an early refresh doesn't block the poll using the current token"""
+        import spotify_milkdrop_overlay
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'refresh_token', 'refresh')
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'token_expires', time.time() + 200)
+
+        async def wait_for_refresh():
+            return await engine.refresh_task
+
+        track_info = engine.run(engine.poll_once())
+        assert track_info is not None
+        assert engine.run(wait_for_refresh()) is True
+
+        assert engine.refreshes == 1
+        assert spotify_milkdrop_overlay.access_token == 'token-1'
+        assert fake_spotify.token_requests == 1
+
+
+class TestTokenStore:
+    """Tests for the persistent token store"""
+
+    def test_tokens_round_trip_with_owner_only_permissions(self, fake_spotify, monkeypatch):
+        """Test saving and loading tokens"""
+        import stat
+        import spotify_milkdrop_overlay as overlay
+        monkeypatch.setattr(overlay, 'access_token', 'access')
+        monkeypatch.setattr(overlay, 'refresh_token', 'refresh')
+        monkeypatch.setattr(overlay, 'token_expires', 1234.5)
+        assert overlay.save_tokens()
+
+        monkeypatch.setattr(overlay, 'access_token', None)
+        monkeypatch.setattr(overlay, 'refresh_token', None)
+        assert overlay.load_tokens()
+        assert (overlay.access_token, overlay.refresh_token, overlay.token_expires) == \
+            ('access', 'refresh', 1234.5)
+        if os.name == 'posix':
+            assert stat.S_IMODE(os.stat(overlay.TOKEN_FILE).st_mode) == 0o600
+
+    def test_tokens_for_another_client_are_ignored(self, fake_spotify, monkeypatch):
+        """Test that a token file from a different app is not used"""
+        import spotify_milkdrop_overlay as overlay
+        monkeypatch.setattr(overlay, 'refresh_token', 'refresh')
+        overlay.save_tokens()
+        monkeypatch.setattr(overlay, 'CLIENT_ID', 'another-client')
+        assert not overlay.load_tokens()
+
+    def test_code_exchange_saves_tokens(self, fake_spotify):
+        """Test that the browser flow result is persisted"""
+        import spotify_milkdrop_overlay as overlay
+        assert overlay.get_token_from_code('auth-code')
+        with open(overlay.TOKEN_FILE) as f:
+            assert '"refresh-token"' in f.read()
+
+    def test_valid_saved_token_needs_no_request(self, fake_spotify, monkeypatch):
+        """Test that a still-valid access token is used as is"""
+        import spotify_milkdrop_overlay as overlay
+        monkeypatch.setattr(overlay, 'refresh_token', 'refresh')
+        monkeypatch.setattr(overlay, 'token_expires', time.time() + 3600)
+        overlay.save_tokens()
+
+        assert overlay.restore_saved_session()
+        assert fake_spotify.token_requests == 0
+
+    def test_expired_saved_token_is_refreshed(self, fake_spotify, monkeypatch):
+        """Test that an expired access token costs exactly one refresh"""
+        import spotify_milkdrop_overlay as overlay
+        monkeypatch.setattr(overlay, 'refresh_token', 'refresh')
+        monkeypatch.setattr(overlay, 'token_expires', time.time() - 10)
+        overlay.save_tokens()
+
+        assert overlay.restore_saved_session()
+        assert fake_spotify.token_requests == 1
+        assert overlay.access_token == 'token-1'
+
+    def test_main_skips_browser_with_saved_session(self, fake_spotify, monkeypatch):
+        """Test that main only opens the browser as a fallback"""
+        import spotify_milkdrop_overlay as overlay
+        settings = overlay.Settings()
+        settings.CLIENT_ID, settings.CLIENT_SECRET = 'client', 'secret'
+        settings.WARM_UP_CONNECTIONS = False
+        settings.TOKEN_FILE = overlay.TOKEN_FILE
+        for name in ('CLIENT_ID', 'CLIENT_SECRET', 'WARM_UP_CONNECTIONS'):
+            monkeypatch.setattr(overlay, name, getattr(settings, name))
+        monkeypatch.setattr(overlay, 'refresh_token', 'refresh')
+        monkeypatch.setattr(overlay, 'token_expires', time.time() - 10)
+        overlay.save_tokens()
+
+        with patch.object(overlay, 'SpotifyOverlay') as overlay_class, \
+                patch.object(overlay.webbrowser, 'open') as browser:
+            overlay.main(settings)
+
+        browser.assert_not_called()
+        overlay_class.return_value.run.assert_called_once()
+
+
+class TestMultiAccount:
+    """Tests for running overlays for several accounts in one process"""
+
+    def test_account_sections_are_parsed(self):
+        """Test [account NAME] sections and their fallbacks"""
+        import configparser
+        from spotify_milkdrop_overlay import Settings
+        config = configparser.ConfigParser()
+        config.read_string("[spotify]\nclient_id = app\nclient_secret = secret\n\n"
+                           "[account alice]\ntoken_file = /tmp/alice.json\n\n"
+                           "[account bob]\nclient_id = other-app\nposition_y_from_bottom = 400\n")
+        alice, bob = Settings(config).ACCOUNTS
+
+        assert (alice['name'], alice['client_id'], alice['token_file']) == \
+            ('alice', 'app', '/tmp/alice.json')
+        assert (bob['client_id'], bob['client_secret']) == ('other-app', 'secret')
+        assert bob['token_file'].endswith('tokens-bob.json')
+        assert (bob['position_x'], bob['position_y_from_bottom']) == (None, 400)
+        assert Settings().ACCOUNTS == []
+
+    def test_accounts_keep_their_own_tokens(self, fake_spotify, tmp_path):
+        """Test that each account refreshes, saves and sends its own token"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyAccount, get_current_track, load_tokens
+        accounts = [SpotifyAccount(name, 'client', 'secret', str(tmp_path / f'{name}.json'))
+                    for name in ('alice', 'bob')]
+        for account in accounts:
+            account.refresh_token = f'{account.name}-refresh'
+            assert get_current_track(account).track == 'Song Title'
+
+        assert [account.access_token for account in accounts] == ['token-1', 'token-2']
+        assert {'Bearer token-1', 'Bearer token-2'} <= set(fake_spotify.authorizations)
+        assert spotify_milkdrop_overlay.access_token == 'token'
+
+        restored = SpotifyAccount('bob', 'client', 'secret', str(tmp_path / 'bob.json'))
+        assert load_tokens(account=restored)
+        assert restored.access_token == 'token-2'
+
+    def test_group_shares_scheduler_poller_and_workers(self, fake_spotify, tmp_path):
+        """Test that overlays share one of everything but poll with their own tokens"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import OverlayGroup, SpotifyAccount
+        accounts = []
+        for name in ('alice', 'bob', 'carol'):
+            account = SpotifyAccount(name, 'client', 'secret', str(tmp_path / f'{name}.json'))
+            account.access_token, account.token_expires = f'{name}-token', time.time() + 3600
+            accounts.append(account)
+
+        with patch.object(spotify_milkdrop_overlay, 'Thread') as thread:
+            group = OverlayGroup(accounts, [None, (10, 500), None])
+        alice, bob, carol = group.overlays
+
+        assert thread.call_count == 1  # the poller, however many accounts
+        assert alice.frame_scheduler is bob.frame_scheduler is group.frame_scheduler
+        assert alice.art_loader.executor is carol.art_loader.executor is group.art_executor
+        assert len(group.poller.due) == 3
+        assert (bob.position, carol.slot) == ((10, 500), 2)
+
+        for overlay in group.overlays:
+            group.poller.poll(overlay)
+        assert {'Bearer alice-token', 'Bearer bob-token', 'Bearer carol-token'} <= \
+            set(fake_spotify.authorizations)
+        assert ('spotify_circuit_open', 'gauge', 0, {'account': 'bob'}) in bob.collect_metrics()
+
+        tasks = len(group.frame_scheduler.tasks)
+        bob.close()
+        assert len(group.frame_scheduler.tasks) == tasks - 5
+        assert group.overlays == [alice, carol]
+        group.root.quit.assert_not_called()
+
+        alice.close()
+        carol.close()
+        group.root.quit.assert_called_once()
+        assert not group.poller.running
+
+    def test_group_ignores_asyncio_engine_with_a_message(self, monkeypatch, capsys, tmp_path):
+        """Test that engine = asyncio is reported as ignored for several accounts"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import OverlayGroup, SpotifyAccount
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'NETWORK_ENGINE', 'asyncio')
+        accounts = [SpotifyAccount(name, 'client', 'secret', str(tmp_path / f'{name}.json'))
+                    for name in ('alice', 'bob')]
+
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            group = OverlayGroup(accounts)
+
+        assert 'Ignoring engine = asyncio' in capsys.readouterr().out
+        assert all(overlay.engine is None for overlay in group.overlays)
+        group.close()
+
+    def test_shared_poller_follows_each_overlays_delay(self):
+        """Test that the poller schedules every overlay on its own interval"""
+        from spotify_milkdrop_overlay import SharedPoller
+
+        class StubOverlay:
+            def __init__(self, delay):
+                self.delay, self.polls, self.running = delay, 0, True
+
+            def poll_once(self):
+                self.polls += 1
+                return self.delay
+
+        fast, slow = StubOverlay(0.01), StubOverlay(60)
+        poller = SharedPoller()
+        poller.add(fast)
+        poller.add(slow)
+        poller.start()
+        time.sleep(0.3)
+        fast.running = False
+        time.sleep(0.05)
+        polls = fast.polls
+        time.sleep(0.05)
+        poller.stop()
+
+        assert polls > 5 and fast.polls == polls
+        assert slow.polls == 1
+
+
+class TestNowPlayingSegment:
+    """Tests for the shared-memory now-playing segment"""
+
+    FIELDS = {'track_id': 'abc123', 'track': 'Sóng Title', 'artist': 'Ärtist',
+              'album': 'Album', 'album_art_url': 'https://i.scdn.co/image/abc',
+              'progress_ms': 1500, 'duration_ms': 200000, 'is_playing': True}
+
+    def _track(self, **overrides):
+        from spotify_milkdrop_overlay import PlaybackSnapshot
+        return PlaybackSnapshot(**dict(self.FIELDS, **overrides))
+
+    def test_round_trip(self, tmp_path):
+        """Test that a reader sees exactly what was published"""
+        from spotify_milkdrop_overlay import NowPlayingSegment, NowPlayingReader
+        segment = NowPlayingSegment(str(tmp_path / 'now_playing.bin'))
+        reader = NowPlayingReader(segment.path)
+
+        track = self._track(track='é' * 200)
+        segment.publish(track, '/cache/abc.art')
+        state = reader.read()
+        assert state['track'] == 'é' * 128  # cut at a character boundary
+        assert {key: state[key] for key in self.FIELDS if key != 'track'} == \
+            {key: value for key, value in self.FIELDS.items() if key != 'track'}
+        assert state['art_path'] == '/cache/abc.art'
+        assert state['updated_at'] == pytest.approx(time.time(), abs=5)
+        assert reader.sequence() == 2
+
+        segment.close()
+        assert reader.read() is None
+        assert reader.sequence() == 4
+        reader.close()
+
+    def test_reader_waits_out_a_write_in_progress(self, tmp_path):
+        """Test that a reader retries instead of returning a torn state"""
+        import threading
+        from spotify_milkdrop_overlay import NowPlayingSegment, NowPlayingReader
+        segment = NowPlayingSegment(str(tmp_path / 'now_playing.bin'))
+        segment.publish(self._track())
+        reader = NowPlayingReader(segment.path)
+
+        segment.SEQUENCE.pack_into(segment.map, segment.SEQUENCE_OFFSET, segment.sequence + 1)
+        segment.PAYLOAD.pack_into(segment.map, segment.HEADER.size, True, False, 0, 0, 0.0,
+                                  *[b'torn'] * len(segment.STRINGS))
+        finish = threading.Timer(0.05, segment.SEQUENCE.pack_into,
+                                 (segment.map, segment.SEQUENCE_OFFSET, segment.sequence + 2))
+        finish.start()
+        state = reader.read()
+        finish.join()
+
+        assert state['track'] == 'torn'
+        assert reader.retries > 0
+
+    def test_reader_gives_up_on_a_dead_writer(self, tmp_path):
+        """Test that a sequence left odd times out instead of spinning forever"""
+        from spotify_milkdrop_overlay import NowPlayingSegment, NowPlayingReader
+        segment = NowPlayingSegment(str(tmp_path / 'now_playing.bin'))
+        segment.publish(self._track())
+        reader = NowPlayingReader(segment.path)
+
+        # The writer died between its two sequence updates
+        segment.SEQUENCE.pack_into(segment.map, segment.SEQUENCE_OFFSET, segment.sequence + 1)
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            reader.read(timeout=0.05)
+        assert time.monotonic() - start < 1
+        assert reader.retries > 0
+        assert reader.reads == 0
+
+    def test_reader_rejects_other_files(self, tmp_path):
+        """Test that a file that isn't a segment is refused"""
+        from spotify_milkdrop_overlay import NowPlayingReader
+        path = tmp_path / 'other.bin'
+        path.write_bytes(b'x' * 4096)
+        with pytest.raises(ValueError):
+            NowPlayingReader(str(path))
+
+    def test_overlay_publishes_only_changes(self, monkeypatch, tmp_path):
+        """Test that polls without playback changes cause no writes"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, NowPlayingReader
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'NOW_PLAYING_ENABLED', True)
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'NOW_PLAYING_FILE',
+                            str(tmp_path / 'now_playing.bin'))
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            overlay = SpotifyOverlay()
+        reader = NowPlayingReader(str(tmp_path / 'now_playing.bin'))
+
+        track = self._track(progress_ms=0)
+        overlay.handle_poll(track)
+        overlay.handle_poll(track)
+        assert overlay.now_playing.writes == 1
+        assert reader.read()['art_path'] == ''  # no art yet
+
+        overlay.handle_poll(track.replace(is_playing=False))
+        assert overlay.now_playing.writes == 2
+        assert reader.read()['is_playing'] is False
+
+    def test_overlay_shares_art_as_png_when_it_arrives(self, monkeypatch, tmp_path):
+        """Test that loaded art is saved as a PNG and published again"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, NowPlayingReader
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'NOW_PLAYING_ENABLED', True)
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'NOW_PLAYING_FILE',
+                            str(tmp_path / 'now_playing.bin'))
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            overlay = SpotifyOverlay()
+        overlay.art_loader = Mock()
+        reader = NowPlayingReader(str(tmp_path / 'now_playing.bin'))
+
+        class FakeImage:
+            def save(self, path, format):
+                with open(path, 'wb') as f:
+                    f.write(b'\x89PNG ' + format.encode())
+
+        track = self._track()
+        overlay.handle_poll(track)
+        overlay.playback = track
+        overlay.update_album_art([Mock(), FakeImage()], 1)
+
+        png = tmp_path / 'now_playing.png'
+        assert reader.read()['art_path'] == str(png)
+        assert png.read_bytes() == b'\x89PNG PNG'
+        assert overlay.now_playing.writes == 2
+
+        # Another album's art is not shared with this track
+        overlay.handle_poll(track.replace(track_id='other', album_art_url='https://other'))
+        assert reader.read()['art_path'] == ''
+
+
+class TestRetryAndCircuitBreaker:
+    """Tests for backoff, Retry-After and the circuit breaker"""
+
+    def test_rate_limit_raises_with_retry_after(self, fake_spotify):
+        """Test that a 429 is an error carrying Retry-After, not 'nothing playing'"""
+        from spotify_milkdrop_overlay import get_current_track, SpotifyAPIError
+        fake_spotify.script.append((429, {'Retry-After': '7'}, b''))
+
+        with pytest.raises(SpotifyAPIError) as error:
+            get_current_track()
+        assert error.value.status_code == 429
+        assert error.value.retry_after == 7
+
+    def test_server_error_raises(self, fake_spotify):
+        """Test that 5xx responses are errors"""
+        from spotify_milkdrop_overlay import get_current_track, SpotifyAPIError
+        fake_spotify.script.append((503, {}, b''))
+
+        with pytest.raises(SpotifyAPIError) as error:
+            get_current_track()
+        assert error.value.retry_after is None
+
+    def test_backoff_grows_with_jitter_up_to_cap(self):
+        """Test jittered exponential backoff"""
+        from spotify_milkdrop_overlay import RetryPolicy
+        policy = RetryPolicy(base_delay=2, max_delay=10)
+        for ceiling in (2, 4, 8, 10, 10):
+            assert ceiling / 2 <= policy.next_delay() <= ceiling
+        assert policy.retries == 5
+
+        policy.reset()
+        assert 1 <= policy.next_delay() <= 2
+
+    def test_backoff_honors_retry_after(self):
+        """Test that Retry-After is never undercut"""
+        from spotify_milkdrop_overlay import RetryPolicy
+        policy = RetryPolicy(base_delay=2, max_delay=10)
+        assert policy.next_delay(retry_after=30) == 30
+
+    def test_breaker_opens_half_opens_and_closes(self):
+        """Test the breaker state machine"""
+        from spotify_milkdrop_overlay import CircuitBreaker
+        now = [100.0]
+        breaker = CircuitBreaker(threshold=3, cooldown=30, clock=lambda: now[0])
+
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.time_until_retry() is None
+
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        assert breaker.time_until_retry() == 30
+
+        now[0] += 31
+        assert breaker.time_until_retry() is None
+        assert breaker.state == 'half_open'
+
+        # A failed trial call re-opens immediately, honoring Retry-After
+        breaker.record_failure(retry_after=60)
+        assert breaker.time_until_retry() == 60
+
+        now[0] += 61
+        breaker.time_until_retry()
+        breaker.record_success()
+        assert breaker.stats() == {
+            'state': 'closed', 'consecutive_failures': 0,
+            'times_opened': 2, 'blocked_calls': 2
+        }
+
+    def test_open_breaker_stops_outbound_calls(self, fake_spotify):
+        """Test against scripted errors that an open breaker makes no requests"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import (SpotifyOverlay, CircuitBreaker, PlaybackSnapshot,
+                                              get_current_track)
+
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            overlay = SpotifyOverlay()
+        overlay.circuit_breaker = CircuitBreaker(threshold=2, cooldown=60)
+        overlay.playback = PlaybackSnapshot('id1', 'Song', 'Artist', progress_ms=10000,
+                                            duration_ms=200000, is_playing=True)
+        overlay.progress.reset(overlay.playback)
+        fake_spotify.script.extend([(503, {}, b''), (429, {'Retry-After': '5'}, b''), (503, {}, b'')])
+
+        delays = []
+        for _ in range(4):
+            delay = overlay.poll_blocked_for()
+            if delay is None:
+                try:
+                    delay = overlay.poll_succeeded(get_current_track())
+                except Exception as e:
+                    delay = overlay.poll_failed(e)
+            delays.append(delay)
+
+        assert len(fake_spotify.requests) == 2
+        assert delays[1] >= 5
+        assert 59 < delays[2] <= 60
+        stats = overlay.network_stats()
+        assert stats['state'] == 'open'
+        assert stats['retries'] == 2
+        # Progress keeps being extrapolated while no calls go out
+        assert overlay.estimate_progress() >= 10000
+
+
+class TestMetrics:
+    """Tests for the Prometheus metrics endpoint"""
+
+    @pytest.fixture
+    def metrics(self, monkeypatch):
+        import spotify_milkdrop_overlay
+        metrics = spotify_milkdrop_overlay.Metrics(buckets=(0.1, 1))
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'metrics', metrics)
+        return metrics
+
+    def test_render_counters_and_histograms(self, metrics):
+        """Test the text exposition format"""
+        # Names the overlay doesn't use, so stray background polls can't interfere
+        metrics.inc('example_responses_total', host='api', status=200)
+        metrics.inc('example_responses_total', host='api', status=200)
+        metrics.observe('example_duration_seconds', 0.05)
+        metrics.observe('example_duration_seconds', 0.5)
+        metrics.add_collector(lambda: [('example_threads', 'gauge', 3, {})])
+
+        lines = metrics.render().splitlines()
+        assert '# TYPE example_responses_total counter' in lines
+        assert 'example_responses_total{host="api",status="200"} 2' in lines
+        assert '# TYPE example_duration_seconds histogram' in lines
+        assert 'example_duration_seconds_bucket{le="0.1"} 1' in lines
+        assert 'example_duration_seconds_bucket{le="1"} 2' in lines
+        assert 'example_duration_seconds_bucket{le="+Inf"} 2' in lines
+        assert 'example_duration_seconds_count 2' in lines
+        assert 'example_threads 3' in lines
+
+    def test_endpoint_reports_polls_statuses_and_refreshes(self, fake_spotify, metrics, monkeypatch):
+        """Test the endpoint after real polls against the fake server"""
+        import requests
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import get_current_track, start_metrics_server, SpotifyAPIError
+
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'refresh_token', 'refresh')
+        monkeypatch.setattr(spotify_milkdrop_overlay, 'token_expires', 0)
+        fake_spotify.script.extend([(200, {}, b'{"access_token": "t", "expires_in": 3600}'),
+                                    (503, {}, b'')])
+        with pytest.raises(SpotifyAPIError):
+            get_current_track()
+        get_current_track()
+
+        server = start_metrics_server(port=0)
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}'
+            body = requests.get(url + '/metrics', timeout=5).text
+            assert requests.get(url + '/other', timeout=5).status_code == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        host = urlparse(fake_spotify.url).netloc
+        lines = body.splitlines()
+        assert f'spotify_http_responses_total{{host="{host}",status="200"}} 2' in lines
+        assert f'spotify_http_responses_total{{host="{host}",status="503"}} 1' in lines
+        assert 'spotify_poll_duration_seconds_count 2' in lines
+        assert 'spotify_token_refreshes_total{result="ok"} 1' in lines
+        assert 'spotify_token_refresh_duration_seconds_count 1' in lines
+
+    def test_overlay_reports_paint_latency_and_tk_callbacks(self, metrics):
+        """Test the overlay's own metrics"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, PlaybackSnapshot
+
+        with patch.object(spotify_milkdrop_overlay, 'Thread'):
+            overlay = SpotifyOverlay()
+        overlay.art_loader = Mock()
+        overlay.handle_poll(PlaybackSnapshot('id1', 'Song', 'Artist', progress_ms=0,
+                                             duration_ms=1000, is_playing=True))
+        overlay.frame_scheduler.tick()
+
+        lines = metrics.render().splitlines()
+        assert 'overlay_track_change_paint_seconds_count 1' in lines
+        assert 'overlay_tk_callbacks_total{kind="frame"} 1' in lines
+        assert 'overlay_tk_callbacks_total{kind="update"} 1' in lines
+        # Every family the overlay reports is documented
+        families = {line.split()[2] for line in lines if line.startswith('# TYPE')}
+        assert families <= set(spotify_milkdrop_overlay.Metrics.HELP)
+
+        overlay.close()
+        assert 'overlay_tk_callbacks_total' not in metrics.render()
+
+    def test_label_values_are_escaped(self, metrics):
+        """Test that backslashes, quotes and newlines in label values are escaped"""
+        metrics.inc('example_polls_total', account='a"b\\c\nd')
+        assert 'example_polls_total{account="a\\"b\\\\c\\nd"} 1' in metrics.render().splitlines()
+
+    def test_compose_duration_has_help(self, metrics):
+        """Test that the compositor's histogram is documented like the others"""
+        metrics.observe('overlay_compose_duration_seconds', 0.002)
+        lines = metrics.render().splitlines()
+        assert lines[0].startswith('# HELP overlay_compose_duration_seconds ')
+        assert lines[1] == '# TYPE overlay_compose_duration_seconds histogram'
+
+
+class TestProfiler:
+    """Tests for the runtime profiling hooks"""
+
+    def test_windows_write_cpu_and_memory_stats(self, tmp_path):
+        """Test that each sampling window is written out"""
+        import tracemalloc
+        from spotify_milkdrop_overlay import Profiler
+        now = [0.0]
+        profiler = Profiler(directory=str(tmp_path), window=10, top=5, clock=lambda: now[0])
+
+        profiler.start()
+        assert tracemalloc.is_tracing()
+        assert profiler.tick() is None
+        assert list(tmp_path.iterdir()) == []
+
+        now[0] = 10
+        [x * 2 for x in range(1000)]
+        profiler.tick()
+        now[0] = 20
+        profiler.tick()
+        assert profiler.windows == 2
+        assert len(list(tmp_path.glob('*.prof'))) == 2
+        memory = sorted(tmp_path.glob('*-memory.txt'))
+        assert 'changes since the previous window' in memory[1].read_text()
+        assert 'function calls' in sorted(tmp_path.glob('*-cpu.txt'))[0].read_text()
+
+        profiler.stop()
+        assert profiler.windows == 3
+        assert not tracemalloc.is_tracing()
+        assert sys.getprofile() is None
+        assert profiler.tick() is False
+
+    def test_overlay_toggle_at_runtime(self, tmp_path, monkeypatch):
+        """Test toggling on a running overlay"""
+        import spotify_milkdrop_overlay
+        from spotify_milkdrop_overlay import SpotifyOverlay, Profiler
+
+        overlay = SpotifyOverlay()
+        overlay.profiler = Profiler(directory=str(tmp_path))
+        overlay.root.bind.assert_any_call('<Control-Alt-p>', ANY)
+
+        overlay.toggle_profiling()
+        assert overlay.profiler.active
+        assert overlay.profile_task in overlay.frame_scheduler.tasks
+
+        overlay.toggle_profiling()
+        assert not overlay.profiler.active
+        assert len(list(tmp_path.glob('*.prof'))) == 1
+        overlay.frame_scheduler.run_tasks(time.monotonic() + 2)
+        assert overlay.profile_task not in overlay.frame_scheduler.tasks
 
 
 class TestEdgeCasesAndErrorHandling: